@@ -0,0 +1,81 @@
+"""
+Fingerprinted static assets (see app/scripts/build_assets.py).
+
+The build writes ``app/static/dist/<name>.<hash>.<ext>`` plus ``.gz``/``.br`` siblings and
+a ``manifest.json`` mapping source names to hashed ones. Templates call ``asset_url()``
+to get the hashed URL; without a build (local dev) it falls back to the plain
+``/static/<name>`` file.
+
+Hashed files never change, so they are served with ``immutable`` caching and the
+precompressed variant the client accepts; everything else under /static revalidates.
+"""
+import json
+import mimetypes
+import stat
+from functools import lru_cache
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.compression import accepted_encodings
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Preferred first; a variant is only served if the build wrote it.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@lru_cache
+def load_manifest(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """Source name -> hashed name, or {} when assets have not been built."""
+    try:
+        return json.loads((static_dir / DIST_DIR / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(name: str) -> str:
+    """URL of a static asset: the fingerprinted build output if there is one."""
+    hashed = load_manifest().get(name)
+    if hashed:
+        return f"/static/{DIST_DIR}/{hashed}"
+    return f"/static/{name}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves build output as .br/.gz with long-lived caching."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        fingerprinted = Path(path).parts[:1] == (DIST_DIR,) and not path.endswith(MANIFEST_NAME)
+        response = None
+        if fingerprinted and scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if fingerprinted:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE
+            response.headers["Vary"] = "Accept-Encoding"
+        else:
+            response.headers.setdefault("Cache-Control", "no-cache")
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            if response.status_code != 304:
+                response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response.headers["Content-Encoding"] = encoding
+            return response
+        return None
@@ -1,3 +1,6 @@
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta
 from typing import Annotated
 from fastapi import Depends, HTTPException, status
@@ -8,7 +11,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_read_db, get_session_factory, has_separate_read_engine
+from app.metrics import BCRYPT_DURATION
 from app.models import User, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
@@ -16,11 +20,13 @@ bearer_scheme = HTTPBearer(auto_error=False)
 
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    with BCRYPT_DURATION.labels("hash").time():
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    with BCRYPT_DURATION.labels("verify").time():
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
 
 
 def create_access_token(username: str, role: UserRole) -> str:
@@ -30,6 +36,37 @@ def create_access_token(username: str, role: UserRole) -> str:
     return jwt.encode(payload, settings.secret_key, algorithm="HS256")
 
 
+def token_role(token: str) -> str | None:
+    """Role claim of a valid access token, without a DB lookup (None if invalid or expired)."""
+    try:
+        payload = jwt.decode(token, get_settings().secret_key, algorithms=["HS256"])
+    except JWTError:
+        return None
+    return payload.get("role")
+
+
+def _stream_signature(filename: str, expires: int) -> str:
+    settings = get_settings()
+    message = f"stream:{filename}:{expires}".encode("utf-8")
+    return hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def create_stream_url(filename: str, ttl_seconds: int | None = None) -> tuple[str, int]:
+    """Return (url, expires) for a time-limited, HMAC-signed stream URL of a stored song file."""
+    if ttl_seconds is None:
+        ttl_seconds = get_settings().stream_url_ttl_seconds
+    expires = int(time.time()) + ttl_seconds
+    sig = _stream_signature(filename, expires)
+    return f"/api/songs/signed/{filename}?expires={expires}&sig={sig}", expires
+
+
+def verify_stream_signature(filename: str, expires: int, sig: str) -> bool:
+    """Check a signed stream URL without touching the DB."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_stream_signature(filename, expires), sig)
+
+
 async def get_user_by_username(db: AsyncSession, username: str) -> User | None:
     result = await db.execute(select(User).where(User.username == username))
     return result.scalar_one_or_none()
@@ -43,7 +80,7 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> U
 
 
 async def get_current_user(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)] = None,
     token: Annotated[str | None, Depends(oauth2_scheme)] = None,
 ) -> User:
@@ -67,6 +104,10 @@ async def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     user = await get_user_by_username(db, username)
+    if user is None and has_separate_read_engine():
+        # A replica may not have the account yet right after registration.
+        async with get_session_factory()() as primary:
+            user = await get_user_by_username(primary, username)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -0,0 +1,139 @@
+"""
+Response compression for JSON/text: Brotli when the ``brotli`` package is installed and
+the client accepts it, gzip otherwise.
+
+Only complete (single-message) bodies of at least ``COMPRESSION_MIN_SIZE`` bytes with a
+text-like content type are compressed. Audio/image file responses, Range (206) responses
+and streamed bodies pass through untouched, so seeking and Content-Length keep working.
+A strong ETag on a compressed body gets the coding appended (``"abc"`` -> ``"abc-gzip"``),
+since the encoded bytes differ; ``strip_etag_coding`` undoes that for If-None-Match.
+"""
+import gzip
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "application/msgpack",
+}
+# Bodies larger than this are compressed in a worker thread instead of on the event loop.
+THREAD_THRESHOLD = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # fast setting meant for dynamic responses
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Content codings an Accept-Encoding header allows (q=0 means not acceptable)."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header."""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith("+json") or media_type in COMPRESSIBLE_TYPES
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag for the `encoding` representation; weak ETags already allow byte differences."""
+    if etag.startswith('"') and etag.endswith('"') and len(etag) > 1:
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def strip_etag_coding(etag: str) -> str:
+    """The ETag a handler set, given one the client got back from a compressed response."""
+    for encoding in ("gzip", "br"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return f'{etag[:-len(suffix)]}"'
+    return etag
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        start_message: Message | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (
+                    message["status"] == 200
+                    and "content-encoding" not in headers
+                    and is_compressible(headers.get("content-type", ""))
+                ):
+                    # Hold the start message until we know whether the body is compressed.
+                    start_message = message
+                    return
+                await send(message)
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            start["headers"] = list(start.get("headers", []))
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if not message.get("more_body", False) and len(body) >= self.minimum_size:
+                if len(body) > THREAD_THRESHOLD:
+                    compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+                else:
+                    compressed = compress(body, encoding)
+                if len(compressed) < len(body):
+                    headers["content-encoding"] = encoding
+                    headers["content-length"] = str(len(compressed))
+                    if "etag" in headers:
+                        headers["etag"] = encoded_etag(headers["etag"], encoding)
+                    message = {**message, "body": compressed}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
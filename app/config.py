@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pathlib import Path
 from pydantic_settings import BaseSettings
 
@@ -5,14 +6,91 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     secret_key: str = "change-me-in-production"
     database_url: str = "sqlite+aiosqlite:///./nivpro.db"
+    # Read-only requests (app.database.get_read_db) use this URL, e.g. a PostgreSQL replica.
+    # Empty: SQLite files get a separate read-only connection pool on the same file, other
+    # databases share the primary pool.
+    database_read_url: str = ""
+    # SQLite: write-ahead logging, so readers never block the writer (and vice versa).
+    sqlite_wal: bool = True
     upload_dir: Path = Path("./uploads")
     images_dir: Path = Path("./uploads/images")
     allow_registration: bool = True
     # If True, create default admin (admin/admin) when no users exist. Set False in production.
     create_default_admin: bool = False
+    # Lifetime of signed stream URLs handed to the player's <audio> element.
+    stream_url_ttl_seconds: int = 6 * 3600
+    # Waveform/loudness analysis runs in a process pool of this size.
+    analysis_workers: int = 2
+    analyze_on_upload: bool = True
+    # Files of one multi-file upload (POST /api/admin/songs/batch) stored at the same time.
+    upload_concurrency: int = 4
+    # Storage reconciler: interval (0 disables the periodic run), whether it deletes orphans,
+    # and how old an orphan file must be before it is collected (protects in-flight uploads).
+    storage_reconcile_interval_seconds: int = 3600
+    storage_reconcile_collect: bool = False
+    storage_orphan_grace_seconds: int = 3600
+    # Hashed sub-directory fan-out for stored files (0 = flat; see app.storage).
+    storage_shard_depth: int = 0
+    # "local" (upload_dir/images_dir) or "s3" (any S3-compatible store; needs boto3).
+    storage_backend: str = "local"
+    s3_bucket: str = ""
+    s3_prefix: str = ""
+    s3_endpoint_url: str = ""
+    s3_region: str = ""
+    s3_access_key_id: str = ""
+    s3_secret_access_key: str = ""
+    # Play events are queued and written in batches: flush size/interval and the queue limit
+    # beyond which the API answers 503 (app.services.play_events).
+    play_events_batch_size: int = 500
+    play_events_flush_interval_seconds: float = 2.0
+    play_events_max_pending: int = 50000
+    # Background jobs (app.services.jobs): concurrent jobs per process, how often idle workers
+    # look for jobs queued elsewhere, when a silent running job counts as abandoned and how
+    # many times a job is tried.
+    job_workers: int = 2
+    job_poll_interval_seconds: float = 5.0
+    job_stale_seconds: int = 300
+    job_max_attempts: int = 3
+    # Popularity rollups and charts (app.services.rollups): refresh interval (0 disables the
+    # periodic run), songs kept per chart and the window of the trending/weekly charts.
+    rollup_interval_seconds: int = 300
+    chart_size: int = 100
+    trending_window_days: int = 7
+    # Rows written less than this long ago are folded by the next refresh, so ids that commit out
+    # of order (several writers) are not skipped.
+    rollup_fold_lag_seconds: int = 30
+    # Rendered page shells (app.pages) are re-rendered at least this often, so every worker
+    # picks up settings changed elsewhere (0 renders on every request).
+    page_cache_seconds: int = 60
+    # Compact song catalogue snapshot (app.services.catalog): rebuilt at least this often so
+    # changes made by other workers show up (0 rebuilds on every request).
+    catalog_cache_seconds: int = 30
+    # Deleted songs are reported by GET /api/songs/changes for this long; older sync tokens get a reset.
+    song_tombstone_retention_days: int = 30
+    # gzip/Brotli for JSON and text responses of at least this many bytes (0 disables; app.compression).
+    compression_min_size: int = 1024
+    # Prometheus metrics at /metrics (keep it off the public proxy; see deploy/nginx.conf).
+    metrics_enabled: bool = True
+    # Request profiling (app.profiling): fraction of requests profiled without the admin
+    # X-Profile header, how many profiles are kept, and the slow-request log threshold (0 = off).
+    profile_sample_rate: float = 0.0
+    profile_buffer_size: int = 50
+    slow_request_ms: int = 1000
+    # Readiness (/health/ready): result cache, DB probe timeout and the limits that mark the instance unready.
+    health_cache_seconds: float = 2.0
+    health_db_timeout_seconds: float = 2.0
+    health_min_free_disk_mb: int = 200
+    health_max_pool_saturation: float = 0.95
+    health_max_loop_lag_ms: int = 1000
+    # Event-loop monitor (app.loop_monitor): sampling interval (0 disables), lag that gets logged,
+    # and debug mode where a watchdog thread logs the stack of whatever blocks the loop that long.
+    loop_monitor_interval_ms: int = 100
+    loop_block_threshold_ms: int = 200
+    loop_block_debug: bool = False
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8", "extra": "ignore"}
 
 
+@lru_cache
 def get_settings() -> Settings:
     return Settings()
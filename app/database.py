@@ -1,5 +1,8 @@
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from functools import lru_cache
+
+from sqlalchemy import event, make_url, text
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
 
@@ -8,19 +11,64 @@ class Base(DeclarativeBase):
     pass
 
 
+def _sqlite_file(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _use_wal(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints instead of every commit; the usual pairing with WAL.
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+@lru_cache
 def get_engine():
+    """Process-wide engine: all sessions share its connection pool."""
     settings = get_settings()
-    return create_async_engine(
+    engine = create_async_engine(
         settings.database_url,
         echo=False,
     )
+    if settings.sqlite_wal and _sqlite_file(make_url(settings.database_url)):
+        _use_wal(engine)
+    return engine
 
 
+@lru_cache
+def get_read_engine():
+    """Engine for read-only sessions: DATABASE_READ_URL, a read-only pool on the same
+    SQLite file, or the primary engine."""
+    settings = get_settings()
+    if settings.database_read_url:
+        return create_async_engine(settings.database_read_url, echo=False)
+    url = make_url(settings.database_url)
+    if _sqlite_file(url) and not url.database.startswith("file:"):
+        return create_async_engine(
+            url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"}),
+            echo=False,
+        )
+    return get_engine()
+
+
+def has_separate_read_engine() -> bool:
+    return get_read_engine() is not get_engine()
+
+
+@lru_cache
 def get_session_factory():
     engine = get_engine()
     return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+@lru_cache
+def get_read_session_factory():
+    return async_sessionmaker(get_read_engine(), class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
 def _add_user_ip_columns_if_missing(sync_conn):
     """Add created_ip and last_login_ip to users table if they don't exist (for existing DBs)."""
     for col in ["created_ip", "last_login_ip"]:
@@ -38,15 +86,141 @@ def _add_app_settings_allow_registration(sync_conn):
         pass
 
 
+def _add_song_analysis_columns_if_missing(sync_conn):
+    """Add analysis and metadata re-scan columns to songs if missing (for existing DBs)."""
+    for col, col_type in [
+        ("waveform_peaks", "BLOB"),
+        ("loudness_lufs", "FLOAT"),
+        ("replay_gain_db", "FLOAT"),
+        ("peak_amplitude", "FLOAT"),
+        ("analyzed_at", "DATETIME"),
+        ("metadata_scanned_at", "DATETIME"),
+        ("metadata_error", "VARCHAR(255)"),
+    ]:
+        try:
+            sync_conn.execute(text(f"ALTER TABLE songs ADD COLUMN {col} {col_type}"))
+        except Exception:
+            pass
+
+
+def _add_song_love_count_if_missing(sync_conn):
+    """Add the denormalized songs.love_count (and fill it from song_loves) for existing DBs."""
+    try:
+        sync_conn.execute(text("ALTER TABLE songs ADD COLUMN love_count INTEGER NOT NULL DEFAULT 0"))
+    except Exception:
+        return
+    sync_conn.execute(text(
+        "UPDATE songs SET love_count = (SELECT COUNT(*) FROM song_loves WHERE song_loves.song_id = songs.id)"
+    ))
+    sync_conn.execute(text("CREATE INDEX IF NOT EXISTS ix_songs_love_count ON songs (love_count)"))
+
+
+def _add_play_event_recorded_at_if_missing(sync_conn):
+    """Add play_events.recorded_at (rollup fold lag) for existing DBs, starting from occurred_at."""
+    try:
+        sync_conn.execute(text("ALTER TABLE play_events ADD COLUMN recorded_at DATETIME"))
+    except Exception:
+        return
+    sync_conn.execute(text("UPDATE play_events SET recorded_at = occurred_at"))
+
+
+def _fill_song_play_totals_if_missing(sync_conn):
+    """Fill song_play_totals from the daily buckets when it was just created (existing DBs)."""
+    if sync_conn.execute(text("SELECT 1 FROM song_play_totals LIMIT 1")).first() is not None:
+        return
+    sync_conn.execute(text(
+        "INSERT INTO song_play_totals (song_id, plays) "
+        "SELECT song_id, SUM(plays) FROM song_daily_stats GROUP BY song_id HAVING SUM(plays) > 0"
+    ))
+
+
+# Rollups fold these by id above a watermark; SQLite reuses the highest rowid after a delete
+# unless the table is AUTOINCREMENT, and a reused id below the watermark is never folded.
+ROLLUP_SOURCE_TABLES = ["play_events", "song_loves"]
+
+
+def _sqlite_autoincrement_if_missing(sync_conn):
+    """Rebuild rollup source tables created before they were AUTOINCREMENT (SQLite only)."""
+    if sync_conn.dialect.name != "sqlite":
+        return
+    for name in ROLLUP_SOURCE_TABLES:
+        sql = sync_conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+        ).scalar()
+        if sql is None or "AUTOINCREMENT" in sql.upper():
+            continue
+        table = Base.metadata.tables[name]
+        indexes = sync_conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"),
+            {"name": name},
+        ).scalars().all()
+        for index in indexes:
+            sync_conn.execute(text(f"DROP INDEX {index}"))
+        sync_conn.execute(text(f"ALTER TABLE {name} RENAME TO {name}_old"))
+        table.create(sync_conn)
+        columns = ", ".join(c.name for c in table.columns)
+        sync_conn.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}_old"))
+        sync_conn.execute(text(f"DROP TABLE {name}_old"))
+        # Start above ids already folded even if their rows were deleted.
+        seq = sync_conn.execute(
+            text(f"SELECT MAX(COALESCE((SELECT MAX(id) FROM {name}), 0), "
+                 "COALESCE((SELECT last_id FROM rollup_watermarks WHERE source = :name), 0))"),
+            {"name": name},
+        ).scalar()
+        sync_conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": name})
+        sync_conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": name, "seq": seq})
+
+
+def _add_song_updated_at_if_missing(sync_conn):
+    """Add songs.updated_at (delta sync) for existing DBs, starting from created_at."""
+    try:
+        sync_conn.execute(text("ALTER TABLE songs ADD COLUMN updated_at DATETIME"))
+    except Exception:
+        return
+    sync_conn.execute(text("UPDATE songs SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)"))
+    sync_conn.execute(text("CREATE INDEX IF NOT EXISTS ix_songs_updated_at ON songs (updated_at)"))
+
+
+# Indexes added to tables that already existed; create_all only creates indexes with new tables.
+# Names follow SQLAlchemy's ix_<table>_<column> so fresh and migrated DBs match.
+QUERY_INDEXES = [
+    ("ix_songs_created_at", "songs", "created_at"),
+    ("ix_background_images_is_active", "background_images", "is_active"),
+    ("ix_song_loves_song_id", "song_loves", "song_id"),
+    ("ix_chart_entries_song_id", "chart_entries", "song_id"),
+]
+
+
+def _add_query_indexes_if_missing(sync_conn):
+    """Create the indexes behind the hot lookups (see tests/test_query_plans.py) on existing DBs."""
+    for name, table, columns in QUERY_INDEXES:
+        sync_conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
 async def init_db():
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
         await conn.run_sync(_add_user_ip_columns_if_missing)
         await conn.run_sync(_add_app_settings_allow_registration)
+        await conn.run_sync(_add_song_analysis_columns_if_missing)
+        await conn.run_sync(_add_song_love_count_if_missing)
+        await conn.run_sync(_add_song_updated_at_if_missing)
+        await conn.run_sync(_add_play_event_recorded_at_if_missing)
+        await conn.run_sync(_sqlite_autoincrement_if_missing)
+        await conn.run_sync(_fill_song_play_totals_if_missing)
+        await conn.run_sync(_add_query_indexes_if_missing)
+
+
+async def get_read_db():
+    """Session for handlers that only read: no flush or commit, possibly a replica (see
+    get_read_engine). With a replica, data written a moment ago may not be visible yet."""
+    async with get_read_session_factory()() as session:
+        yield session
 
 
 async def get_db():
+    """Read-write session, committed when the handler returns."""
     session_factory = get_session_factory()
     async with session_factory() as session:
         try:
@@ -0,0 +1,114 @@
+"""
+Readiness checks for load balancers: DB round trip, free disk on the upload volume,
+connection pool saturation and event-loop lag.
+
+Results are cached for ``HEALTH_CACHE_SECONDS`` and concurrent probes share one run, so
+frequent probes cost at most one ``SELECT 1`` per interval.
+"""
+import asyncio
+import os
+import shutil
+import time
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import get_engine
+from app.loop_monitor import get_loop_monitor
+
+_cached: tuple[float, dict] | None = None
+_lock: asyncio.Lock | None = None
+
+
+async def _check_db() -> dict:
+    settings = get_settings()
+    started = time.perf_counter()
+    try:
+        async with asyncio.timeout(settings.health_db_timeout_seconds):
+            async with get_engine().connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except TimeoutError:
+        return {"ok": False, "error": f"timed out after {settings.health_db_timeout_seconds}s"}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _check_disk() -> dict:
+    settings = get_settings()
+    if settings.storage_backend != "local":
+        return {"ok": True, "skipped": f"storage backend is {settings.storage_backend}"}
+    upload_dir = settings.upload_dir
+    if not upload_dir.is_dir() or not os.access(upload_dir, os.W_OK):
+        return {"ok": False, "error": f"{upload_dir} is missing or not writable"}
+    usage = shutil.disk_usage(upload_dir)
+    free_mb = usage.free / (1024 * 1024)
+    return {
+        "ok": free_mb >= settings.health_min_free_disk_mb,
+        "free_mb": round(free_mb),
+        "free_ratio": round(usage.free / usage.total, 3) if usage.total else 0.0,
+    }
+
+
+def _check_pool() -> dict:
+    pool = get_engine().pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return {"ok": True, "skipped": type(pool).__name__}
+    checked_out = pool.checkedout()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    if max_overflow < 0:
+        return {"ok": True, "checked_out": checked_out, "capacity": None}
+    capacity = pool.size() + max_overflow
+    saturation = checked_out / capacity if capacity else 0.0
+    return {
+        "ok": saturation < get_settings().health_max_pool_saturation,
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(saturation, 3),
+    }
+
+
+async def _check_loop_lag() -> dict:
+    """Latest sample of the loop monitor, or a one-off measurement if it is disabled."""
+    monitor = get_loop_monitor()
+    if monitor is not None and monitor.running:
+        lag_ms = monitor.lag * 1000
+    else:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.sleep(0)
+        lag_ms = (loop.time() - started) * 1000
+    return {"ok": lag_ms < get_settings().health_max_loop_lag_ms, "lag_ms": round(lag_ms, 2)}
+
+
+async def _run_checks() -> dict:
+    lag = await _check_loop_lag()
+    db = await _check_db()
+    disk = await asyncio.to_thread(_check_disk)
+    checks = {"database": db, "disk": disk, "pool": _check_pool(), "event_loop": lag}
+    return {
+        "status": "ok" if all(c["ok"] for c in checks.values()) else "fail",
+        "checks": checks,
+    }
+
+
+async def check_readiness() -> dict:
+    """Run (or reuse a fresh cached result of) all readiness checks."""
+    global _cached, _lock
+    ttl = get_settings().health_cache_seconds
+    if _cached is not None and time.monotonic() - _cached[0] < ttl:
+        return {**_cached[1], "cached": True}
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        # Another probe may have refreshed the result while we waited.
+        if _cached is not None and time.monotonic() - _cached[0] < ttl:
+            return {**_cached[1], "cached": True}
+        result = await _run_checks()
+        _cached = (time.monotonic(), result)
+    return {**result, "cached": False}
+
+
+def reset_readiness_cache() -> None:
+    global _cached
+    _cached = None
@@ -0,0 +1,141 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A task sleeps for a short interval and measures how late it wakes up: that delay is the
+time any ready callback (a stream chunk, a request) currently waits for the loop. It is
+exported as metrics and lags over the threshold are logged.
+
+With ``LOOP_BLOCK_DEBUG=true`` a watchdog thread also checks the task's heartbeat and, when
+the loop has not come back for longer than the threshold, logs the loop thread's current
+stack, i.e. the sync call that is blocking it (bcrypt, file I/O, tag parsing...). Taking
+the stack is cheap but not free, so keep debug mode for staging.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = Histogram(
+    "nivpro_event_loop_lag_seconds",
+    "How late the loop monitor woke up (time ready callbacks wait for the event loop)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_LAG_CURRENT = Gauge("nivpro_event_loop_lag_current_seconds", "Most recent event loop lag sample")
+LOOP_BLOCKED = Counter("nivpro_event_loop_blocked_total", "Times the watchdog saw the event loop blocked")
+
+# Stack traces of recent blocking episodes kept in memory.
+MAX_BLOCK_REPORTS = 20
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float, debug: bool = False):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.blocks: deque[dict] = deque(maxlen=MAX_BLOCK_REPORTS)
+        self._heartbeat = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop_thread_id: int | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run())
+        if self.debug:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            self.lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_CURRENT.set(lag)
+            if lag >= self.threshold:
+                logger.warning("Event loop lag %.0f ms", lag * 1000)
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.threshold or heartbeat == reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported = heartbeat
+            stack = "".join(traceback.format_stack(frame))
+            LOOP_BLOCKED.inc()
+            self.blocks.append({
+                "detected_at": datetime.utcnow().isoformat(),
+                "blocked_ms": round(blocked_for * 1000),
+                "stack": stack,
+            })
+            logger.warning("Event loop blocked for %.0f ms so far; loop thread stack:\n%s", blocked_for * 1000, stack)
+
+
+_monitor: LoopMonitor | None = None
+
+
+def get_loop_monitor() -> LoopMonitor | None:
+    return _monitor
+
+
+def start_loop_monitor() -> LoopMonitor | None:
+    """Start the monitor on the running loop (lifespan). None if LOOP_MONITOR_INTERVAL_MS=0."""
+    global _monitor
+    settings = get_settings()
+    if settings.loop_monitor_interval_ms <= 0:
+        return None
+    _monitor = LoopMonitor(
+        interval=settings.loop_monitor_interval_ms / 1000,
+        threshold=settings.loop_block_threshold_ms / 1000,
+        debug=settings.loop_block_debug,
+    )
+    _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor() -> None:
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
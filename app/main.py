@@ -1,18 +1,27 @@
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from fastapi.templating import Jinja2Templates
+from app.assets import STATIC_DIR, PrecompressedStaticFiles, asset_url
+from app.compression import CompressionMiddleware
 from app.config import get_settings
 from app.database import init_db
-from app.routers import auth_router, player, admin, background, users, settings
+from app.health import check_readiness
+from app.loop_monitor import start_loop_monitor, stop_loop_monitor
+from app.metrics import MetricsMiddleware, metrics_response
+from app.pages import render_page
+from app.profiling import ProfilingMiddleware
+from app.routers import auth_router, player, admin, background, users, settings, storage, profiles, playlists, plays, charts, jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
     settings = get_settings()
+    start_loop_monitor()
     settings.upload_dir.mkdir(parents=True, exist_ok=True)
     settings.images_dir.mkdir(parents=True, exist_ok=True)
     # Optional bootstrap: only create default admin (admin/admin) if explicitly enabled (e.g. local dev).
@@ -29,10 +38,41 @@ async def lifespan(app: FastAPI):
                 admin = User(username="admin", password_hash=hash_password("admin"), role=UserRole.admin)
                 db.add(admin)
                 await db.commit()
+    reconcile_task = None
+    if settings.storage_reconcile_interval_seconds > 0:
+        from app.services.storage_reconciler import run_periodic_reconcile
+        reconcile_task = asyncio.create_task(run_periodic_reconcile())
+    rollup_task = None
+    if settings.rollup_interval_seconds > 0:
+        from app.services.rollups import run_periodic_rollups
+        rollup_task = asyncio.create_task(run_periodic_rollups())
+    from app.services.play_events import get_play_event_buffer
+    play_events = get_play_event_buffer()
+    play_events.start()
+    from app.services.jobs import get_job_queue
+    job_queue = get_job_queue()
+    job_queue.start()
     yield
+    # Running jobs are handed back to the queue and resume after the restart.
+    await job_queue.close()
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    if rollup_task is not None:
+        rollup_task.cancel()
+    # Write queued play events before the process exits.
+    await play_events.close()
+    await stop_loop_monitor()
+    from app.services.song_service import shutdown_analysis_pool
+    shutdown_analysis_pool()
 
 
 app = FastAPI(title="NivPro", lifespan=lifespan)
+# Added first = innermost: profiling shares the per-request SQL counters set up by metrics.
+app.add_middleware(ProfilingMiddleware)
+if get_settings().compression_min_size > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=get_settings().compression_min_size)
+if get_settings().metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth_router.router)
 app.include_router(player.router)
@@ -40,23 +80,29 @@ app.include_router(admin.router)
 app.include_router(background.router)
 app.include_router(users.router)
 app.include_router(settings.router)
+app.include_router(storage.router)
+app.include_router(profiles.router)
+app.include_router(playlists.router)
+app.include_router(plays.router)
+app.include_router(charts.router)
+app.include_router(jobs.router)
 
-# Static and templates
-STATIC_DIR = Path(__file__).parent / "static"
+# Static and templates (build fingerprinted assets with: python -m app.scripts.build_assets)
 TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=str(STATIC_DIR)), name="static")
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.globals["asset_url"] = asset_url
 
 
 @app.get("/")
 async def player_page(request: Request):
-    return templates.TemplateResponse(request, "player.html")
+    return await render_page(request, templates, "player.html", boot=True)
 
 
 @app.get("/admin")
 async def admin_page(request: Request):
-    return templates.TemplateResponse(request, "admin.html")
+    return await render_page(request, templates, "admin.html")
 
 
 @app.get("/health")
@@ -64,6 +110,26 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and its event loop answers. Never touches dependencies."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: DB round trip, free disk, pool saturation and loop lag; 503 if any check fails."""
+    result = await check_readiness()
+    return JSONResponse(result, status_code=200 if result["status"] == "ok" else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not get_settings().metrics_enabled:
+        raise HTTPException(status_code=404)
+    return metrics_response()
+
+
 @app.get("/version")
 async def version():
     """Return build info so you can check what is running on the server (e.g. after deploy)."""
@@ -0,0 +1,136 @@
+"""
+Prometheus metrics: request latency per route, in-flight requests, SQL query count/time
+per request (SQLAlchemy engine events), bytes served, bcrypt time and upload timings.
+
+Collection is a few counter/histogram updates per request and per response chunk, so it is
+safe on the streaming path. Exposed at /metrics (disable with METRICS_ENABLED=false).
+"""
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_LATENCY = Histogram(
+    "nivpro_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge("nivpro_http_requests_in_flight", "HTTP requests currently being served")
+RESPONSE_BYTES = Counter("nivpro_http_response_bytes_total", "Response body bytes sent by route template", ["route"])
+DB_QUERIES_PER_REQUEST = Histogram(
+    "nivpro_db_queries_per_request",
+    "SQL statements executed while serving one request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000),
+)
+DB_QUERY_SECONDS_PER_REQUEST = Histogram(
+    "nivpro_db_query_seconds_per_request",
+    "Total SQL execution time while serving one request",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_QUERY_DURATION = Histogram(
+    "nivpro_db_query_duration_seconds",
+    "SQL statement execution time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+BCRYPT_DURATION = Histogram(
+    "nivpro_bcrypt_duration_seconds",
+    "Time spent hashing/verifying passwords",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+UPLOAD_SIZE = Histogram(
+    "nivpro_upload_size_bytes",
+    "Size of uploaded files",
+    ["kind"],
+    buckets=(1e4, 1e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8),
+)
+UPLOAD_STORE_DURATION = Histogram("nivpro_upload_store_duration_seconds", "Time to write an upload to storage", ["kind"])
+TAG_PARSE_DURATION = Histogram("nivpro_tag_parse_duration_seconds", "Time to read tags from an uploaded song")
+
+
+class RequestStats:
+    """Per-request counters filled in by the engine event hooks.
+
+    Set `statements` to a list to also record (sql, seconds) per statement (used by app.profiling).
+    """
+
+    __slots__ = ("queries", "query_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements: list[tuple[str, float]] | None = None
+
+
+current_request_stats: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append((statement, elapsed))
+
+
+def route_label(scope: Scope) -> str:
+    """Route template (e.g. /api/songs/{song_id}/stream) so raw paths never become labels."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware) so streamed bodies pass through untouched."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            current_request_stats.reset(token)
+            route = route_label(scope)
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(elapsed)
+            RESPONSE_BYTES.labels(route).inc(sent)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_QUERY_SECONDS_PER_REQUEST.labels(route).observe(stats.query_seconds)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,7 +1,29 @@
 from app.models.user import User, UserRole
 from app.models.song import Song
+from app.models.song_tombstone import SongTombstone
 from app.models.background_image import BackgroundImage
 from app.models.settings import AppSettings
 from app.models.song_love import SongLove
+from app.models.playlist import Playlist
+from app.models.playlist_item import PlaylistItem
+from app.models.play_event import PlayEvent
+from app.models.song_stats import SongDailyStats, SongPlayTotal, ChartEntry, RollupWatermark
+from app.models.job import Job
 
-__all__ = ["User", "UserRole", "Song", "BackgroundImage", "AppSettings", "SongLove"]
+__all__ = [
+    "User",
+    "UserRole",
+    "Song",
+    "SongTombstone",
+    "BackgroundImage",
+    "AppSettings",
+    "SongLove",
+    "Playlist",
+    "PlaylistItem",
+    "PlayEvent",
+    "SongDailyStats",
+    "SongPlayTotal",
+    "ChartEntry",
+    "RollupWatermark",
+    "Job",
+]
@@ -3,6 +3,7 @@ from pathlib import Path
 from sqlalchemy import String, DateTime, Boolean
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
+from app.storage import stored_path
 
 
 class BackgroundImage(Base):
@@ -10,8 +11,8 @@ class BackgroundImage(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     filename: Mapped[str] = mapped_column(String(512), nullable=False, unique=True)
-    is_active: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     def path_for(self, images_root: Path) -> Path:
-        return images_root / self.filename
+        return stored_path(images_root, self.filename)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Float, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class PlayEvent(Base):
+    """Listening history: start / progress / complete per play, written in batches (see app.services.play_events)."""
+
+    __tablename__ = "play_events"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id"), nullable=False)
+    event: Mapped[str] = mapped_column(String(16), nullable=False)
+    position_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Server time of the write (occurred_at is the client's clock); rollups fold by it.
+    recorded_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_play_events_user_occurred", "user_id", "occurred_at"),
+        Index("ix_play_events_song_occurred", "song_id", "occurred_at"),
+        # Never reuse ids: rollups fold by id (see app.services.rollups).
+        {"sqlite_autoincrement": True},
+    )
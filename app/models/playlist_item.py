@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class PlaylistItem(Base):
+    """A track in a playlist. Items are ordered by (position, id); positions are spaced
+    apart (see app.services.playlist_service) so a move or insert writes only the moved rows."""
+
+    __tablename__ = "playlist_items"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    playlist_id: Mapped[int] = mapped_column(ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    added_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    # Serves ordered, keyset-paginated reads and neighbour lookups within one playlist.
+    __table_args__ = (Index("ix_playlist_items_playlist_position", "playlist_id", "position", "id"),)
@@ -1,8 +1,9 @@
 from datetime import datetime
 from pathlib import Path
-from sqlalchemy import String, Integer, DateTime, Float
+from sqlalchemy import String, Integer, DateTime, Float, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
+from app.storage import stored_path
 
 
 class Song(Base):
@@ -13,7 +14,22 @@ class Song(Base):
     title: Mapped[str] = mapped_column(String(512), nullable=False, default="")
     artist: Mapped[str] = mapped_column(String(512), nullable=False, default="")
     duration_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)  # listing order
+    # Bumped by every UPDATE (ORM or Core); delta sync (app.services.catalog.catalog_changes) keys on it.
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
+    # Denormalized COUNT of song_loves, kept in step by the love/unlove endpoints.
+    love_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0", index=True)
+    # Audio analysis (see app.services.audio_analysis). Peaks are deferred so listings never load them.
+    waveform_peaks: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    loudness_lufs: Mapped[float | None] = mapped_column(Float, nullable=True)
+    replay_gain_db: Mapped[float | None] = mapped_column(Float, nullable=True)
+    peak_amplitude: Mapped[float | None] = mapped_column(Float, nullable=True)
+    analyzed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Tag re-scan state (see app.services.metadata_backfill)
+    metadata_scanned_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    metadata_error: Mapped[str | None] = mapped_column(String(255), nullable=True)
 
     def path_for(self, upload_root: Path) -> Path:
-        return upload_root / self.filename
+        return stored_path(upload_root, self.filename)
@@ -9,7 +9,12 @@ class SongLove(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id"), nullable=False)
+    # user_id lookups use the (user_id, song_id) unique index; song_id needs its own.
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id"), nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    __table_args__ = (UniqueConstraint("user_id", "song_id", name="unique_user_song_love"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "song_id", name="unique_user_song_love"),
+        # Never reuse ids: rollups fold by id (see app.services.rollups).
+        {"sqlite_autoincrement": True},
+    )
@@ -0,0 +1,48 @@
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class SongDailyStats(Base):
+    """Plays and new loves per song per (UTC) day, maintained by app.services.rollups."""
+
+    __tablename__ = "song_daily_stats"
+
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    loves: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SongPlayTotal(Base):
+    """All-time plays per song (the sum of its song_daily_stats.plays), maintained by
+    app.services.rollups so the all-time chart reads an index instead of every bucket."""
+
+    __tablename__ = "song_play_totals"
+
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id"), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False, default=0, index=True)
+
+
+class ChartEntry(Base):
+    """Materialized top-N list: one row per (chart, rank), rebuilt on each rollup refresh."""
+
+    __tablename__ = "chart_entries"
+
+    chart: Mapped[str] = mapped_column(String(32), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.id"), nullable=False, index=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class RollupWatermark(Base):
+    """Highest source row id already folded into the rollups, per source table."""
+
+    __tablename__ = "rollup_watermarks"
+
+    source: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,13 @@
+from datetime import datetime
+from sqlalchemy import DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class SongTombstone(Base):
+    """A deleted song's id, kept for delta sync (GET /api/songs/changes) until it ages out."""
+
+    __tablename__ = "song_tombstones"
+
+    song_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, index=True)
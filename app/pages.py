@@ -0,0 +1,82 @@
+"""
+Cached HTML shells for the player and admin pages.
+
+The pages do not depend on the request, so each is rendered once and kept in memory
+with its ETag. An entry is reused while the template files' mtimes and ``BUILD_SHA``
+are unchanged; ``invalidate_pages()`` drops everything when app settings change, and
+entries older than ``PAGE_CACHE_SECONDS`` are re-rendered so other worker processes
+pick up such changes too.
+
+The player shell inlines ``allow_registration``, which the login form needs before anyone
+signs in, as JSON in ``#boot-data``. Only public settings go there: the shell is served to
+anonymous visitors and cached.
+"""
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import select
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.compression import strip_etag_coding
+from app.config import get_settings
+
+
+class RenderedPage(NamedTuple):
+    key: tuple
+    body: bytes
+    etag: str
+    rendered_at: float
+
+
+_cache: dict[str, RenderedPage] = {}
+
+
+def invalidate_pages() -> None:
+    _cache.clear()
+
+
+def _cache_key(templates: Jinja2Templates) -> tuple:
+    """Template mtimes (a page and the base it extends) plus the deployed build."""
+    mtimes = []
+    for directory in templates.env.loader.searchpath:
+        mtimes.extend((p.name, p.stat().st_mtime_ns) for p in sorted(Path(directory).glob("*.html")))
+    return os.environ.get("BUILD_SHA", "unknown"), tuple(mtimes)
+
+
+async def load_boot_data() -> dict:
+    """Public settings the player needs before login."""
+    from app.database import get_session_factory
+    from app.models import AppSettings
+
+    async with get_session_factory()() as db:
+        row = (await db.execute(select(AppSettings).limit(1))).scalar_one_or_none()
+    return {
+        "allow_registration": bool(row.allow_registration) if row else get_settings().allow_registration,
+    }
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [strip_etag_coding(t.strip().removeprefix("W/")) for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def render_page(request: Request, templates: Jinja2Templates, name: str, boot: bool = False) -> Response:
+    key = _cache_key(templates)
+    max_age = get_settings().page_cache_seconds
+    page = _cache.get(name)
+    if page is None or page.key != key or time.monotonic() - page.rendered_at >= max_age:
+        context = {"boot": await load_boot_data() if boot else None}
+        body = templates.get_template(name).render(context).encode()
+        page = RenderedPage(key, body, f'"{hashlib.sha256(body).hexdigest()[:20]}"', time.monotonic())
+        if max_age > 0:
+            _cache[name] = page
+    # Revalidate every time: the shell changes on deploy and when settings change.
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(page.body, media_type="text/html", headers=headers)
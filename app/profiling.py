@@ -0,0 +1,140 @@
+"""
+Opt-in per-request profiling and the slow-request log.
+
+A request is profiled when an admin sends ``X-Profile: 1`` (checked against the role claim
+of the bearer token) or when it is sampled at ``PROFILE_SAMPLE_RATE``. Its cProfile stats and
+the SQL statements it ran (with timings) are kept in a small in-memory ring buffer, listed at
+``/api/admin/profiles``; the response carries ``X-Profile-Id``. cProfile is per thread, so only
+one request is profiled at a time and other coroutines running meanwhile show up in its stats.
+
+Independently, any request slower than ``SLOW_REQUEST_MS`` is logged with its SQL count.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+from collections import deque
+from datetime import datetime
+from itertools import count
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.metrics import RequestStats, current_request_stats, route_label
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+# Lines of pstats output kept per profile.
+PROFILE_STATS_LINES = 40
+
+_profiles: deque[dict] = deque(maxlen=get_settings().profile_buffer_size)
+_ids = count(1)
+_profiling = False
+
+
+def get_profiles() -> list[dict]:
+    """Captured profiles, newest first."""
+    return list(reversed(_profiles))
+
+
+def get_profile(profile_id: int) -> dict | None:
+    for profile in _profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def _wants_profile(scope: Scope) -> bool:
+    from app.auth import token_role
+
+    headers = Headers(scope=scope)
+    if headers.get(PROFILE_HEADER) == "1":
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and token_role(token) == "admin"
+    rate = get_settings().profile_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+def _format_stats(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_STATS_LINES)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; install inside MetricsMiddleware so it shares the request's SQL counters."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _profiling
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        settings = get_settings()
+        stats = current_request_stats.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = current_request_stats.set(stats)
+        profiler = None
+        profile_id = None
+        if not _profiling and _wants_profile(scope):
+            _profiling = True
+            profiler = cProfile.Profile()
+            profile_id = next(_ids)
+            stats.statements = []
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile_id).encode())]
+            await send(message)
+
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if profiler is not None:
+                profiler.disable()
+                _profiling = False
+                _profiles.append({
+                    "id": profile_id,
+                    "started_at": started_at.isoformat(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_label(scope),
+                    "status": status,
+                    "duration_ms": round(elapsed_ms, 2),
+                    "sql_count": stats.queries,
+                    "sql_ms": round(stats.query_seconds * 1000, 2),
+                    "sql": [{"statement": sql, "ms": round(sec * 1000, 3)} for sql, sec in stats.statements],
+                    "profile": _format_stats(profiler),
+                })
+                stats.statements = None
+            if token is not None:
+                current_request_stats.reset(token)
+            if settings.slow_request_ms and elapsed_ms >= settings.slow_request_ms:
+                logger.warning(
+                    "Slow request: %s %s (%s) -> %d in %.0f ms, %d SQL statements (%.0f ms)%s",
+                    scope["method"],
+                    scope["path"],
+                    route_label(scope),
+                    status,
+                    elapsed_ms,
+                    stats.queries,
+                    stats.query_seconds * 1000,
+                    f", profile {profile_id}" if profile_id is not None else "",
+                )
@@ -0,0 +1,128 @@
+import json
+import os
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Callable, Mapping
+from urllib.parse import quote
+
+import anyio
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.storage import is_missing_object
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; falls back to the stdlib encoder
+    orjson = None
+
+
+def dumps_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson (stdlib json if it is not installed).
+
+    For list endpoints that build plain dicts themselves: skips FastAPI's per-item
+    response-model validation and serializes ~10x faster than the default path.
+    The route keeps its `response_model` for the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+
+class StoredFileResponse(FileResponse):
+    """FileResponse for uploaded files whose presence is tracked by the storage reconciler.
+
+    Routes do not stat the file up front: the stat Starlette needs for Content-Length is
+    done here, and a missing file becomes a 404 (reported through `on_missing`) instead of
+    a server error.
+    """
+
+    def __init__(self, *args, on_missing: Callable[[], None] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_missing = on_missing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                if self.on_missing is not None:
+                    self.on_missing()
+                await JSONResponse({"detail": "File not found"}, status_code=404)(scope, receive, send)
+                return
+            self.set_stat_headers(self.stat_result)
+        await super().__call__(scope, receive, send)
+
+
+class S3ObjectResponse(Response):
+    """Stream an object from an S3-compatible store, passing the client's Range header through."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        range_header: str | None = None,
+        media_type: str | None = None,
+        headers: Mapping[str, str] | None = None,
+        filename: str | None = None,
+        on_missing: Callable[[], None] | None = None,
+    ):
+        super().__init__(media_type=media_type, headers=headers)
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.range_header = range_header
+        self.on_missing = on_missing
+        if filename is not None:
+            self.headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        kwargs = {"Bucket": self.bucket, "Key": self.key}
+        if self.range_header:
+            kwargs["Range"] = self.range_header
+        try:
+            obj = await anyio.to_thread.run_sync(lambda: self.client.get_object(**kwargs))
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if is_missing_object(e):
+                if self.on_missing is not None:
+                    self.on_missing()
+                await JSONResponse({"detail": "File not found"}, status_code=404)(scope, receive, send)
+                return
+            if code == "InvalidRange":
+                await Response(status_code=416)(scope, receive, send)
+                return
+            raise
+        self.headers["content-length"] = str(obj["ContentLength"])
+        self.headers["accept-ranges"] = "bytes"
+        if obj.get("ETag"):
+            self.headers["etag"] = obj["ETag"]
+        if obj.get("LastModified"):
+            self.headers["last-modified"] = format_datetime(obj["LastModified"].astimezone(timezone.utc), usegmt=True)
+        status_code = 200
+        if obj.get("ContentRange"):
+            status_code = 206
+            self.headers["content-range"] = obj["ContentRange"]
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        body = obj["Body"]
+        try:
+            if scope["method"].upper() != "HEAD":
+                while True:
+                    chunk = await anyio.to_thread.run_sync(body.read, self.chunk_size)
+                    if not chunk:
+                        break
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            body.close()
@@ -1,22 +1,36 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.auth import get_current_admin
-from app.models import User, Song, BackgroundImage, SongLove
+from app.metrics import UPLOAD_SIZE
+from app.responses import ORJSONResponse
+from app.models import User, Song, BackgroundImage
 from app.services.song_service import (
     list_songs,
     get_song_by_id,
     create_song_from_upload,
     delete_song as delete_song_service,
+    delete_songs,
+    store_upload,
+    update_songs,
     safe_extension,
 )
+from app.services.catalog import mark_catalog_changed
+from app.services.jobs import ACTIVE_STATUSES, FAILED, enqueue, get_active_job, get_job_queue, get_latest_job
+from app.services.metadata_backfill import BackfillProgress
 from app.config import get_settings
 
 router = APIRouter(prefix="/api/admin/songs", tags=["admin"])
 
+# Max ids per bulk request (keeps IN lists under SQLite's variable limit).
+MAX_BULK_IDS = 5000
+MAX_BATCH_FILES = 200
+INVALID_FILE_DETAIL = "Invalid or missing file. Allowed: mp3, m4a, ogg, wav, flac"
+
 
 class SongOut(BaseModel):
     id: int
@@ -25,34 +39,34 @@ class SongOut(BaseModel):
     duration_seconds: float | None
     filename: str
     love_count: int = 0
+    metadata_error: str | None = None
 
     @classmethod
-    def from_orm_song(cls, s: Song, love_count: int = 0) -> "SongOut":
-        return cls(
-            id=s.id,
-            title=s.title,
-            artist=s.artist,
-            duration_seconds=s.duration_seconds,
-            filename=s.filename,
-            love_count=love_count,
-        )
+    def from_orm_song(cls, s: Song, love_count: int | None = None) -> "SongOut":
+        return cls(**cls.row(s, love_count=love_count))
+
+    @staticmethod
+    def row(s: Song, love_count: int | None = None) -> dict:
+        """Plain dict with the model's fields, for ORJSONResponse listings."""
+        return {
+            "id": s.id,
+            "title": s.title,
+            "artist": s.artist,
+            "duration_seconds": s.duration_seconds,
+            "filename": s.filename,
+            "love_count": s.love_count if love_count is None else love_count,
+            "metadata_error": s.metadata_error,
+        }
 
 
 @router.get("", response_model=list[SongOut])
 async def admin_list_songs(
     search: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_admin),
 ):
     songs = await list_songs(db, search=search)
-    result = []
-    for song in songs:
-        love_count_result = await db.execute(
-            select(func.count(SongLove.id)).where(SongLove.song_id == song.id)
-        )
-        love_count = love_count_result.scalar() or 0
-        result.append(SongOut.from_orm_song(song, love_count=love_count))
-    return result
+    return ORJSONResponse([SongOut.row(song) for song in songs])
 
 
 @router.post("", response_model=SongOut)
@@ -62,18 +76,151 @@ async def upload_song(
     user: User = Depends(get_current_admin),
 ):
     if not file.filename or not safe_extension(file.filename):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid or missing file. Allowed: mp3, m4a, ogg, wav, flac",
-        )
-    content = await file.read()
-    if not content:
+        raise HTTPException(status_code=400, detail=INVALID_FILE_DETAIL)
+    if not file.size:
         raise HTTPException(status_code=400, detail="Empty file")
+    UPLOAD_SIZE.labels("song").observe(file.size)
     try:
-        song = await create_song_from_upload(db, file.filename, content)
-        return SongOut.from_orm_song(song)
+        # Stream the spooled upload to storage instead of reading it into memory.
+        song = await create_song_from_upload(db, file.filename, file.file, file.content_type)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    mark_catalog_changed(db)
+    if get_settings().analyze_on_upload:
+        await enqueue(db, "analyze_songs", {"song_ids": [song.id]}, created_by=user.id)
+    await db.commit()
+    get_job_queue().notify()
+    return SongOut.from_orm_song(song)
+
+
+class UploadError(BaseModel):
+    filename: str
+    detail: str
+
+
+class BatchUploadOut(BaseModel):
+    created: list[SongOut]
+    errors: list[UploadError]
+
+
+@router.post("/batch", response_model=BatchUploadOut)
+async def upload_songs(
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Upload many songs: files are stored `UPLOAD_CONCURRENCY` at a time, rows added in one
+    transaction. Invalid files are reported in `errors` and do not fail the others."""
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per request")
+    limit = asyncio.Semaphore(max(1, get_settings().upload_concurrency))
+
+    async def store(file: UploadFile) -> Song:
+        if not file.filename or not safe_extension(file.filename):
+            raise ValueError(INVALID_FILE_DETAIL)
+        if not file.size:
+            raise ValueError("Empty file")
+        UPLOAD_SIZE.labels("song").observe(file.size)
+        async with limit:
+            return await store_upload(file.filename, file.file, file.content_type)
+
+    results = await asyncio.gather(*(store(f) for f in files), return_exceptions=True)
+    songs, errors = [], []
+    for file, result in zip(files, results):
+        if isinstance(result, ValueError):
+            errors.append(UploadError(filename=file.filename or "", detail=str(result)))
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            songs.append(result)
+    db.add_all(songs)
+    await db.flush()
+    if songs:
+        mark_catalog_changed(db)
+    if songs and get_settings().analyze_on_upload:
+        await enqueue(db, "analyze_songs", {"song_ids": [song.id for song in songs]}, created_by=user.id)
+    await db.commit()
+    get_job_queue().notify()
+    return BatchUploadOut(created=[SongOut.from_orm_song(s, love_count=0) for s in songs], errors=errors)
+
+
+class BulkIds(BaseModel):
+    song_ids: list[int] = Field(min_length=1, max_length=MAX_BULK_IDS)
+
+
+class BulkEdit(BulkIds):
+    title: str | None = None
+    artist: str | None = None
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_songs(
+    data: BulkIds,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Delete many songs in one transaction; a job queued in the same transaction removes their files."""
+    deleted = await delete_songs(db, data.song_ids)
+    if deleted:
+        mark_catalog_changed(db)
+        await enqueue(db, "delete_song_files", {"filenames": list(deleted.values())}, created_by=user.id)
+    await db.commit()
+    get_job_queue().notify()
+    return {"deleted": len(deleted), "missing": sorted(set(data.song_ids) - deleted.keys())}
+
+
+@router.post("/bulk-edit")
+async def bulk_edit_songs(
+    data: BulkEdit,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Set title and/or artist on many songs with one UPDATE (blank values are ignored, as in PATCH)."""
+    values = {
+        field: value.strip()
+        for field, value in (("title", data.title), ("artist", data.artist))
+        if value is not None and value.strip()
+    }
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    updated = await update_songs(db, data.song_ids, values)
+    mark_catalog_changed(db)
+    await db.commit()
+    return {"updated": len(updated), "missing": sorted(set(data.song_ids) - set(updated))}
+
+
+def _backfill_status(job) -> dict:
+    """The backfill's progress fields plus its job id and status (the latest run)."""
+    if job is None:
+        return {**BackfillProgress().as_dict(), "job_id": None, "status": None}
+    status_fields = {**BackfillProgress().as_dict(), **(job.progress or {})}
+    status_fields["running"] = job.status in ACTIVE_STATUSES
+    if job.status == FAILED:
+        status_fields["error"] = job.error
+    return {**status_fields, "job_id": job.id, "status": job.status}
+
+
+@router.post("/metadata-backfill", status_code=status.HTTP_202_ACCEPTED)
+async def start_backfill(
+    retry_failed: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Queue a re-scan of tags of songs without a duration; poll GET (or /api/admin/jobs) for progress."""
+    if await get_active_job(db, "metadata_backfill") is not None:
+        raise HTTPException(status_code=409, detail="Metadata backfill already running")
+    job = await enqueue(db, "metadata_backfill", {"retry_failed": retry_failed}, created_by=user.id)
+    await db.commit()
+    get_job_queue().notify()
+    return _backfill_status(job)
+
+
+@router.get("/metadata-backfill")
+async def backfill_status(
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_admin),
+):
+    return _backfill_status(await get_latest_job(db, "metadata_backfill"))
 
 
 class SongUpdate(BaseModel):
@@ -95,6 +242,7 @@ async def update_song(
         song.title = update_data.title.strip() if update_data.title.strip() else song.title
     if update_data.artist is not None:
         song.artist = update_data.artist.strip() if update_data.artist.strip() else song.artist
+    mark_catalog_changed(db)
     await db.commit()
     await db.refresh(song)
     return SongOut.from_orm_song(song)
@@ -106,8 +254,13 @@ async def delete_song(
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_admin),
 ):
+    """Delete a song; a job queued in the same transaction removes its file after the commit."""
     song = await get_song_by_id(db, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     await delete_song_service(db, song)
+    mark_catalog_changed(db)
+    await enqueue(db, "delete_song_files", {"filenames": [song.filename]}, created_by=user.id)
+    await db.commit()
+    get_job_queue().notify()
     return {"ok": True}
@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.auth import authenticate_user, create_access_token, get_current_user, get_user_by_username, hash_password
 from app.models import User, UserRole, AppSettings
 
@@ -62,7 +62,7 @@ async def login(
 
 
 @router.get("/registration-allowed")
-async def registration_allowed(db: AsyncSession = Depends(get_db)):
+async def registration_allowed(db: AsyncSession = Depends(get_read_db)):
     """Public: whether new users can sign up (so the player can show/hide Sign up)."""
     return {"allow_registration": await _get_allow_registration(db)}
 
@@ -1,15 +1,16 @@
 from pathlib import Path
 from uuid import uuid4
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.auth import get_current_admin
+from app.metrics import UPLOAD_SIZE, UPLOAD_STORE_DURATION
 from app.models import BackgroundImage
-from app.config import get_settings
+from app.storage import get_image_storage
+from app.services.storage_reconciler import is_image_file_missing, mark_image_file_missing
 
 router = APIRouter(prefix="/api/admin/backgrounds", tags=["admin"])
 
@@ -33,7 +34,7 @@ class BackgroundImageOut(BaseModel):
 
 @router.get("", response_model=list[BackgroundImageOut])
 async def list_backgrounds(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user = Depends(get_current_admin),
 ):
     result = await db.execute(select(BackgroundImage).order_by(BackgroundImage.created_at.desc()))
@@ -43,18 +44,22 @@ async def list_backgrounds(
 
 @router.get("/active")
 async def get_active_background(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(select(BackgroundImage).where(BackgroundImage.is_active == True).limit(1))
     img = result.scalar_one_or_none()
     if not img:
         raise HTTPException(status_code=404, detail="No active background")
-    settings = get_settings()
-    settings.images_dir.mkdir(parents=True, exist_ok=True)
-    path = img.path_for(settings.images_dir)
-    if not path.exists():
+    if is_image_file_missing(img.filename):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "no-store"})
+    return get_image_storage().response(
+        img.filename,
+        request,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "no-store"},
+        on_missing=lambda: mark_image_file_missing(img.filename),
+    )
 
 
 @router.post("", response_model=BackgroundImageOut)
@@ -65,15 +70,13 @@ async def upload_background(
 ):
     if not file.filename or not safe_image_extension(file.filename):
         raise HTTPException(status_code=400, detail="Invalid file. Allowed: jpg, jpeg, png, gif, webp")
-    content = await file.read()
-    if not content:
+    if not file.size:
         raise HTTPException(status_code=400, detail="Empty file")
-    settings = get_settings()
-    settings.images_dir.mkdir(parents=True, exist_ok=True)
+    UPLOAD_SIZE.labels("image").observe(file.size)
     ext = safe_image_extension(file.filename)
     stored_name = f"{uuid4().hex}{ext}"
-    dest = settings.images_dir / stored_name
-    dest.write_bytes(content)
+    with UPLOAD_STORE_DURATION.labels("image").time():
+        await get_image_storage().save(stored_name, file.file, file.content_type)
     img = BackgroundImage(filename=stored_name, is_active=False)
     db.add(img)
     await db.commit()
@@ -109,10 +112,8 @@ async def delete_background(
     img = result.scalar_one_or_none()
     if not img:
         raise HTTPException(status_code=404, detail="Image not found")
-    settings = get_settings()
-    path = img.path_for(settings.images_dir)
-    if path.exists():
-        path.unlink(missing_ok=True)
     await db.delete(img)
     await db.commit()
+    # Remove the file only after the row is gone; a failed delete leaves an orphan for the reconciler.
+    await get_image_storage().delete(img.filename)
     return {"ok": True}
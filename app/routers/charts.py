@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, get_read_db
+from app.auth import get_current_admin, get_current_viewer
+from app.models import User, Song, ChartEntry
+from app.responses import ORJSONResponse
+from app.services.rollups import CHARTS, refresh_rollups
+
+router = APIRouter(prefix="/api/charts", tags=["charts"])
+
+
+@router.get("")
+async def list_charts(
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Available charts with their size and last refresh time (null until the first rollup)."""
+    result = await db.execute(
+        select(ChartEntry.chart, func.count(), func.max(ChartEntry.refreshed_at)).group_by(ChartEntry.chart)
+    )
+    built = {chart: (size, refreshed) for chart, size, refreshed in result.all()}
+    return [
+        {
+            "name": name,
+            "description": description,
+            "size": built.get(name, (0, None))[0],
+            "refreshed_at": built[name][1].isoformat() if name in built else None,
+        }
+        for name, description in CHARTS.items()
+    ]
+
+
+@router.get("/{chart}")
+async def get_chart(
+    chart: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Top songs of a chart, read from the materialized ranks (a primary-key range, not an aggregate)."""
+    if chart not in CHARTS:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    result = await db.execute(
+        select(ChartEntry.rank, ChartEntry.score, Song)
+        .join(Song, Song.id == ChartEntry.song_id)
+        .where(ChartEntry.chart == chart, ChartEntry.rank <= limit)
+        .order_by(ChartEntry.rank)
+    )
+    return ORJSONResponse([
+        {
+            "rank": rank,
+            "score": score,
+            "id": s.id,
+            "title": s.title,
+            "artist": s.artist,
+            "duration_seconds": s.duration_seconds,
+            "filename": s.filename,
+            "love_count": s.love_count,
+        }
+        for rank, score, s in result.all()
+    ])
+
+
+@router.post("/refresh")
+async def refresh_charts(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Fold new plays and loves into the rollups and rebuild the charts now (admin)."""
+    return await refresh_rollups(db)
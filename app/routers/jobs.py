@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, get_read_db
+from app.auth import get_current_admin
+from app.models import User, Job
+from app.services.jobs import get_job_queue, job_dict
+
+router = APIRouter(prefix="/api/admin/jobs", tags=["admin"])
+
+
+async def _get_job(db: AsyncSession, job_id: int) -> Job:
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("")
+async def list_jobs(
+    kind: str | None = None,
+    status: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_admin),
+):
+    """Most recent jobs first, optionally filtered by kind and status."""
+    q = select(Job).order_by(Job.id.desc()).limit(limit)
+    if kind:
+        q = q.where(Job.kind == kind)
+    if status:
+        q = q.where(Job.status == status)
+    return [job_dict(job) for job in (await db.execute(q)).scalars()]
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_admin),
+):
+    return job_dict(await _get_job(db, job_id))
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Cancel a queued job, or a running one if it runs in this process."""
+    job = await _get_job(db, job_id)
+    if not await get_job_queue().cancel(db, job):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status} and cannot be cancelled here")
+    return {"ok": True}
@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+import time
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer
 from pydantic import BaseModel
 
-from app.database import get_db
-from app.auth import get_current_viewer
+from app.database import get_db, get_read_db
+from app.auth import get_current_viewer, create_stream_url, verify_stream_signature
 from app.models import User, Song, BackgroundImage, SongLove
-from app.services.song_service import list_songs, get_song_by_id
-from app.config import get_settings
-from sqlalchemy import func
+from app.pages import etag_matches
+from app.services.catalog import catalog_body, catalog_changes, negotiate_catalog, parse_sync_token
+from app.services.song_service import list_songs, get_song_by_id, songs_by_ids, up_next
+from app.responses import ORJSONResponse
+from app.storage import get_song_storage, get_image_storage
+from app.services.storage_reconciler import (
+    is_song_file_missing,
+    is_image_file_missing,
+    mark_song_file_missing,
+    mark_image_file_missing,
+)
 
 router = APIRouter(prefix="/api/songs", tags=["player"])
 
@@ -24,64 +35,203 @@ class SongOut(BaseModel):
     is_loved: bool = False
 
     @classmethod
-    def from_orm_song(cls, s: Song, love_count: int = 0, is_loved: bool = False) -> "SongOut":
-        return cls(
-            id=s.id,
-            title=s.title,
-            artist=s.artist,
-            duration_seconds=s.duration_seconds,
-            filename=s.filename,
-            love_count=love_count,
-            is_loved=is_loved,
-        )
+    def from_orm_song(cls, s: Song, love_count: int | None = None, is_loved: bool = False) -> "SongOut":
+        return cls(**cls.row(s, love_count=love_count, is_loved=is_loved))
+
+    @staticmethod
+    def row(s: Song, love_count: int | None = None, is_loved: bool = False) -> dict:
+        """Plain dict with the model's fields, for ORJSONResponse listings."""
+        return {
+            "id": s.id,
+            "title": s.title,
+            "artist": s.artist,
+            "duration_seconds": s.duration_seconds,
+            "filename": s.filename,
+            "love_count": s.love_count if love_count is None else love_count,
+            "is_loved": is_loved,
+        }
 
 
 @router.get("", response_model=list[SongOut])
 async def list_songs_api(
+    request: Request,
     search: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_viewer),
 ):
+    """Songs newest first. With `Accept: application/vnd.nivpro.catalog+json` (or
+    `application/msgpack`) the compact columnar catalogue instead (see app.services.catalog)."""
+    loved = set((await db.execute(select(SongLove.song_id).where(SongLove.user_id == user.id))).scalars())
+    media_type = negotiate_catalog(request.headers.get("accept", ""))
+    if media_type is not None:
+        body, etag = await catalog_body(db, media_type, list(loved), search)
+        headers = {"Vary": "Accept"}
+        if etag is not None:
+            headers.update({"ETag": etag, "Cache-Control": "private, no-cache"})
+            if etag_matches(request.headers.get("if-none-match", ""), etag):
+                return Response(status_code=304, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
+    # Two queries whatever the library size: love counts are on the song rows.
     songs = await list_songs(db, search=search)
-    result = []
+    return ORJSONResponse([SongOut.row(song, is_loved=song.id in loved) for song in songs], headers={"Vary": "Accept"})
+
+
+class SongChangesOut(BaseModel):
+    next: str
+    reset: bool
+    songs: list[SongOut]
+    deleted: list[int]
+
+
+@router.get("/changes", response_model=SongChangesOut)
+async def song_changes(
+    since: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Delta sync: songs added or changed and ids deleted since the `next` token of the previous
+    call. `reset: true` means refetch the full list (GET /api/songs), then sync from `next`."""
+    try:
+        since_at = parse_sync_token(since) if since is not None else None
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return ORJSONResponse(await catalog_changes(db, since_at, user.id))
+
+
+class UpNextOut(SongOut):
+    stream_url: str
+    expires: int
+
+
+@router.get("/up-next", response_model=list[UpNextOut])
+async def get_up_next(
+    after: int | None = None,
+    count: int = Query(3, ge=1, le=20),
+    shuffle: int | None = Query(None, ge=0, le=0xFFFFFFFF),
+    search: str | None = None,
+    ids: list[int] | None = Query(None, max_length=20),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """The next `count` songs after song `after` in the player's order (listing order, or the
+    shuffle order for seed `shuffle`; same `search` filter), each with a signed stream URL so the
+    player can start fetching the next track before the current one ends. The first track's URL
+    is also sent as `Link: rel=preload` (proxies/CDNs can turn it into 103 Early Hints).
+
+    A client that already has its order (the shuffled player) sends the songs it wants as `ids`
+    instead; the other parameters are then ignored."""
+    if ids:
+        songs = await songs_by_ids(db, ids)
+    else:
+        songs = await up_next(db, after, count, seed=shuffle, search=search)
+    loved = set()
+    if songs:
+        loved = set((await db.execute(
+            select(SongLove.song_id).where(SongLove.user_id == user.id, SongLove.song_id.in_([s.id for s in songs]))
+        )).scalars())
+    rows = []
     for song in songs:
-        # Get love count
-        love_count_result = await db.execute(
-            select(func.count(SongLove.id)).where(SongLove.song_id == song.id)
-        )
-        love_count = love_count_result.scalar() or 0
-        # Check if current user loved it
-        user_love_result = await db.execute(
-            select(SongLove).where(SongLove.song_id == song.id, SongLove.user_id == user.id).limit(1)
-        )
-        is_loved = user_love_result.scalar_one_or_none() is not None
-        result.append(SongOut.from_orm_song(song, love_count=love_count, is_loved=is_loved))
-    return result
+        url, expires = create_stream_url(song.filename)
+        rows.append({**SongOut.row(song, is_loved=song.id in loved), "stream_url": url, "expires": expires})
+    headers = {"Link": f'<{rows[0]["stream_url"]}>; rel=preload; as=audio'} if rows else None
+    return ORJSONResponse(rows, headers=headers)
 
 
 @router.get("/{song_id}/stream")
 async def stream_song(
     song_id: int,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_viewer),
 ):
     song = await get_song_by_id(db, song_id)
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
-    settings = get_settings()
-    path = song.path_for(settings.upload_dir)
-    if not path.exists():
+    if is_song_file_missing(song.filename):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(
-        path,
+    return get_song_storage().response(
+        song.filename,
+        request,
         media_type="audio/mpeg",
-        filename=song.title or song.filename,
+        download_name=song.title or song.filename,
+        on_missing=lambda: mark_song_file_missing(song.filename),
+    )
+
+
+@router.get("/{song_id}/stream-url")
+async def get_stream_url(
+    song_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Mint a signed, expiring URL the <audio> element can use directly (range requests skip auth and DB)."""
+    song = await get_song_by_id(db, song_id)
+    if not song:
+        raise HTTPException(status_code=404, detail="Song not found")
+    url, expires = create_stream_url(song.filename)
+    return {"url": url, "expires": expires}
+
+
+@router.get("/signed/{filename}")
+async def stream_signed(filename: str, expires: int, sig: str, request: Request):
+    """Serve a song file from a signed URL; validated in memory, no DB queries."""
+    if Path(filename).name != filename or not verify_stream_signature(filename, expires, sig):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired link")
+    if is_song_file_missing(filename):
+        raise HTTPException(status_code=404, detail="File not found")
+    max_age = max(0, expires - int(time.time()))
+    return get_song_storage().response(
+        filename,
+        request,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": f"private, max-age={max_age}"},
+        on_missing=lambda: mark_song_file_missing(filename),
+    )
+
+
+class SongAnalysisOut(BaseModel):
+    song_id: int
+    peaks: list[int]
+    loudness_lufs: float | None
+    replay_gain_db: float | None
+    peak_amplitude: float | None
+
+
+@router.get("/{song_id}/analysis", response_model=SongAnalysisOut)
+async def get_song_analysis(
+    song_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Waveform peaks (0-255 per bucket) and loudness/ReplayGain; cacheable until re-analyzed."""
+    result = await db.execute(
+        select(Song).where(Song.id == song_id).options(undefer(Song.waveform_peaks))
+    )
+    song = result.scalar_one_or_none()
+    if not song:
+        raise HTTPException(status_code=404, detail="Song not found")
+    if song.analyzed_at is None or song.waveform_peaks is None:
+        raise HTTPException(status_code=404, detail="Analysis not available")
+    etag = f'"a{song.id}-{int(song.analyzed_at.timestamp())}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return SongAnalysisOut(
+        song_id=song.id,
+        peaks=list(song.waveform_peaks),
+        loudness_lufs=song.loudness_lufs,
+        replay_gain_db=song.replay_gain_db,
+        peak_amplitude=song.peak_amplitude,
     )
 
 
 @router.get("/background/active")
 async def get_active_background(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_viewer),
 ):
     """Get the active background image (public for authenticated users)"""
@@ -89,17 +239,21 @@ async def get_active_background(
     img = result.scalar_one_or_none()
     if not img:
         raise HTTPException(status_code=404, detail="No active background")
-    settings = get_settings()
-    settings.images_dir.mkdir(parents=True, exist_ok=True)
-    path = img.path_for(settings.images_dir)
-    if not path.exists():
+    if is_image_file_missing(img.filename):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "no-store"})
+    return get_image_storage().response(
+        img.filename,
+        request,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "no-store"},
+        on_missing=lambda: mark_image_file_missing(img.filename),
+    )
 
 
 @router.get("/background/random")
 async def get_random_background(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_viewer),
 ):
     """Get a random background image (for auto-change feature)"""
@@ -109,17 +263,20 @@ async def get_random_background(
     if not images:
         raise HTTPException(status_code=404, detail="No backgrounds available")
     img = random.choice(images)
-    settings = get_settings()
-    settings.images_dir.mkdir(parents=True, exist_ok=True)
-    path = img.path_for(settings.images_dir)
-    if not path.exists():
+    if is_image_file_missing(img.filename):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "no-store"})
+    return get_image_storage().response(
+        img.filename,
+        request,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "no-store"},
+        on_missing=lambda: mark_image_file_missing(img.filename),
+    )
 
 
 @router.get("/settings/auto-change-bg")
 async def get_auto_change_setting(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_viewer),
 ):
     """Get auto-change background setting (for players)"""
@@ -147,6 +304,7 @@ async def love_song(
         return {"loved": True, "message": "Already loved"}
     love = SongLove(user_id=user.id, song_id=song_id)
     db.add(love)
+    await db.execute(update(Song).where(Song.id == song_id).values(love_count=Song.love_count + 1))
     await db.commit()
     return {"loved": True}
 
@@ -165,5 +323,8 @@ async def unlove_song(
     if not love:
         return {"loved": False, "message": "Not loved"}
     await db.delete(love)
+    await db.execute(
+        update(Song).where(Song.id == song_id, Song.love_count > 0).values(love_count=Song.love_count - 1)
+    )
     await db.commit()
     return {"loved": False}
@@ -0,0 +1,227 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+
+from app.database import get_db, get_read_db
+from app.auth import get_current_viewer
+from app.models import User, Playlist
+from app.responses import ORJSONResponse
+from app.services.playlist_service import (
+    add_items,
+    count_items,
+    delete_playlist as delete_playlist_service,
+    get_user_playlist,
+    list_items,
+    list_user_playlists,
+    move_items,
+    remove_items,
+)
+
+router = APIRouter(prefix="/api/playlists", tags=["playlists"])
+
+# Max ids per bulk request (keeps IN lists under SQLite's variable limit).
+MAX_BULK_ITEMS = 5000
+
+
+class PlaylistOut(BaseModel):
+    id: int
+    name: str
+    item_count: int = 0
+    created_at: str
+    updated_at: str
+
+    @classmethod
+    def from_orm_playlist(cls, p: Playlist, item_count: int = 0) -> "PlaylistOut":
+        return cls(
+            id=p.id,
+            name=p.name,
+            item_count=item_count,
+            created_at=p.created_at.isoformat() if p.created_at else "",
+            updated_at=p.updated_at.isoformat() if p.updated_at else "",
+        )
+
+
+class PlaylistIn(BaseModel):
+    name: str = Field(min_length=1, max_length=255)
+
+
+class PlaylistItemOut(BaseModel):
+    id: int
+    song_id: int
+    title: str
+    artist: str
+    duration_seconds: float | None
+    filename: str
+    added_at: str
+
+
+class PlaylistItemsPage(BaseModel):
+    items: list[PlaylistItemOut]
+    # Pass as `after` to get the next page; null on the last page.
+    next_cursor: str | None
+
+
+class ItemsAdd(BaseModel):
+    song_ids: list[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+    # Insert before this item; null appends to the end.
+    before_item_id: int | None = None
+
+
+class ItemsRemove(BaseModel):
+    item_ids: list[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class ItemsMove(BaseModel):
+    item_ids: list[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+    before_item_id: int | None = None
+
+
+async def _get_own_playlist(db: AsyncSession, playlist_id: int, user: User) -> Playlist:
+    playlist = await get_user_playlist(db, playlist_id, user.id)
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    return playlist
+
+
+def _parse_cursor(after: str | None) -> tuple[int, int] | None:
+    if after is None:
+        return None
+    try:
+        position, item_id = after.split(".", 1)
+        return int(position), int(item_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("", response_model=list[PlaylistOut])
+async def list_playlists(
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    return [PlaylistOut.from_orm_playlist(p, n) for p, n in await list_user_playlists(db, user.id)]
+
+
+@router.post("", response_model=PlaylistOut, status_code=status.HTTP_201_CREATED)
+async def create_playlist(
+    data: PlaylistIn,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_viewer),
+):
+    playlist = Playlist(user_id=user.id, name=data.name.strip() or data.name)
+    db.add(playlist)
+    await db.commit()
+    await db.refresh(playlist)
+    return PlaylistOut.from_orm_playlist(playlist)
+
+
+@router.get("/{playlist_id}", response_model=PlaylistOut)
+async def get_playlist(
+    playlist_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    return PlaylistOut.from_orm_playlist(playlist, await count_items(db, playlist.id))
+
+
+@router.patch("/{playlist_id}", response_model=PlaylistOut)
+async def rename_playlist(
+    playlist_id: int,
+    data: PlaylistIn,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_viewer),
+):
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    playlist.name = data.name.strip() or playlist.name
+    playlist.updated_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(playlist)
+    return PlaylistOut.from_orm_playlist(playlist, await count_items(db, playlist.id))
+
+
+@router.delete("/{playlist_id}")
+async def delete_playlist(
+    playlist_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_viewer),
+):
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    await delete_playlist_service(db, playlist)
+    await db.commit()
+    return {"ok": True}
+
+
+@router.get("/{playlist_id}/items", response_model=PlaylistItemsPage)
+async def get_playlist_items(
+    playlist_id: int,
+    after: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Items in order with song metadata, one joined query per page (keyset pagination)."""
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    rows = await list_items(db, playlist.id, _parse_cursor(after), limit)
+    items = [
+        {
+            "id": r.id,
+            "song_id": r.song_id,
+            "title": r.title,
+            "artist": r.artist,
+            "duration_seconds": r.duration_seconds,
+            "filename": r.filename,
+            "added_at": r.added_at.isoformat() if r.added_at else "",
+        }
+        for r in rows
+    ]
+    next_cursor = f"{rows[-1].position}.{rows[-1].id}" if len(rows) == limit else None
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@router.post("/{playlist_id}/items")
+async def add_playlist_items(
+    playlist_id: int,
+    data: ItemsAdd,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Add songs in the given order, before `before_item_id` or at the end (one transaction)."""
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    try:
+        added = await add_items(db, playlist, data.song_ids, data.before_item_id)
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    return {"added": added}
+
+
+@router.post("/{playlist_id}/items/remove")
+async def remove_playlist_items(
+    playlist_id: int,
+    data: ItemsRemove,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_viewer),
+):
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    removed = await remove_items(db, playlist, data.item_ids)
+    await db.commit()
+    return {"removed": removed}
+
+
+@router.post("/{playlist_id}/items/move")
+async def move_playlist_items(
+    playlist_id: int,
+    data: ItemsMove,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_viewer),
+):
+    """Move items (in the given order) before `before_item_id` or to the end; only moved rows are written."""
+    playlist = await _get_own_playlist(db, playlist_id, user)
+    try:
+        moved = await move_items(db, playlist, data.item_ids, data.before_item_id)
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    return {"moved": moved}
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+
+from app.database import get_db, get_read_db
+from app.auth import get_current_viewer
+from app.models import User, Song, PlayEvent
+from app.services.play_events import get_play_event_buffer
+
+router = APIRouter(prefix="/api/plays", tags=["player"])
+
+
+class PlayEventIn(BaseModel):
+    song_id: int
+    event: Literal["start", "progress", "complete"]
+    position_seconds: float | None = Field(default=None, ge=0)
+    # Client clock; events are batched client-side too, so the receive time can be late.
+    occurred_at: datetime | None = None
+
+
+class PlayEventsIn(BaseModel):
+    events: list[PlayEventIn] = Field(min_length=1, max_length=100)
+
+
+class PlayHistoryOut(BaseModel):
+    song_id: int
+    title: str
+    artist: str
+    event: str
+    position_seconds: float | None
+    occurred_at: str
+
+
+def _occurred_at(client_time: datetime | None, now: datetime) -> datetime:
+    """Naive UTC like the rest of the DB; never later than the server clock."""
+    if client_time is None:
+        return now
+    if client_time.tzinfo is not None:
+        client_time = client_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(client_time, now)
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def record_plays(
+    data: PlayEventsIn,
+    user: User = Depends(get_current_viewer),
+):
+    """Queue play events; they are written in batches shortly after (see app.services.play_events)."""
+    now = datetime.utcnow()
+    events = [
+        {
+            "user_id": user.id,
+            "song_id": e.song_id,
+            "event": e.event,
+            "position_seconds": e.position_seconds,
+            "occurred_at": _occurred_at(e.occurred_at, now),
+        }
+        for e in data.events
+    ]
+    if not get_play_event_buffer().add(events):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Play event queue is full, retry later",
+            headers={"Retry-After": "5"},
+        )
+    return {"accepted": len(events)}
+
+
+@router.get("/recent", response_model=list[PlayHistoryOut])
+async def recent_plays(
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_viewer),
+):
+    """The current user's latest play starts (written events only; the queue flushes every few seconds)."""
+    result = await db.execute(
+        select(PlayEvent.song_id, Song.title, Song.artist, PlayEvent.event, PlayEvent.position_seconds, PlayEvent.occurred_at)
+        .join(Song, Song.id == PlayEvent.song_id)
+        .where(PlayEvent.user_id == user.id, PlayEvent.event == "start")
+        .order_by(PlayEvent.occurred_at.desc(), PlayEvent.id.desc())
+        .limit(limit)
+    )
+    return [
+        PlayHistoryOut(
+            song_id=r.song_id,
+            title=r.title,
+            artist=r.artist,
+            event=r.event,
+            position_seconds=r.position_seconds,
+            occurred_at=r.occurred_at.isoformat(),
+        )
+        for r in result.all()
+    ]
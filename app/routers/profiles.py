@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth import get_current_admin
+from app.models import User
+from app.profiling import get_profile, get_profiles
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["admin"])
+
+
+@router.get("")
+async def list_profiles(user: User = Depends(get_current_admin)):
+    """Recently captured request profiles (newest first), without the stats text and SQL."""
+    return [
+        {k: v for k, v in profile.items() if k not in ("profile", "sql")}
+        for profile in get_profiles()
+    ]
+
+
+@router.get("/{profile_id}")
+async def profile_detail(profile_id: int, user: User = Depends(get_current_admin)):
+    """One profile: cProfile stats (cumulative) and every SQL statement with its time."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
@@ -8,6 +8,7 @@ from app.config import get_settings as get_config
 from app.database import get_db
 from app.auth import get_current_admin
 from app.models import AppSettings
+from app.pages import invalidate_pages
 
 router = APIRouter(prefix="/api/admin/settings", tags=["admin"])
 
@@ -64,6 +65,7 @@ async def update_settings(
             setattr(settings, "allow_registration", bool(update_data.allow_registration))
         await db.commit()
         await db.refresh(settings)
+        invalidate_pages()
         return SettingsOut(
             auto_change_background=bool(settings.auto_change_background),
             allow_registration=bool(getattr(settings, "allow_registration", get_config().allow_registration)),
@@ -83,6 +85,7 @@ async def update_settings(
                         settings.auto_change_background = bool(update_data.auto_change_background)
                     await db.commit()
                     await db.refresh(settings)
+                    invalidate_pages()
                     return SettingsOut(
                         auto_change_background=bool(settings.auto_change_background),
                         allow_registration=bool(getattr(settings, "allow_registration", True)),
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.auth import get_current_admin
+from app.models import User
+from app.services.storage_reconciler import get_last_report, reconcile_storage
+
+router = APIRouter(prefix="/api/admin/storage", tags=["admin"])
+
+
+@router.get("/reconcile")
+async def last_reconcile_report(user: User = Depends(get_current_admin)):
+    """Report from the most recent reconcile pass (periodic or manual)."""
+    report = get_last_report()
+    if report is None:
+        raise HTTPException(status_code=404, detail="No reconcile has run yet")
+    return report.as_dict()
+
+
+@router.post("/reconcile")
+async def run_reconcile(
+    collect: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_admin),
+):
+    """Diff upload/images directories against the DB now; `collect=true` deletes old orphan files."""
+    report = await reconcile_storage(db, collect=collect)
+    return report.as_dict()
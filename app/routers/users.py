@@ -3,9 +3,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.auth import get_current_admin
 from app.models import User
+from app.responses import ORJSONResponse
+from app.services.play_events import delete_user_plays
+from app.services.playlist_service import delete_user_playlists
+from app.services.song_service import delete_user_loves
 
 router = APIRouter(prefix="/api/admin/users", tags=["admin"])
 
@@ -20,24 +24,29 @@ class UserOut(BaseModel):
 
     @classmethod
     def from_orm(cls, u: User) -> "UserOut":
-        return cls(
-            id=u.id,
-            username=u.username,
-            role=u.role.value,
-            created_at=u.created_at.isoformat() if u.created_at else "",
-            created_ip=getattr(u, "created_ip", None),
-            last_login_ip=getattr(u, "last_login_ip", None),
-        )
+        return cls(**cls.row(u))
+
+    @staticmethod
+    def row(u: User) -> dict:
+        """Plain dict with the model's fields, for ORJSONResponse listings."""
+        return {
+            "id": u.id,
+            "username": u.username,
+            "role": u.role.value,
+            "created_at": u.created_at.isoformat() if u.created_at else "",
+            "created_ip": getattr(u, "created_ip", None),
+            "last_login_ip": getattr(u, "last_login_ip", None),
+        }
 
 
 @router.get("", response_model=list[UserOut])
 async def list_users(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_admin),
 ):
     result = await db.execute(select(User).order_by(User.created_at.desc()))
     users = list(result.scalars().all())
-    return [UserOut.from_orm(u) for u in users]
+    return ORJSONResponse([UserOut.row(u) for u in users])
 
 
 @router.delete("/{user_id}")
@@ -52,6 +61,9 @@ async def delete_user(
     target_user = result.scalar_one_or_none()
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
+    await delete_user_playlists(db, target_user.id)
+    await delete_user_loves(db, target_user.id)
+    await delete_user_plays(db, target_user.id)
     await db.delete(target_user)
     await db.commit()
     return {"ok": True}
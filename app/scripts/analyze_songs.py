@@ -0,0 +1,55 @@
+"""
+Compute waveform peaks and loudness for songs that have not been analyzed yet.
+Usage: python -m app.scripts.analyze_songs [--force] [--batch-size N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import select
+from app.database import init_db
+from app.models import Song
+from app.services.song_service import analyze_song, shutdown_analysis_pool
+
+
+async def main(force: bool = False, batch_size: int = 50):
+    from app.database import get_session_factory
+
+    await init_db()
+    session_factory = get_session_factory()
+    done = decoded = 0
+    last_id = 0
+    started = time.monotonic()
+    try:
+        while True:
+            async with session_factory() as db:
+                q = select(Song).where(Song.id > last_id).order_by(Song.id).limit(batch_size)
+                if not force:
+                    q = q.where(Song.analyzed_at.is_(None))
+                songs = list((await db.execute(q)).scalars().all())
+                if not songs:
+                    break
+                # The pool analyzes the whole batch in parallel; one commit per batch.
+                results = await asyncio.gather(*(analyze_song(db, s) for s in songs))
+                await db.commit()
+            last_id = songs[-1].id
+            done += len(songs)
+            decoded += sum(results)
+            print(f"Analyzed {done} songs ({decoded} decoded)...")
+    finally:
+        shutdown_analysis_pool()
+    elapsed = time.monotonic() - started
+    print(f"Done: {done} songs, {decoded} decoded, {elapsed:.1f}s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true", help="Re-analyze songs that already have analysis")
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(force=args.force, batch_size=args.batch_size))
@@ -0,0 +1,48 @@
+"""
+Re-scan tags (title, artist, duration) for songs that have no duration.
+Interrupted runs resume where they stopped; --retry-failed also retries files that failed before.
+Usage: python -m app.scripts.backfill_metadata [--retry-failed] [--batch-size N]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.database import init_db
+from app.services.metadata_backfill import BackfillProgress, run_metadata_backfill
+from app.services.song_service import shutdown_analysis_pool
+
+
+async def report(progress: BackfillProgress):
+    while progress.running:
+        await asyncio.sleep(2)
+        print(f"Scanned {progress.scanned} ({progress.updated} updated, {progress.failed} failed)...")
+
+
+async def main(retry_failed: bool = False, batch_size: int = 100):
+    await init_db()
+    progress = BackfillProgress(running=True)
+    reporter = asyncio.create_task(report(progress))
+    try:
+        await run_metadata_backfill(retry_failed=retry_failed, batch_size=batch_size, progress=progress)
+    finally:
+        reporter.cancel()
+        shutdown_analysis_pool()
+    stats = progress.as_dict()
+    for failure in progress.failures:
+        print(f"  {failure['song_id']:<6} {failure['filename']}: {failure['error']}")
+    print(
+        f"Done: {stats['scanned']} scanned, {stats['updated']} updated, {stats['failed']} failed "
+        f"in {stats['elapsed_seconds']}s ({stats['files_per_second']} files/s)."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--retry-failed", action="store_true", help="Also retry songs that failed in a previous run")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(retry_failed=args.retry_failed, batch_size=args.batch_size))
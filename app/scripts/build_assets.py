@@ -0,0 +1,107 @@
+"""
+Build fingerprinted static assets: minify JS/CSS, name each file by a hash of its
+content, write .gz (and .br when the brotli package is installed) next to it and a
+manifest.json that the templates use through app.assets.asset_url().
+Usage: python -m app.scripts.build_assets [--static-dir app/static]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.assets import DIST_DIR, MANIFEST_NAME, STATIC_DIR
+
+try:
+    import brotli
+except ImportError:  # optional; .gz only
+    brotli = None
+
+HASH_LENGTH = 10
+COMPRESS_SUFFIXES = {".js", ".css", ".svg", ".json", ".txt", ".html"}
+
+
+def minify_js(source: str) -> str:
+    """Conservative: drop indentation, blank lines and whole-line // comments.
+
+    Line breaks are kept, so automatic semicolon insertion behaves exactly as before.
+    """
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def minify_css(source: str) -> str:
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    return source.replace(";}", "}").strip() + "\n"
+
+
+MINIFIERS = {".js": minify_js, ".css": minify_css}
+
+
+def hashed_name(name: str, content: bytes) -> str:
+    path = Path(name)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+def build_assets(static_dir: Path) -> dict[str, str]:
+    """Rebuild static_dir/dist from the other files in static_dir; returns the manifest."""
+    out_dir = static_dir / DIST_DIR
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+    manifest = {}
+    for src in sorted(static_dir.rglob("*")):
+        if not src.is_file() or out_dir in src.parents:
+            continue
+        name = src.relative_to(static_dir).as_posix()
+        minify = MINIFIERS.get(src.suffix)
+        content = minify(src.read_text(encoding="utf-8")).encode() if minify else src.read_bytes()
+        target = out_dir / hashed_name(name, content)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        if src.suffix in COMPRESS_SUFFIXES:
+            _write_compressed(target, content)
+        manifest[name] = target.relative_to(out_dir).as_posix()
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    return manifest
+
+
+def _write_compressed(target: Path, content: bytes) -> None:
+    """Max-effort compression (done once at build time); skipped when it would not shrink."""
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    for suffix, data in variants.items():
+        if len(data) < len(content):
+            target.with_name(target.name + suffix).write_bytes(data)
+
+
+def main(static_dir: Path = STATIC_DIR) -> None:
+    manifest = build_assets(static_dir)
+    out_dir = static_dir / DIST_DIR
+    for name, hashed in manifest.items():
+        size = (out_dir / hashed).stat().st_size
+        gz = out_dir / f"{hashed}.gz"
+        extra = f", {gz.stat().st_size} gzip" if gz.exists() else ""
+        print(f"{name} -> {DIST_DIR}/{hashed} ({(static_dir / name).stat().st_size} -> {size} bytes{extra})")
+    if brotli is None:
+        print("brotli not installed: wrote .gz variants only (pip install brotli for .br)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--static-dir", type=Path, default=STATIC_DIR)
+    args = parser.parse_args()
+    main(args.static_dir)
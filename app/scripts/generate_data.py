@@ -0,0 +1,262 @@
+"""
+Fill the database with a synthetic library for performance testing: users, songs with
+plausible tags, loves drawn from a Zipf distribution (a few hits get most of them) and
+background images. Rows go in with bulk inserts in one transaction, so 100k+ rows take seconds.
+Deterministic for a given --seed. Run it again with another --prefix to add more rows.
+Usage: python -m app.scripts.generate_data [--users N] [--songs N] [--loves N] [--backgrounds N]
+       [--files N] [--zipf S] [--seed N] [--prefix NAME] [--password PW]
+"""
+import argparse
+import asyncio
+import io
+import math
+import random
+import struct
+import sys
+import time
+import wave
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.auth import hash_password
+from app.models import BackgroundImage, Song, SongLove, User, UserRole
+
+INSERT_CHUNK = 5000
+DEFAULT_PASSWORD = "password123"
+
+_WORDS = (
+    "love night blue river gold echo summer rain fire heart dream city road light shadow "
+    "ocean wild young broken silver midnight morning home star dance forever paper north "
+    "electric velvet glass storm honey ghost sweet lonely highway garden neon winter"
+).split()
+_FIRST_NAMES = "Ana Ben Chloe Dan Eli Frida Gil Hana Ivan Jules Kai Lena Milo Noa Omar Pia Ravi Sara Tom Yael".split()
+_LAST_NAMES = "Adler Brooks Cohen Diaz Evans Fox Gray Hart Ito Jones Klein Levi Moss Novak Park Reyes Stone Vale".split()
+_BAND_NOUNS = "Rivers Echoes Foxes Lights Kings Shadows Machines Tides Owls Saints Wolves Engines".split()
+
+
+def make_wav(seconds: float = 2.0, rate: int = 22050) -> bytes:
+    """A short mono sine WAV that mutagen (and the analyzer) can parse."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        n = int(seconds * rate)
+        w.writeframes(b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate))) for i in range(n)))
+    return buf.getvalue()
+
+
+def make_png(rgb: tuple[int, int, int]) -> bytes:
+    """A valid 1x1 PNG of one colour."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes((0, *rgb)))) + chunk(b"IEND", b"")
+
+
+def generated_username(prefix: str, i: int) -> str:
+    return f"{prefix}_user_{i}"
+
+
+def generated_song_filename(prefix: str, i: int) -> str:
+    return f"{prefix}{i:08d}.wav"
+
+
+def zipf_sampler(rng: random.Random, population: list[int], exponent: float):
+    """Draw k items where the r-th item (after a shuffle) has weight 1 / r**exponent."""
+    ranked = list(population)
+    rng.shuffle(ranked)
+    cum_weights = list(accumulate(1 / rank ** exponent for rank in range(1, len(ranked) + 1)))
+    return lambda k: rng.choices(ranked, cum_weights=cum_weights, k=k)
+
+
+def _artist_name(rng: random.Random) -> str:
+    if rng.random() < 0.4:
+        return f"The {rng.choice(_WORDS).title()} {rng.choice(_BAND_NOUNS)}"
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+
+def _title(rng: random.Random) -> str:
+    title = " ".join(rng.sample(_WORDS, rng.choice((1, 2, 2, 3, 4)))).title()
+    if rng.random() < 0.05:
+        title += rng.choice((" (Live)", " (Remix)", " - Remastered", " (Acoustic)"))
+    return title
+
+
+def _pick_loves(rng: random.Random, user_ids: list[int], song_ids: list[int], count: int, exponent: float) -> list[tuple[int, int]]:
+    """Unique (user_id, song_id) pairs; both the songs and the users' activity are Zipf-skewed."""
+    count = min(count, len(user_ids) * len(song_ids))
+    if not count:
+        return []
+    pick_song = zipf_sampler(rng, song_ids, exponent)
+    pick_user = zipf_sampler(rng, user_ids, exponent / 2)
+    pairs: set[tuple[int, int]] = set()
+    attempts = 0
+    while len(pairs) < count and attempts < 50:
+        need = count - len(pairs)
+        pairs.update(zip(pick_user(need), pick_song(need)))
+        attempts += 1
+    if len(pairs) < count:
+        # The skew saturates the popular songs; fill the rest uniformly.
+        while len(pairs) < count:
+            pairs.add((rng.choice(user_ids), rng.choice(song_ids)))
+    return list(pairs)[:count]
+
+
+async def _insert_chunks(conn, model, rows: list[dict]) -> None:
+    for start in range(0, len(rows), INSERT_CHUNK):
+        await conn.execute(insert(model), rows[start:start + INSERT_CHUNK])
+
+
+async def _advance_sequences(conn, models) -> None:
+    """Move the id sequences past the explicit ids inserted above, so the app's next insert
+    does not collide with them. SQLite has no sequences: it takes max(rowid) + 1."""
+    if conn.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+async def generate_data(
+    engine: AsyncEngine,
+    users: int = 100,
+    songs: int = 10000,
+    loves: int = 50000,
+    backgrounds: int = 10,
+    files: int = 0,
+    zipf_exponent: float = 1.1,
+    seed: int = 42,
+    prefix: str = "gen",
+    password: str = DEFAULT_PASSWORD,
+) -> dict:
+    """Insert a synthetic library into the (initialized) database behind `engine`.
+
+    The first `files` songs and every background also get a tiny valid file in storage.
+    Returns a summary dict with the row counts and the generated id ranges.
+    """
+    from app.config import get_settings
+    from app.storage import get_image_storage, get_song_storage
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        first_user = (await conn.execute(select(func.coalesce(func.max(User.id), 0)))).scalar() + 1
+        first_song = (await conn.execute(select(func.coalesce(func.max(Song.id), 0)))).scalar() + 1
+        has_active = (await conn.execute(
+            select(BackgroundImage.id).where(BackgroundImage.is_active == True).limit(1)
+        )).first() is not None
+
+        user_ids = list(range(first_user, first_user + users))
+        song_ids = list(range(first_song, first_song + songs))
+        pairs = _pick_loves(rng, user_ids, song_ids, loves, zipf_exponent)
+        love_counts = Counter(song_id for _, song_id in pairs)
+
+        password_hash = hash_password(password)
+        await _insert_chunks(conn, User, [
+            {
+                "id": user_id,
+                "username": generated_username(prefix, i),
+                "password_hash": password_hash,
+                "role": UserRole.viewer,
+                "created_at": now - timedelta(days=rng.uniform(0, 730)),
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+
+        artists = [_artist_name(rng) for _ in range(max(1, songs // 8))]
+        pick_artist = zipf_sampler(rng, list(range(len(artists))), 0.9)
+        artist_of = pick_artist(songs)
+        song_rows = [
+            {
+                "id": song_id,
+                "filename": generated_song_filename(prefix, i),
+                "title": _title(rng),
+                "artist": "" if rng.random() < 0.03 else artists[artist_of[i]],
+                "duration_seconds": round(min(1200.0, max(30.0, rng.lognormvariate(math.log(220), 0.3))), 2),
+                "created_at": now - timedelta(seconds=rng.uniform(0, 730 * 86400)),
+                "love_count": love_counts[song_id],
+            }
+            for i, song_id in enumerate(song_ids)
+        ]
+        for row in song_rows:
+            row["updated_at"] = row["created_at"]
+        await _insert_chunks(conn, Song, song_rows)
+        await _advance_sequences(conn, (User, Song))
+        await _insert_chunks(conn, SongLove, [
+            {"user_id": user_id, "song_id": song_id, "created_at": now - timedelta(seconds=rng.uniform(0, 365 * 86400))}
+            for user_id, song_id in pairs
+        ])
+        await _insert_chunks(conn, BackgroundImage, [
+            {"filename": f"{prefix}_bg_{i}.png", "is_active": not has_active and i == 0, "created_at": now}
+            for i in range(backgrounds)
+        ])
+    inserted = time.perf_counter() - started
+
+    if files:
+        wav = make_wav()
+        song_storage = get_song_storage()
+        for i in range(min(files, songs)):
+            await song_storage.save(generated_song_filename(prefix, i), io.BytesIO(wav), "audio/wav")
+    image_storage = get_image_storage()
+    for i in range(backgrounds):
+        png = make_png((rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        await image_storage.save(f"{prefix}_bg_{i}.png", io.BytesIO(png), "image/png")
+
+    return {
+        "users": users,
+        "songs": songs,
+        "loves": len(pairs),
+        "backgrounds": backgrounds,
+        "files": min(files, songs),
+        "first_user_id": first_user,
+        "first_song_id": first_song,
+        "seed": seed,
+        "storage": get_settings().storage_backend,
+        "insert_seconds": round(inserted, 2),
+        "total_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+async def main(**options):
+    from app.database import get_engine, init_db
+
+    await init_db()
+    engine = get_engine()
+    try:
+        summary = await generate_data(engine, **options)
+    finally:
+        await engine.dispose()
+    print(
+        f"Inserted {summary['users']} users, {summary['songs']} songs, {summary['loves']} loves and "
+        f"{summary['backgrounds']} backgrounds ({summary['files']} song files) in {summary['total_seconds']}s."
+    )
+    print(f"Log in as {generated_username(options['prefix'], 0)} / {options['password']}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--songs", type=int, default=10000)
+    parser.add_argument("--loves", type=int, default=50000, help="Total loves (unique user/song pairs)")
+    parser.add_argument("--backgrounds", type=int, default=10)
+    parser.add_argument("--files", type=int, default=0, help="Write a tiny valid WAV for the first N songs")
+    parser.add_argument("--zipf", type=float, default=1.1, dest="zipf_exponent", help="Zipf exponent of song popularity")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="gen", help="Prefix of generated usernames and filenames")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password of every generated user")
+    args = parser.parse_args()
+    asyncio.run(main(**vars(args)))
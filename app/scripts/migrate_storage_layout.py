@@ -0,0 +1,36 @@
+"""
+Move stored song and image files into the sharded layout for a given depth (see app.storage).
+Safe to interrupt and re-run: every move is an atomic rename and files already in place are skipped.
+Stop the app (or run before switching STORAGE_SHARD_DEPTH) so streams do not miss files mid-move.
+Usage: python -m app.scripts.migrate_storage_layout --depth 2 [--dry-run]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.config import get_settings
+from app.storage import migrate_layout
+
+
+def main(depth: int, dry_run: bool = False):
+    settings = get_settings()
+    for label, root, exclude in [
+        ("songs", settings.upload_dir, settings.images_dir),
+        ("images", settings.images_dir, None),
+    ]:
+        moved, in_place = migrate_layout(root, depth, exclude=exclude, dry_run=dry_run)
+        verb = "would move" if dry_run else "moved"
+        print(f"{label}: {verb} {moved}, already in place {in_place}")
+    if not dry_run and depth != settings.storage_shard_depth:
+        print(f"Now set STORAGE_SHARD_DEPTH={depth} and restart the app.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=None, help="Target depth (default: STORAGE_SHARD_DEPTH)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    main(args.depth if args.depth is not None else get_settings().storage_shard_depth, dry_run=args.dry_run)
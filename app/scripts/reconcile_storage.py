@@ -0,0 +1,42 @@
+"""
+Compare the uploads/images directories with the database and report orphans and missing files.
+Usage: python -m app.scripts.reconcile_storage [--collect] [--grace-seconds N]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure project root is on path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.database import init_db
+from app.services.storage_reconciler import reconcile_storage
+
+
+async def main(collect: bool = False, grace_seconds: float | None = None):
+    from app.database import get_session_factory
+
+    await init_db()
+    session_factory = get_session_factory()
+    async with session_factory() as db:
+        report = await reconcile_storage(db, collect=collect, grace_seconds=grace_seconds)
+    print(f"Scanned {report.song_files} song files and {report.image_files} images in {report.elapsed_seconds:.2f}s")
+    for label, names in [
+        ("Orphan song files", report.orphan_song_files),
+        ("Orphan images", report.orphan_image_files),
+        ("Songs without a file", report.missing_song_files),
+        ("Backgrounds without a file", report.missing_image_files),
+        ("Deleted", report.collected),
+    ]:
+        print(f"{label}: {len(names)}")
+        for name in names:
+            print("  ", name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--collect", action="store_true", help="Delete orphan files older than the grace period")
+    parser.add_argument("--grace-seconds", type=float, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(collect=args.collect, grace_seconds=args.grace_seconds))
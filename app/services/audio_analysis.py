@@ -0,0 +1,302 @@
+"""
+Waveform peaks and integrated loudness (ITU-R BS.1770 / EBU R128) for song files.
+
+Pure stdlib so it can run in worker processes without importing the app.
+WAV is decoded with the ``wave`` module; other formats need ``ffmpeg`` on PATH.
+Audio is decoded and analyzed in chunks of ``CHUNK_FRAMES`` (filter state, loudness hops and
+peak blocks carry over), so memory does not grow with the track length.
+"""
+import array
+import math
+import operator
+import shutil
+import subprocess
+import sys
+import wave
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+# Number of peak buckets stored per song (one byte each).
+PEAK_BUCKETS = 800
+# Sample rate used when decoding through ffmpeg; plenty for peaks and K-weighted loudness.
+# WAV at a higher rate is averaged down by an integer factor to about this rate.
+DECODE_RATE = 22050
+# Frames decoded and analyzed at a time.
+CHUNK_FRAMES = 1 << 16
+# Unsigned 8-bit PCM to signed bytes.
+_FLIP_SIGN = bytes((b + 128) % 256 for b in range(256))
+# ReplayGain 2.0 reference level.
+REPLAYGAIN_REFERENCE_LUFS = -18.0
+
+
+class DecoderUnavailable(RuntimeError):
+    """The file needs ffmpeg and it is not installed; says nothing about the file itself."""
+
+
+@dataclass
+class AnalysisResult:
+    peaks: bytes
+    loudness_lufs: float | None
+    replay_gain_db: float | None
+    peak_amplitude: float
+
+
+def _wav_chunks(w: wave.Wave_read, factor: int) -> Iterator[list[float]]:
+    """Mono floats in [-1, 1] from an open PCM WAV, averaging `factor` frames into one sample."""
+    channels = w.getnchannels()
+    width = w.getsampwidth()
+    frames = CHUNK_FRAMES - CHUNK_FRAMES % factor
+    with w:
+        while raw := w.readframes(frames):
+            if width == 1:
+                ints = array.array("b", raw.translate(_FLIP_SIGN))  # unsigned 8-bit
+                scale = 128.0
+            elif width == 3:
+                # Widen 24-bit to 32-bit (low byte zero) so the array module can read it.
+                wide = bytearray(len(raw) // 3 * 4)
+                wide[1::4], wide[2::4], wide[3::4] = raw[0::3], raw[1::3], raw[2::3]
+                ints = array.array("i", wide)
+                scale = float(1 << 31)
+            else:
+                ints = array.array("h" if width == 2 else "i", raw)
+                scale = float(1 << (8 * width - 1))
+            if sys.byteorder == "big" and width != 1:
+                ints.byteswap()
+            # Sum channels, then groups of `factor` frames, a slice per position (no per-sample Python loop).
+            mixed: Iterable[int] = ints
+            if channels > 1:
+                mixed = map(sum, zip(*(ints[c::channels] for c in range(channels))))
+            if factor > 1:
+                mixed = list(mixed)
+                mixed = map(sum, zip(*(mixed[k::factor] for k in range(factor))))
+            inv = 1.0 / (scale * channels * factor)
+            yield [v * inv for v in mixed]
+
+
+def _open_wav(path: Path) -> tuple[int, Iterator[list[float]]]:
+    """Decode a PCM WAV file, downsampled by an integer factor to about DECODE_RATE."""
+    w = wave.open(str(path), "rb")
+    if w.getsampwidth() not in (1, 2, 3, 4):
+        w.close()
+        raise ValueError(f"Unsupported WAV sample width: {w.getsampwidth()}")
+    factor = max(1, w.getframerate() // DECODE_RATE)
+    return w.getframerate() // factor, _wav_chunks(w, factor)
+
+
+def _ffmpeg_chunks(ffmpeg: str, path: Path) -> Iterator[list[float]]:
+    proc = subprocess.Popen(
+        [ffmpeg, "-v", "error", "-i", str(path), "-f", "s16le", "-ac", "1", "-ar", str(DECODE_RATE), "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while raw := proc.stdout.read(CHUNK_FRAMES * 2):
+            ints = array.array("h", raw[: len(raw) // 2 * 2])
+            if sys.byteorder == "big":
+                ints.byteswap()
+            yield [v / 32768.0 for v in ints]
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, ffmpeg)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+
+def _open_ffmpeg(path: Path) -> tuple[int, Iterator[list[float]]]:
+    """Decode any ffmpeg-readable file to mono floats at DECODE_RATE."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise DecoderUnavailable("ffmpeg not available")
+    return DECODE_RATE, _ffmpeg_chunks(ffmpeg, path)
+
+
+def decode_chunks(path: Path) -> tuple[int, Iterator[list[float]]]:
+    """(sample rate, iterator of mono float chunks); memory stays bounded whatever the length."""
+    if path.suffix.lower() == ".wav":
+        try:
+            return _open_wav(path)
+        except (wave.Error, EOFError, ValueError):
+            pass  # e.g. float or compressed WAV; let ffmpeg try
+    return _open_ffmpeg(path)
+
+
+class PeakAccumulator:
+    """Max-abs peaks of a stream: block maxima whose block size doubles (pairs merged) whenever
+    more than 8 * buckets are held, then downsampled to `buckets` at the end."""
+
+    def __init__(self, buckets: int = PEAK_BUCKETS):
+        self.buckets = buckets
+        self.samples = 0
+        self.amplitude = 0.0
+        self._blocks: list[float] = []
+        self._span = 1
+        self._block_max = 0.0
+        self._block_count = 0
+
+    def add(self, samples: list[float]) -> None:
+        n = len(samples)
+        self.samples += n
+        i = 0
+        while i < n:
+            take = min(self._span - self._block_count, n - i)
+            part = samples[i:i + take]
+            self._block_max = max(self._block_max, max(part), -min(part))
+            self._block_count += take
+            i += take
+            if self._block_count == self._span:
+                self._close_block()
+
+    def _close_block(self) -> None:
+        self._blocks.append(self._block_max)
+        self.amplitude = max(self.amplitude, self._block_max)
+        self._block_max = 0.0
+        self._block_count = 0
+        if len(self._blocks) >= 8 * self.buckets:
+            blocks = self._blocks
+            self._blocks = [max(blocks[i], blocks[i + 1]) for i in range(0, len(blocks), 2)]
+            self._span *= 2
+
+    def result(self) -> bytes:
+        """`buckets` max-abs values scaled to 0..255 (fewer for very short input)."""
+        if self._block_count:
+            self._close_block()
+        n = len(self._blocks)
+        if n == 0:
+            return b""
+        buckets = min(self.buckets, n)
+        out = bytearray(buckets)
+        for b in range(buckets):
+            peak = max(self._blocks[b * n // buckets:(b + 1) * n // buckets])
+            out[b] = min(255, int(peak * 255 + 0.5))
+        return bytes(out)
+
+
+def compute_peaks(samples: list[float], buckets: int = PEAK_BUCKETS) -> bytes:
+    """Downsample to `buckets` max-abs values scaled to 0..255."""
+    peaks = PeakAccumulator(buckets)
+    peaks.add(samples)
+    return peaks.result()
+
+
+def _biquad(samples: list[float], coeffs: tuple, state: tuple) -> tuple[list[float], tuple]:
+    """Filter one chunk; `state` (x1, x2, y1, y2) carries over to the next chunk."""
+    b0, b1, b2, a1, a2 = coeffs
+    x1, x2, y1, y2 = state
+    out = [0.0] * len(samples)
+    for i, x in enumerate(samples):
+        y = b0 * x + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+        out[i] = y
+        x2, x1 = x1, x
+        y2, y1 = y1, y
+    return out, (x1, x2, y1, y2)
+
+
+def _k_weighting(rate: int) -> list[tuple]:
+    """BS.1770 K-weighting (high shelf + RLB high-pass) biquads, coefficients derived for any rate."""
+    # Stage 1: high shelf
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        (vh + vb * k / q + k * k) / a0,
+        2 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+        2 * (k * k - 1) / a0,
+        (1 - k / q + k * k) / a0,
+    )
+    # Stage 2: high-pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1 + k / q + k * k
+    high_pass = (1.0, -2.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0)
+    return [shelf, high_pass]
+
+
+class LoudnessMeter:
+    """Gated integrated loudness (mono) of a stream: K-weighted energy per 100 ms hop,
+    blocks of 4 hops (400 ms) gated at the end."""
+
+    def __init__(self, rate: int):
+        self.step = rate // 10
+        self._filters = _k_weighting(rate) if self.step else []
+        self._states = [(0.0, 0.0, 0.0, 0.0)] * len(self._filters)
+        self._hops: list[float] = []
+        self._energy = 0.0
+        self._count = 0
+
+    def add(self, samples: list[float]) -> None:
+        if not self.step:
+            return
+        for f, coeffs in enumerate(self._filters):
+            samples, self._states[f] = _biquad(samples, coeffs, self._states[f])
+        n = len(samples)
+        i = 0
+        while i < n:
+            take = min(self.step - self._count, n - i)
+            part = samples[i:i + take]
+            self._energy += sum(map(operator.mul, part, part))
+            self._count += take
+            i += take
+            if self._count == self.step:
+                self._hops.append(self._energy)
+                self._energy = 0.0
+                self._count = 0
+
+    def result(self) -> float | None:
+        """LUFS, or None if the signal is too short/quiet."""
+        hops, step = self._hops, self.step
+        if len(hops) < 4:
+            return None
+        blocks = [(hops[i] + hops[i + 1] + hops[i + 2] + hops[i + 3]) / (4 * step) for i in range(len(hops) - 3)]
+
+        def lufs(z: float) -> float:
+            return -0.691 + 10 * math.log10(z) if z > 0 else -math.inf
+
+        gated = [z for z in blocks if lufs(z) > -70.0]
+        if not gated:
+            return None
+        relative_gate = lufs(sum(gated) / len(gated)) - 10.0
+        gated = [z for z in gated if lufs(z) > relative_gate]
+        if not gated:
+            return None
+        return lufs(sum(gated) / len(gated))
+
+
+def integrated_loudness(samples: list[float], rate: int) -> float | None:
+    """Gated integrated loudness in LUFS (mono), or None if the signal is too short/quiet."""
+    meter = LoudnessMeter(rate)
+    meter.add(samples)
+    return meter.result()
+
+
+def analyze_file(path: Path) -> AnalysisResult | None:
+    """Decode and analyze one file; None if it cannot be decoded. Safe to run in a process pool.
+
+    Raises DecoderUnavailable when there is no decoder for it here, so callers can retry later.
+    """
+    try:
+        rate, chunks = decode_chunks(Path(path))
+        peaks = PeakAccumulator()
+        meter = LoudnessMeter(rate)
+        for chunk in chunks:
+            if chunk:
+                peaks.add(chunk)
+                meter.add(chunk)
+    except DecoderUnavailable:
+        raise
+    except Exception:
+        return None
+    if not peaks.samples:
+        return None
+    loudness = meter.result()
+    return AnalysisResult(
+        peaks=peaks.result(),
+        loudness_lufs=round(loudness, 2) if loudness is not None else None,
+        replay_gain_db=round(REPLAYGAIN_REFERENCE_LUFS - loudness, 2) if loudness is not None else None,
+        peak_amplitude=round(peaks.amplitude, 4),
+    )
@@ -0,0 +1,256 @@
+"""
+Compact song catalogue for clients with large libraries.
+
+``GET /api/songs`` answers with a columnar payload instead of one object per song when the
+client asks for it in ``Accept``:
+
+- ``application/vnd.nivpro.catalog+json``: columnar JSON;
+- ``application/msgpack``: the same structure as MessagePack (needs the optional ``msgpack``
+  package; without it the columnar JSON is served if acceptable, else the plain list).
+
+The payload is ``{"columns": [...], "count": n, "data": [[column values], ...], "loved": [ids]}``,
+songs newest first as in the plain list. The full catalogue is encoded once and kept in memory;
+only the caller's ``loved`` ids are added per request. The snapshot is dropped when a
+transaction that changed songs commits (``mark_catalog_changed``) and rebuilt at least every
+``CATALOG_CACHE_SECONDS`` so other worker processes pick up changes too; ``love_count`` may lag
+by that much, the caller's own ``loved`` list never does.
+
+Clients that keep a local copy sync with ``catalog_changes`` (``GET /api/songs/changes``): songs
+whose ``updated_at`` and tombstones whose ``deleted_at`` are after the client's token. Tokens are
+server timestamps; each sync re-sends a window before the token (``CHANGES_OVERLAP_SECONDS``,
+at least ``CATALOG_CACHE_SECONDS``) so transactions that committed late, or a catalogue fetched
+from an older snapshot, are not missed. Applying a change twice is harmless: upsert by id,
+delete by id.
+
+``shuffle_order`` keeps the shuffle order of the whole catalogue for the most recent seeds
+(``SHUFFLE_ORDERS_CACHED``, 8 bytes per song each) and the song ids it is built from under the
+same invalidation. A seed that is not cached costs one hash and sort of every id (about 60 ms for
+50k songs), run in a worker thread; the player sends the ids it wants instead (see
+``GET /api/songs/up-next?ids=``), so only other API clients use server-side shuffle.
+"""
+import asyncio
+import hashlib
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import event, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.compression import accepted_encodings
+from app.config import get_settings
+from app.models import Song, SongLove, SongTombstone
+from app.responses import dumps_json
+from app.services.song_service import LISTING_ORDER, search_songs, shuffle_keys
+
+try:
+    import msgpack
+except ImportError:  # optional; columnar JSON only
+    msgpack = None
+
+CATALOG_JSON = "application/vnd.nivpro.catalog+json"
+MSGPACK = "application/msgpack"
+_MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack"}
+COLUMNS = ("id", "title", "artist", "duration_seconds", "filename", "love_count")
+# Delta sync: more changed songs than this answer with a reset (refetch the full catalogue).
+CHANGES_LIMIT = 5000
+CHANGES_OVERLAP_SECONDS = 60
+SHUFFLE_ORDERS_CACHED = 64
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Snapshot(NamedTuple):
+    generation: int
+    built_at: float
+    count: int
+    bodies: dict[str, bytes]  # media type -> encoded payload without "loved"
+    etag: str
+
+
+_generation = 0
+_snapshot: Snapshot | None = None
+_lock = asyncio.Lock()
+
+
+class IdArray(NamedTuple):
+    generation: int
+    built_at: float
+    values: array  # song ids, or shuffle keys (see song_service.shuffle_keys)
+
+
+_song_ids: IdArray | None = None
+_shuffle_orders: OrderedDict[int, IdArray] = OrderedDict()
+
+
+def invalidate_catalog() -> None:
+    global _generation, _snapshot, _song_ids
+    _generation += 1
+    _snapshot = None
+    _song_ids = None
+    _shuffle_orders.clear()
+
+
+def _fresh(entry: IdArray | None, max_age: float) -> bool:
+    return entry is not None and entry.generation == _generation and time.monotonic() - entry.built_at < max_age
+
+
+def mark_catalog_changed(db: AsyncSession) -> None:
+    """Drop the cached catalogue once this session's transaction commits."""
+    db.sync_session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop("catalog_changed", False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("catalog_changed", None)
+
+
+def negotiate_catalog(accept: str) -> str | None:
+    """The compact media type to answer with, or None for the plain JSON list."""
+    accepted = accepted_encodings(accept)
+    if msgpack is not None and accepted & _MSGPACK_ALIASES:
+        return MSGPACK
+    if CATALOG_JSON in accepted:
+        return CATALOG_JSON
+    return None
+
+
+def _payload(rows: list[tuple]) -> dict:
+    data = [list(column) for column in zip(*rows)] if rows else [[] for _ in COLUMNS]
+    return {"columns": list(COLUMNS), "count": len(rows), "data": data}
+
+
+def _encode(payload: dict, media_type: str) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True)
+    return dumps_json(payload)
+
+
+def _with_loved(body: bytes, media_type: str, loved: list[int]) -> bytes:
+    """Append the "loved" key to an encoded payload without re-encoding the catalogue."""
+    if media_type == MSGPACK:
+        # The payload is a fixmap (fewer than 16 keys): bump its size in the header byte.
+        return bytes((body[0] + 1,)) + body[1:] + msgpack.packb("loved") + msgpack.packb(loved)
+    return body[:-1] + b',"loved":' + dumps_json(loved) + b"}"
+
+
+def _rows_query(search: str | None = None):
+    return search_songs(select(*(getattr(Song, c) for c in COLUMNS)).order_by(*LISTING_ORDER), search)
+
+
+async def get_snapshot(db: AsyncSession) -> Snapshot:
+    global _snapshot
+    max_age = get_settings().catalog_cache_seconds
+    snap = _snapshot
+    if snap is not None and snap.generation == _generation and time.monotonic() - snap.built_at < max_age:
+        return snap
+    async with _lock:
+        snap = _snapshot
+        if snap is not None and snap.generation == _generation and time.monotonic() - snap.built_at < max_age:
+            return snap
+        generation = _generation
+        rows = [tuple(row) for row in await db.execute(_rows_query())]
+        payload = _payload(rows)
+        bodies = {CATALOG_JSON: _encode(payload, CATALOG_JSON)}
+        if msgpack is not None:
+            bodies[MSGPACK] = _encode(payload, MSGPACK)
+        etag = hashlib.sha256(bodies[CATALOG_JSON]).hexdigest()[:20]
+        snap = Snapshot(generation, time.monotonic(), len(rows), bodies, etag)
+        # Changed while building: serve it to this caller only.
+        if max_age > 0 and generation == _generation:
+            _snapshot = snap
+        return snap
+
+
+async def shuffle_order(db: AsyncSession, seed: int) -> array:
+    """Shuffle keys of the whole catalogue for `seed` (see song_service.next_shuffled)."""
+    global _song_ids
+    max_age = get_settings().catalog_cache_seconds
+    order = _shuffle_orders.get(seed)
+    if _fresh(order, max_age):
+        _shuffle_orders.move_to_end(seed)
+        return order.values
+    generation = _generation
+    ids = _song_ids
+    if not _fresh(ids, max_age):
+        ids = IdArray(generation, time.monotonic(), array("Q", (await db.execute(select(Song.id))).scalars()))
+    # Hashing and sorting every id is tens of milliseconds for a large catalogue: off the loop.
+    order = IdArray(ids.generation, ids.built_at, await asyncio.to_thread(shuffle_keys, seed, ids.values))
+    if max_age > 0 and ids.generation == _generation:
+        _song_ids = ids
+        _shuffle_orders[seed] = order
+        _shuffle_orders.move_to_end(seed)
+        while len(_shuffle_orders) > SHUFFLE_ORDERS_CACHED:
+            _shuffle_orders.popitem(last=False)
+    return order.values
+
+
+async def catalog_body(db: AsyncSession, media_type: str, loved: list[int], search: str | None = None) -> tuple[bytes, str | None]:
+    """Encoded catalogue for `media_type` plus an ETag (None for searches, which are not cached)."""
+    loved = sorted(loved)
+    if search and search.strip():
+        rows = [tuple(row) for row in await db.execute(_rows_query(search))]
+        return _with_loved(_encode(_payload(rows), media_type), media_type, loved), None
+    snap = await get_snapshot(db)
+    loved_crc = zlib.crc32(dumps_json(loved))
+    etag = f'"{snap.etag}-{loved_crc:08x}-{"m" if media_type == MSGPACK else "j"}"'
+    return _with_loved(snap.bodies[media_type], media_type, loved), etag
+
+
+def sync_token(at: datetime) -> str:
+    """Opaque sync token for a (naive UTC) point in time: microseconds since the epoch."""
+    return str((at - _EPOCH) // timedelta(microseconds=1))
+
+
+def parse_sync_token(token: str) -> datetime:
+    """Inverse of sync_token; ValueError if the token is malformed."""
+    micros = int(token)
+    if micros < 0:
+        raise ValueError("negative sync token")
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+async def catalog_changes(db: AsyncSession, since: datetime | None, user_id: int) -> dict:
+    """Songs added or changed and ids deleted since `since`, for the user's local catalogue.
+
+    ``reset`` is true (with no changes) when there is no usable `since` (missing, older than the
+    tombstone retention, or too many changes): the client refetches GET /api/songs and syncs from
+    ``next``.
+    """
+    settings = get_settings()
+    now = datetime.utcnow()
+    result = {"next": sync_token(now), "reset": True, "songs": [], "deleted": []}
+    if since is None or since < now - timedelta(days=settings.song_tombstone_retention_days):
+        return result
+    after = since - timedelta(seconds=max(CHANGES_OVERLAP_SECONDS, settings.catalog_cache_seconds))
+    rows = (await db.execute(
+        select(*(getattr(Song, c) for c in COLUMNS))
+        .where(Song.updated_at > after)
+        .order_by(Song.updated_at, Song.id)
+        .limit(CHANGES_LIMIT + 1)
+    )).all()
+    if len(rows) > CHANGES_LIMIT:
+        return result
+    deleted = (await db.execute(
+        select(SongTombstone.song_id)
+        .where(SongTombstone.deleted_at > after, ~exists().where(Song.id == SongTombstone.song_id))
+    )).scalars().all()
+    ids = [row.id for row in rows]
+    loved = set()
+    if ids:
+        loved = set((await db.execute(
+            select(SongLove.song_id).where(SongLove.user_id == user_id, SongLove.song_id.in_(ids))
+        )).scalars())
+    result["reset"] = False
+    result["songs"] = [{**dict(zip(COLUMNS, row)), "is_loved": row.id in loved} for row in rows]
+    result["deleted"] = list(deleted)
+    return result
@@ -0,0 +1,275 @@
+"""
+Background jobs persisted in the ``jobs`` table and run by a small worker pool in each
+app process, so slow admin work (tag re-scans, audio analysis, file deletes) is accepted
+in milliseconds and survives restarts.
+
+``enqueue()`` adds a job in the caller's transaction; call ``get_job_queue().notify()``
+after the commit to start it right away (idle workers also poll every
+``JOB_POLL_INTERVAL_SECONDS``, which picks up jobs queued by other processes).
+Workers claim the oldest queued job with a conditional UPDATE, so a job runs once even
+with several processes. A running job is heartbeated; if its process dies the job is
+queued again after ``JOB_STALE_SECONDS`` (up to ``JOB_MAX_ATTEMPTS`` tries). Jobs
+interrupted by a clean shutdown go straight back to the queue.
+
+Handlers are registered with ``@job_handler("kind")`` next to the code they run and
+receive the job's params plus a ``JobContext`` for progress reports.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+# Progress reports are written at most this often (seconds); the final state always is.
+PROGRESS_WRITE_INTERVAL = 1.0
+# Modules whose @job_handler registrations the workers need.
+HANDLER_MODULES = ("app.services.song_service", "app.services.metadata_backfill")
+
+JOBS_FINISHED = Counter("nivpro_jobs_finished_total", "Background jobs finished", ["kind", "status"])
+JOBS_RUNNING = Gauge("nivpro_jobs_running", "Background jobs running in this process")
+
+JobHandler = Callable[[dict, "JobContext"], Awaitable[dict | None]]
+_handlers: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Register `async def handler(params, ctx) -> dict | None` for jobs of this kind.
+    The returned dict (if any) is merged into the job's final progress."""
+    def register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def job_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+async def enqueue(db: AsyncSession, kind: str, params: dict | None = None, created_by: int | None = None) -> Job:
+    """Add a job in the caller's transaction (commit, then notify the queue)."""
+    if kind not in _handlers:
+        raise LookupError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, params=params or {}, status=QUEUED, created_by=created_by)
+    db.add(job)
+    await db.flush()
+    return job
+
+
+async def get_active_job(db: AsyncSession, kind: str) -> Job | None:
+    result = await db.execute(
+        select(Job).where(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES)).order_by(Job.id).limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_latest_job(db: AsyncSession, kind: str) -> Job | None:
+    result = await db.execute(select(Job).where(Job.kind == kind).order_by(Job.id.desc()).limit(1))
+    return result.scalar_one_or_none()
+
+
+class JobContext:
+    """Handed to a running handler: progress reports (throttled) double as heartbeats."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.progress: dict = {}
+        self._last_write = 0.0
+
+    async def report(self, **progress) -> None:
+        self.progress.update(progress)
+        if time.monotonic() - self._last_write >= PROGRESS_WRITE_INTERVAL:
+            await self.heartbeat(write_progress=True)
+
+    async def heartbeat(self, write_progress: bool = False) -> None:
+        from app.database import get_session_factory
+
+        values = {"heartbeat_at": datetime.utcnow()}
+        if write_progress:
+            values["progress"] = dict(self.progress)
+        async with get_session_factory()() as db:
+            await db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            await db.commit()
+        self._last_write = time.monotonic()
+
+
+class JobQueue:
+    def __init__(self, workers: int, poll_interval: float, stale_seconds: float, max_attempts: int):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[int, asyncio.Task] = {}
+        self._cancel_requested: set[int] = set()
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _requeue_stale(self, db: AsyncSession) -> None:
+        """Jobs still "running" without a heartbeat belong to a process that died."""
+        give_up = Job.attempts >= self.max_attempts
+        await db.execute(
+            update(Job)
+            .where(
+                Job.status == RUNNING,
+                Job.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.stale_seconds),
+            )
+            .values(
+                status=case((give_up, FAILED), else_=QUEUED),
+                error=case((give_up, "Worker stopped responding"), else_=Job.error),
+                finished_at=case((give_up, datetime.utcnow()), else_=None),
+            )
+        )
+
+    async def _claim(self) -> tuple[int, str, dict] | None:
+        from app.database import get_session_factory
+
+        async with get_session_factory()() as db:
+            await self._requeue_stale(db)
+            oldest = (
+                select(Job.id).where(Job.status == QUEUED).order_by(Job.id).limit(1)
+                .with_for_update(skip_locked=True).scalar_subquery()
+            )
+            now = datetime.utcnow()
+            result = await db.execute(
+                update(Job)
+                .where(Job.id == oldest, Job.status == QUEUED)
+                .values(status=RUNNING, started_at=now, heartbeat_at=now, attempts=Job.attempts + 1)
+                .returning(Job.id, Job.kind, Job.params)
+            )
+            row = result.first()
+            await db.commit()
+        return tuple(row) if row else None
+
+    async def _finish(self, job_id: int, status: str, progress: dict, error: str | None = None) -> None:
+        from app.database import get_session_factory
+
+        values = {"status": status, "progress": progress or None, "error": error}
+        values["finished_at"] = None if status == QUEUED else datetime.utcnow()
+        async with get_session_factory()() as db:
+            await db.execute(update(Job).where(Job.id == job_id).values(**values))
+            await db.commit()
+
+    async def _keep_alive(self, ctx: JobContext) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.stale_seconds / 3))
+            try:
+                await ctx.heartbeat()
+            except Exception:
+                logger.exception("Heartbeat for job %d failed", ctx.job_id)
+
+    async def _run_one(self, job_id: int, kind: str, params: dict) -> None:
+        ctx = JobContext(job_id)
+        handler = _handlers.get(kind)
+        if handler is None:
+            await self._finish(job_id, FAILED, {}, f"Unknown job kind: {kind}")
+            JOBS_FINISHED.labels(kind, FAILED).inc()
+            return
+        task = asyncio.create_task(handler(params, ctx))
+        self._running[job_id] = task
+        keep_alive = asyncio.create_task(self._keep_alive(ctx))
+        JOBS_RUNNING.inc()
+        status, error = SUCCEEDED, None
+        try:
+            result = await task
+            ctx.progress.update(result or {})
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                # Shutdown: hand the job back to the queue and stop this worker.
+                await self._finish(job_id, QUEUED, ctx.progress)
+                raise
+            status = CANCELLED
+        except Exception as e:
+            logger.exception("Job %d (%s) failed", job_id, kind)
+            status, error = FAILED, f"{type(e).__name__}: {e}"
+        finally:
+            keep_alive.cancel()
+            self._running.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+            JOBS_RUNNING.dec()
+        await self._finish(job_id, status, ctx.progress, error)
+        JOBS_FINISHED.labels(kind, status).inc()
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._run_one(*job)
+
+    async def cancel(self, db: AsyncSession, job: Job) -> bool:
+        """Cancel a queued job, or one running in this process. False if it cannot be cancelled here."""
+        if job.status == QUEUED:
+            result = await db.execute(
+                update(Job).where(Job.id == job.id, Job.status == QUEUED)
+                .values(status=CANCELLED, finished_at=datetime.utcnow())
+            )
+            await db.commit()
+            return result.rowcount == 1
+        task = self._running.get(job.id)
+        if job.status == RUNNING and task is not None:
+            self._cancel_requested.add(job.id)
+            task.cancel()
+            return True
+        return False
+
+    def start(self) -> None:
+        import importlib
+
+        for module in HANDLER_MODULES:
+            importlib.import_module(module)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        settings = get_settings()
+        _queue = JobQueue(
+            workers=settings.job_workers,
+            poll_interval=settings.job_poll_interval_seconds,
+            stale_seconds=settings.job_stale_seconds,
+            max_attempts=settings.job_max_attempts,
+        )
+    return _queue
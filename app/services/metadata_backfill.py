@@ -0,0 +1,143 @@
+"""
+Re-scan tags for songs with missing metadata (no duration).
+
+Files are parsed in the shared process pool, results are written back in one bulk
+UPDATE per batch, and every scanned song gets ``metadata_scanned_at`` (plus
+``metadata_error`` on failure) so an interrupted run resumes where it stopped.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, update
+
+from app.models import Song
+from app.services.catalog import mark_catalog_changed
+from app.services.jobs import JobContext, job_handler
+from app.services.song_service import get_analysis_pool, scan_tags
+from app.storage import get_song_storage
+
+# Keep the most recent failures in memory for the admin progress endpoint.
+MAX_REPORTED_FAILURES = 50
+
+
+@dataclass
+class BackfillProgress:
+    running: bool = False
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    scanned: int = 0
+    updated: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    error: str | None = None
+    failures: list[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "running": self.running,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "scanned": self.scanned,
+            "updated": self.updated,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "files_per_second": round(self.scanned / self.elapsed_seconds, 2) if self.elapsed_seconds else 0.0,
+            "error": self.error,
+            "failures": list(self.failures),
+        }
+
+
+async def run_metadata_backfill(
+    retry_failed: bool = False,
+    batch_size: int = 100,
+    progress: BackfillProgress | None = None,
+    on_batch: Callable[[BackfillProgress], Awaitable[None]] | None = None,
+) -> BackfillProgress:
+    """Scan all songs without a duration. By default skips songs a previous run already tried.
+
+    `on_batch` is awaited after every committed batch (progress reporting).
+    """
+    from app.database import get_session_factory
+
+    progress = progress or BackfillProgress()
+    progress.running = True
+    progress.started_at = datetime.utcnow()
+    started = time.monotonic()
+    session_factory = get_session_factory()
+    loop = asyncio.get_running_loop()
+    pool = get_analysis_pool()
+    storage = get_song_storage()
+
+    async def _scan(filename: str):
+        async with storage.local_copy(filename) as path:
+            return await loop.run_in_executor(pool, scan_tags, path)
+
+    last_id = 0
+    try:
+        while True:
+            async with session_factory() as db:
+                q = (
+                    select(Song.id, Song.filename, Song.title, Song.artist)
+                    .where(Song.duration_seconds.is_(None), Song.id > last_id)
+                    .order_by(Song.id)
+                    .limit(batch_size)
+                )
+                if not retry_failed:
+                    q = q.where(Song.metadata_scanned_at.is_(None))
+                rows = (await db.execute(q)).all()
+                if not rows:
+                    break
+                results = await asyncio.gather(*(_scan(row.filename) for row in rows))
+                now = datetime.utcnow()
+                params = []
+                for row, (title, artist, duration, error) in zip(rows, results):
+                    # Only replace the upload-time fallbacks, never titles an admin edited.
+                    if not title or row.title != Path(row.filename).stem:
+                        title = row.title
+                    if not artist or row.artist != "Unknown":
+                        artist = row.artist
+                    params.append({
+                        "id": row.id,
+                        "title": title,
+                        "artist": artist,
+                        "duration_seconds": duration,
+                        "metadata_scanned_at": now,
+                        "metadata_error": error,
+                    })
+                    if error:
+                        progress.failed += 1
+                        progress.failures.append({"song_id": row.id, "filename": row.filename, "error": error})
+                    else:
+                        progress.updated += 1
+                await db.execute(update(Song), params)
+                mark_catalog_changed(db)
+                await db.commit()
+            del progress.failures[:-MAX_REPORTED_FAILURES]
+            last_id = rows[-1].id
+            progress.scanned += len(rows)
+            progress.elapsed_seconds = time.monotonic() - started
+            if on_batch is not None:
+                await on_batch(progress)
+    except Exception as e:
+        progress.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        progress.running = False
+        progress.finished_at = datetime.utcnow()
+        progress.elapsed_seconds = time.monotonic() - started
+    return progress
+
+
+@job_handler("metadata_backfill")
+async def metadata_backfill_job(params: dict, ctx: JobContext) -> dict:
+    """Job: the backfill, started from POST /api/admin/songs/metadata-backfill."""
+
+    async def report(progress: BackfillProgress) -> None:
+        await ctx.report(**progress.as_dict())
+
+    progress = await run_metadata_backfill(retry_failed=params.get("retry_failed", False), on_batch=report)
+    return progress.as_dict()
@@ -0,0 +1,164 @@
+"""
+Play-event ingestion: events are queued in memory and written by one background task in
+multi-row INSERTs, one commit per flush, instead of a commit per event.
+
+A flush runs every ``PLAY_EVENTS_FLUSH_INTERVAL_SECONDS`` or as soon as a batch of
+``PLAY_EVENTS_BATCH_SIZE`` is waiting. When ``PLAY_EVENTS_MAX_PENDING`` events are queued
+new ones are refused (the API answers 503 + Retry-After) rather than growing memory.
+A failed flush puts its events back at the head of the queue and is retried, and the
+lifespan flushes whatever is left on shutdown, so accepted events are written at least once.
+Events whose song or user no longer exists (unknown id, or deleted while queued) are dropped
+at flush time instead: they would fail the foreign keys on every retry and block the queue.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import PlayEvent, Song, User
+
+logger = logging.getLogger(__name__)
+
+PLAY_EVENTS_PENDING = Gauge("nivpro_play_events_pending", "Play events waiting to be written")
+PLAY_EVENTS_WRITTEN = Counter("nivpro_play_events_written_total", "Play events written to the database")
+PLAY_EVENTS_REJECTED = Counter("nivpro_play_events_rejected_total", "Play events refused because the queue was full")
+PLAY_EVENTS_FLUSH_ERRORS = Counter("nivpro_play_events_flush_errors_total", "Failed play event flushes")
+PLAY_EVENTS_DROPPED = Counter(
+    "nivpro_play_events_dropped_total", "Play events dropped because their song or user no longer exists"
+)
+
+# Rows per INSERT statement (keeps bound parameters well under SQLite's limit).
+ROWS_PER_STATEMENT = 500
+RETRY_DELAY_SECONDS = 1.0
+
+
+async def delete_user_plays(db: AsyncSession, user_id: int) -> None:
+    """Drop a user's listening history (user delete); rolled-up play counts are kept."""
+    await db.execute(delete(PlayEvent).where(PlayEvent.user_id == user_id))
+
+
+async def _existing_rows(db, batch: list[dict]) -> list[dict]:
+    """The events whose song and user still exist; the others are logged and counted."""
+    song_ids = set((await db.execute(select(Song.id).where(Song.id.in_({e["song_id"] for e in batch})))).scalars())
+    user_ids = set((await db.execute(select(User.id).where(User.id.in_({e["user_id"] for e in batch})))).scalars())
+    rows = [e for e in batch if e["song_id"] in song_ids and e["user_id"] in user_ids]
+    if len(rows) < len(batch):
+        dropped = len(batch) - len(rows)
+        logger.warning("Dropped %d play events for songs or users that no longer exist", dropped)
+        PLAY_EVENTS_DROPPED.inc(dropped)
+    return rows
+
+
+async def _write(batch: list[dict]) -> int:
+    """Insert one batch in one transaction. Returns the number of rows written."""
+    from app.database import get_session_factory
+
+    async with get_session_factory()() as db:
+        recorded_at = datetime.utcnow()
+        rows = [{**e, "recorded_at": recorded_at} for e in await _existing_rows(db, batch)]
+        for start in range(0, len(rows), ROWS_PER_STATEMENT):
+            await db.execute(insert(PlayEvent).values(rows[start:start + ROWS_PER_STATEMENT]))
+        await db.commit()
+    return len(rows)
+
+
+class PlayEventBuffer:
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, events: list[dict]) -> bool:
+        """Queue events (all or nothing). False if the queue is full."""
+        if len(self._pending) + len(events) > self.max_pending:
+            PLAY_EVENTS_REJECTED.inc(len(events))
+            return False
+        self._pending.extend(events)
+        PLAY_EVENTS_PENDING.set(len(self._pending))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        """Write everything queued so far. Returns the number of events written."""
+        written = 0
+        async with self._flush_lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    try:
+                        rows = await _write(batch)
+                    except IntegrityError:
+                        # A song or user was deleted between the check and the insert: check again.
+                        rows = await _write(batch)
+                except Exception:
+                    # Keep order and retry later: nothing accepted is dropped.
+                    self._pending.extendleft(reversed(batch))
+                    PLAY_EVENTS_FLUSH_ERRORS.inc()
+                    raise
+                finally:
+                    PLAY_EVENTS_PENDING.set(len(self._pending))
+                written += rows
+                PLAY_EVENTS_WRITTEN.inc(rows)
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Play event flush failed; %d events kept for retry", len(self._pending))
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left (lifespan shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final play event flush failed; %d events lost", len(self._pending))
+
+
+_buffer: PlayEventBuffer | None = None
+
+
+def get_play_event_buffer() -> PlayEventBuffer:
+    global _buffer
+    if _buffer is None:
+        settings = get_settings()
+        _buffer = PlayEventBuffer(
+            batch_size=settings.play_events_batch_size,
+            flush_interval=settings.play_events_flush_interval_seconds,
+            max_pending=settings.play_events_max_pending,
+        )
+    return _buffer
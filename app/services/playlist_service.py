@@ -0,0 +1,212 @@
+"""
+Playlists with gap-based ordering.
+
+Items are ordered by ``(position, id)`` and positions are spaced ``POSITION_GAP`` apart, so
+adding or moving tracks writes only the affected rows: new positions are picked between
+the neighbours of the target slot. When the slot has no room left (repeated inserts at the
+same spot), every item from the slot on is shifted by one set-based UPDATE.
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Playlist, PlaylistItem, Song
+
+POSITION_GAP = 1024
+INSERT_CHUNK = 1000
+
+
+async def get_user_playlist(db: AsyncSession, playlist_id: int, user_id: int) -> Playlist | None:
+    result = await db.execute(select(Playlist).where(Playlist.id == playlist_id, Playlist.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+async def list_user_playlists(db: AsyncSession, user_id: int) -> list[tuple[Playlist, int]]:
+    """The user's playlists with their item counts (one query; each count is a correlated
+    subquery on the playlist_id index, so other users' items are never read)."""
+    n_items = (
+        select(func.count(PlaylistItem.id))
+        .where(PlaylistItem.playlist_id == Playlist.id)
+        .correlate(Playlist)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Playlist, n_items)
+        .where(Playlist.user_id == user_id)
+        .order_by(Playlist.created_at.desc())
+    )
+    return [(p, n) for p, n in result.all()]
+
+
+async def count_items(db: AsyncSession, playlist_id: int) -> int:
+    result = await db.execute(select(func.count(PlaylistItem.id)).where(PlaylistItem.playlist_id == playlist_id))
+    return result.scalar() or 0
+
+
+async def list_items(db: AsyncSession, playlist_id: int, after: tuple[int, int] | None, limit: int) -> list:
+    """One page of items joined with song metadata, keyset-paginated on (position, id)."""
+    q = (
+        select(
+            PlaylistItem.id,
+            PlaylistItem.position,
+            PlaylistItem.song_id,
+            PlaylistItem.added_at,
+            Song.title,
+            Song.artist,
+            Song.duration_seconds,
+            Song.filename,
+        )
+        .join(Song, Song.id == PlaylistItem.song_id)
+        .where(PlaylistItem.playlist_id == playlist_id)
+        .order_by(PlaylistItem.position, PlaylistItem.id)
+        .limit(limit)
+    )
+    if after is not None:
+        position, item_id = after
+        q = q.where(
+            (PlaylistItem.position > position)
+            | ((PlaylistItem.position == position) & (PlaylistItem.id > item_id))
+        )
+    return list((await db.execute(q)).all())
+
+
+async def _item_position(db: AsyncSession, playlist_id: int, item_id: int) -> int | None:
+    result = await db.execute(
+        select(PlaylistItem.position).where(PlaylistItem.id == item_id, PlaylistItem.playlist_id == playlist_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _allocate_positions(
+    db: AsyncSession,
+    playlist_id: int,
+    count: int,
+    before_item_id: int | None,
+    moving_ids: list[int] | None = None,
+) -> list[int]:
+    """`count` increasing positions for a slot before `before_item_id` (None = the end).
+
+    Items in `moving_ids` are ignored as neighbours (they are about to get new positions).
+    Raises LookupError if the anchor item is not in the playlist.
+    """
+    others = PlaylistItem.playlist_id == playlist_id
+    if moving_ids:
+        others = others & PlaylistItem.id.not_in(moving_ids)
+    if before_item_id is None:
+        last = (await db.execute(select(func.max(PlaylistItem.position)).where(others))).scalar()
+        start = 0 if last is None else last
+        return [start + POSITION_GAP * (i + 1) for i in range(count)]
+    anchor = await _item_position(db, playlist_id, before_item_id)
+    if anchor is None:
+        raise LookupError("before_item_id is not in this playlist")
+    prev = (
+        await db.execute(select(func.max(PlaylistItem.position)).where(others, PlaylistItem.position < anchor))
+    ).scalar()
+    if prev is None:
+        prev = anchor - POSITION_GAP * (count + 1)
+    step = (anchor - prev) // (count + 1)
+    if step < 1:
+        # No room between the neighbours: open a gap by shifting the anchor and everything after it.
+        shift = POSITION_GAP * (count + 1)
+        await db.execute(
+            update(PlaylistItem)
+            .where(PlaylistItem.playlist_id == playlist_id, PlaylistItem.position >= anchor)
+            .values(position=PlaylistItem.position + shift)
+            .execution_options(synchronize_session=False)
+        )
+        step = (anchor + shift - prev) // (count + 1)
+    return [prev + step * (i + 1) for i in range(count)]
+
+
+async def add_items(
+    db: AsyncSession,
+    playlist: Playlist,
+    song_ids: list[int],
+    before_item_id: int | None = None,
+) -> int:
+    """Insert songs (in order, duplicates allowed) before an item or at the end. Returns how many.
+
+    Raises LookupError for unknown song ids or anchor item.
+    """
+    if not song_ids:
+        return 0
+    existing = set((await db.execute(select(Song.id).where(Song.id.in_(set(song_ids))))).scalars().all())
+    missing = sorted(set(song_ids) - existing)
+    if missing:
+        raise LookupError(f"Unknown song ids: {missing[:20]}")
+    positions = await _allocate_positions(db, playlist.id, len(song_ids), before_item_id)
+    rows = [
+        {"playlist_id": playlist.id, "song_id": song_id, "position": position}
+        for song_id, position in zip(song_ids, positions)
+    ]
+    for start in range(0, len(rows), INSERT_CHUNK):
+        await db.execute(insert(PlaylistItem), rows[start:start + INSERT_CHUNK])
+    await _touch(db, playlist)
+    return len(rows)
+
+
+async def remove_items(db: AsyncSession, playlist: Playlist, item_ids: list[int]) -> int:
+    """Delete items by id in one statement. Returns how many were removed."""
+    if not item_ids:
+        return 0
+    result = await db.execute(
+        delete(PlaylistItem)
+        .where(PlaylistItem.playlist_id == playlist.id, PlaylistItem.id.in_(item_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await _touch(db, playlist)
+    return result.rowcount
+
+
+async def move_items(
+    db: AsyncSession,
+    playlist: Playlist,
+    item_ids: list[int],
+    before_item_id: int | None = None,
+) -> int:
+    """Move items (keeping the given order) before another item or to the end.
+
+    Raises LookupError if an item or the anchor is not in the playlist.
+    """
+    if not item_ids:
+        return 0
+    if len(set(item_ids)) != len(item_ids):
+        raise LookupError("Duplicate item ids")
+    if before_item_id in item_ids:
+        raise LookupError("before_item_id cannot be one of the moved items")
+    found = set(
+        (
+            await db.execute(
+                select(PlaylistItem.id).where(PlaylistItem.playlist_id == playlist.id, PlaylistItem.id.in_(item_ids))
+            )
+        ).scalars().all()
+    )
+    if len(found) != len(item_ids):
+        raise LookupError("Some items are not in this playlist")
+    positions = await _allocate_positions(db, playlist.id, len(item_ids), before_item_id, moving_ids=item_ids)
+    await db.execute(
+        update(PlaylistItem),
+        [{"id": item_id, "position": position} for item_id, position in zip(item_ids, positions)],
+    )
+    await _touch(db, playlist)
+    return len(item_ids)
+
+
+async def delete_playlist(db: AsyncSession, playlist: Playlist) -> None:
+    await db.execute(delete(PlaylistItem).where(PlaylistItem.playlist_id == playlist.id))
+    await db.delete(playlist)
+    await db.flush()
+
+
+async def delete_user_playlists(db: AsyncSession, user_id: int) -> None:
+    playlist_ids = select(Playlist.id).where(Playlist.user_id == user_id).scalar_subquery()
+    await db.execute(delete(PlaylistItem).where(PlaylistItem.playlist_id.in_(playlist_ids)))
+    await db.execute(delete(Playlist).where(Playlist.user_id == user_id))
+
+
+async def _touch(db: AsyncSession, playlist: Playlist) -> None:
+    await db.execute(
+        update(Playlist).where(Playlist.id == playlist.id).values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
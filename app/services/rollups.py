@@ -0,0 +1,217 @@
+"""
+Popularity rollups: plays and new loves per song per day (``song_daily_stats``) and
+materialized top-N charts (``chart_entries``), so chart requests never scan
+``play_events`` or ``song_loves``.
+
+Each refresh folds in only source rows above the last watermark (``rollup_watermarks``)
+and adds them onto the daily buckets with an upsert, then rebuilds the charts from the
+buckets. Source rows are read up to a fixed max id, so rows written during a refresh are
+picked up by the next one and nothing is counted twice. That id is the highest among rows
+written more than ``ROLLUP_FOLD_LAG_SECONDS`` ago: with several writers (worker processes)
+ids can commit out of order, and a lower id still uncommitted when the watermark passed it
+would be skipped for good; the lag gives such transactions time to commit.
+
+All-time plays per song are kept in ``song_play_totals``, upserted with the same new counts,
+so the all-time chart is an indexed top-N instead of a sum over every bucket.
+
+Loves are counted when they are created; an unlove does not subtract from past buckets
+(the all-time love count is ``songs.love_count``).
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import ChartEntry, PlayEvent, RollupWatermark, Song, SongDailyStats, SongLove, SongPlayTotal
+
+logger = logging.getLogger(__name__)
+
+# Chart name -> description, in the order GET /api/charts lists them.
+CHARTS = {
+    "trending": "Plays plus three times new loves over the trending window",
+    "top_played_week": "Most plays over the trending window",
+    "top_played": "Most plays of all time",
+    "most_loved": "Most loves of all time",
+}
+TRENDING_LOVE_WEIGHT = 3
+
+# One refresh at a time per process, so two runs never fold the same watermark range.
+_refresh_lock = asyncio.Lock()
+# Rows per upsert statement (5 bound parameters each; stays under SQLite's limit).
+ROWS_PER_STATEMENT = 500
+
+
+def _day(value) -> date:
+    """func.date() gives a date on PostgreSQL and an ISO string on SQLite."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+async def _watermark(db: AsyncSession, source: str) -> RollupWatermark:
+    mark = await db.get(RollupWatermark, source)
+    if mark is None:
+        mark = RollupWatermark(source=source, last_id=0)
+        db.add(mark)
+    return mark
+
+
+async def _fold_through(db: AsyncSession, id_column, written_column, last_id: int, cutoff: datetime) -> int:
+    """Highest id above `last_id` among rows written before `cutoff` (walks the primary key
+    down from the newest row, so only the lag window is skipped over)."""
+    upper = (await db.execute(
+        select(id_column).where(id_column > last_id, written_column < cutoff).order_by(id_column.desc()).limit(1)
+    )).scalar()
+    return upper or last_id
+
+
+async def _fold_plays(db: AsyncSession, buckets: dict, cutoff: datetime) -> int:
+    """Add play_events above the watermark to `buckets`; returns the new watermark."""
+    mark = await _watermark(db, "play_events")
+    upper = await _fold_through(db, PlayEvent.id, PlayEvent.recorded_at, mark.last_id, cutoff)
+    if upper <= mark.last_id:
+        return mark.last_id
+    day = func.date(PlayEvent.occurred_at)
+    rows = await db.execute(
+        select(
+            PlayEvent.song_id,
+            day,
+            func.count().filter(PlayEvent.event == "start"),
+            func.count().filter(PlayEvent.event == "complete"),
+        )
+        .join(Song, Song.id == PlayEvent.song_id)
+        .where(PlayEvent.id > mark.last_id, PlayEvent.id <= upper)
+        .group_by(PlayEvent.song_id, day)
+    )
+    for song_id, d, plays, completes in rows.all():
+        bucket = buckets.setdefault((song_id, _day(d)), [0, 0, 0])
+        bucket[0] += plays
+        bucket[1] += completes
+    mark.last_id = upper
+    return upper
+
+
+async def _fold_loves(db: AsyncSession, buckets: dict, cutoff: datetime) -> int:
+    mark = await _watermark(db, "song_loves")
+    upper = await _fold_through(db, SongLove.id, SongLove.created_at, mark.last_id, cutoff)
+    if upper <= mark.last_id:
+        return mark.last_id
+    day = func.date(SongLove.created_at)
+    rows = await db.execute(
+        select(SongLove.song_id, day, func.count())
+        .join(Song, Song.id == SongLove.song_id)
+        .where(SongLove.id > mark.last_id, SongLove.id <= upper)
+        .group_by(SongLove.song_id, day)
+    )
+    for song_id, d, loves in rows.all():
+        buckets.setdefault((song_id, _day(d)), [0, 0, 0])[2] += loves
+    mark.last_id = upper
+    return upper
+
+
+async def _upsert_buckets(db: AsyncSession, buckets: dict) -> None:
+    """Add the new counts onto existing (song, day) rows and the songs' all-time play totals,
+    in one statement per chunk."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    values = [
+        {"song_id": song_id, "day": d, "plays": p, "completes": c, "loves": l}
+        for (song_id, d), (p, c, l) in buckets.items()
+    ]
+    for start in range(0, len(values), ROWS_PER_STATEMENT):
+        stmt = upsert(SongDailyStats).values(values[start:start + ROWS_PER_STATEMENT])
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SongDailyStats.song_id, SongDailyStats.day],
+                set_={
+                    "plays": SongDailyStats.plays + stmt.excluded.plays,
+                    "completes": SongDailyStats.completes + stmt.excluded.completes,
+                    "loves": SongDailyStats.loves + stmt.excluded.loves,
+                },
+            )
+        )
+    totals: dict[int, int] = {}
+    for (song_id, _), (plays, _, _) in buckets.items():
+        if plays:
+            totals[song_id] = totals.get(song_id, 0) + plays
+    values = [{"song_id": song_id, "plays": plays} for song_id, plays in totals.items()]
+    for start in range(0, len(values), ROWS_PER_STATEMENT):
+        stmt = upsert(SongPlayTotal).values(values[start:start + ROWS_PER_STATEMENT])
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SongPlayTotal.song_id],
+                set_={"plays": SongPlayTotal.plays + stmt.excluded.plays},
+            )
+        )
+
+
+def _chart_queries(size: int, since: date) -> dict:
+    recent = SongDailyStats.day >= since
+    plays = func.sum(SongDailyStats.plays)
+    trending = plays + TRENDING_LOVE_WEIGHT * func.sum(SongDailyStats.loves)
+    by_song = select(SongDailyStats.song_id).group_by(SongDailyStats.song_id)
+    return {
+        "trending": by_song.add_columns(trending).where(recent).having(trending > 0)
+        .order_by(trending.desc(), SongDailyStats.song_id).limit(size),
+        "top_played_week": by_song.add_columns(plays).where(recent).having(plays > 0)
+        .order_by(plays.desc(), SongDailyStats.song_id).limit(size),
+        "top_played": select(SongPlayTotal.song_id, SongPlayTotal.plays).where(SongPlayTotal.plays > 0)
+        .order_by(SongPlayTotal.plays.desc(), SongPlayTotal.song_id).limit(size),
+        "most_loved": select(Song.id, Song.love_count).where(Song.love_count > 0)
+        .order_by(Song.love_count.desc(), Song.id).limit(size),
+    }
+
+
+async def _rebuild_charts(db: AsyncSession, now: datetime) -> None:
+    settings = get_settings()
+    since = now.date() - timedelta(days=max(1, settings.trending_window_days) - 1)
+    for chart, query in _chart_queries(settings.chart_size, since).items():
+        rows = (await db.execute(query)).all()
+        await db.execute(delete(ChartEntry).where(ChartEntry.chart == chart))
+        if rows:
+            await db.execute(
+                insert(ChartEntry).values([
+                    {"chart": chart, "rank": rank, "song_id": song_id, "score": float(score), "refreshed_at": now}
+                    for rank, (song_id, score) in enumerate(rows, start=1)
+                ])
+            )
+
+
+async def refresh_rollups(db: AsyncSession) -> dict:
+    """Fold new plays/loves into the daily buckets and rebuild every chart (one transaction)."""
+    async with _refresh_lock:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=get_settings().rollup_fold_lag_seconds)
+        buckets: dict[tuple[int, date], list[int]] = {}
+        plays_through = await _fold_plays(db, buckets, cutoff)
+        loves_through = await _fold_loves(db, buckets, cutoff)
+        if buckets:
+            await _upsert_buckets(db, buckets)
+        await _rebuild_charts(db, now)
+        await db.commit()
+    return {
+        "play_events_through_id": plays_through,
+        "loves_through_id": loves_through,
+        "buckets_updated": len(buckets),
+        "refreshed_at": now.isoformat(),
+    }
+
+
+async def run_periodic_rollups() -> None:
+    """Lifespan task: refresh every `rollup_interval_seconds`."""
+    from app.database import get_session_factory
+
+    settings = get_settings()
+    session_factory = get_session_factory()
+    while True:
+        try:
+            async with session_factory() as db:
+                await refresh_rollups(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Rollup refresh failed")
+        await asyncio.sleep(settings.rollup_interval_seconds)
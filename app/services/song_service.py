@@ -1,11 +1,28 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import BinaryIO
 from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import and_, delete, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.models import Song
+from app.metrics import TAG_PARSE_DURATION, UPLOAD_STORE_DURATION
+from app.models import (
+    ChartEntry, PlayEvent, PlaylistItem, Song, SongDailyStats, SongLove, SongPlayTotal, SongTombstone,
+)
+from app.services.audio_analysis import DecoderUnavailable, analyze_file
+from app.services.jobs import JobContext, job_handler
+from app.storage import get_song_storage
+
+logger = logging.getLogger(__name__)
 
 # Allowed extensions for upload
 ALLOWED_EXTENSIONS = {".mp3", ".m4a", ".ogg", ".wav", ".flac"}
@@ -16,23 +33,34 @@ def safe_extension(filename: str) -> str | None:
     return ext if ext in ALLOWED_EXTENSIONS else None
 
 
-def parse_tags(file_path: Path) -> tuple[str, str, float | None]:
-    """Try to get title, artist, duration from file tags. Fallback to filename."""
+def read_tags(file_path: Path | BinaryIO) -> tuple[str, str, float | None]:
+    """Read title, artist, duration from file tags. Raises if the file cannot be parsed."""
+    from mutagen import File as MutagenFile
+    f = MutagenFile(file_path, easy=True)
+    if f is None:
+        raise ValueError("Unrecognized audio format")
     title = ""
     artist = ""
     duration: float | None = None
+    if f.tags is not None:
+        if "title" in f:
+            title = str(f["title"][0]).strip() or ""
+        if "artist" in f:
+            artist = str(f["artist"][0]).strip() or ""
+    if f.info and hasattr(f.info, "length"):
+        duration = float(f.info.length)
+    return title, artist, duration
+
+
+def parse_tags(file_path: Path, fileobj: BinaryIO | None = None) -> tuple[str, str, float | None]:
+    """Try to get title, artist, duration from file tags. Fallback to filename.
+
+    Reads from `fileobj` instead of the path when given (an upload not stored yet).
+    """
     try:
-        from mutagen import File as MutagenFile
-        f = MutagenFile(file_path)
-        if f is not None:
-            if "title" in f:
-                title = str(f["title"][0]).strip() or ""
-            if "artist" in f:
-                artist = str(f["artist"][0]).strip() or ""
-            if f.info and hasattr(f.info, "length"):
-                duration = float(f.info.length)
+        title, artist, duration = read_tags(fileobj if fileobj is not None else file_path)
     except Exception:
-        pass
+        title, artist, duration = "", "", None
     stem = file_path.stem
     if not title:
         title = stem
@@ -41,44 +69,307 @@ def parse_tags(file_path: Path) -> tuple[str, str, float | None]:
     return title, artist, duration
 
 
+def scan_tags(file_path: Path) -> tuple[str, str, float | None, str | None]:
+    """Like read_tags but returns the failure reason instead of raising (process-pool friendly)."""
+    if not file_path.exists():
+        return "", "", None, "File not found"
+    try:
+        title, artist, duration = read_tags(file_path)
+    except Exception as e:
+        return "", "", None, f"{type(e).__name__}: {e}"[:255]
+    if duration is None:
+        return title, artist, None, "No duration in file info"
+    return title, artist, duration, None
+
+
 async def create_song_from_upload(
     db: AsyncSession,
     original_filename: str,
-    file_content: bytes,
+    file_content: bytes | BinaryIO,
+    content_type: str | None = None,
 ) -> Song:
-    settings = get_settings()
-    settings.upload_dir.mkdir(parents=True, exist_ok=True)
-    ext = safe_extension(original_filename)
-    if not ext:
-        raise ValueError(f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
-    stored_name = f"{uuid4().hex}{ext}"
-    dest = settings.upload_dir / stored_name
-    dest.write_bytes(file_content)
-    title, artist, duration = parse_tags(dest)
-    song = Song(filename=stored_name, title=title, artist=artist, duration_seconds=duration)
+    """Store an uploaded song (bytes or a seekable file object, streamed to storage) and add its row."""
+    song = await store_upload(original_filename, file_content, content_type)
     db.add(song)
     await db.flush()
     await db.refresh(song)
     return song
 
 
+async def store_upload(
+    original_filename: str,
+    file_content: bytes | BinaryIO,
+    content_type: str | None = None,
+) -> Song:
+    """Parse tags and store the file; returns the (not yet added) Song. No DB access, so
+    several uploads can be stored concurrently and their rows added in one flush."""
+    ext = safe_extension(original_filename)
+    if not ext:
+        raise ValueError(f"Unsupported file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+    fileobj = io.BytesIO(file_content) if isinstance(file_content, bytes) else file_content
+    stored_name = f"{uuid4().hex}{ext}"
+    fileobj.seek(0)
+    with TAG_PARSE_DURATION.time():
+        title, artist, duration = await asyncio.to_thread(parse_tags, Path(stored_name), fileobj)
+    fileobj.seek(0)
+    with UPLOAD_STORE_DURATION.labels("song").time():
+        await get_song_storage().save(stored_name, fileobj, content_type)
+    return Song(filename=stored_name, title=title, artist=artist, duration_seconds=duration)
+
+
 async def get_song_by_id(db: AsyncSession, song_id: int) -> Song | None:
     result = await db.execute(select(Song).where(Song.id == song_id))
     return result.scalar_one_or_none()
 
 
-async def list_songs(db: AsyncSession, search: str | None = None) -> list[Song]:
-    q = select(Song).order_by(Song.created_at.desc())
+# Listing order: newest first, ties broken by id so keyset pagination (up_next) is exact.
+LISTING_ORDER = (Song.created_at.desc(), Song.id.desc())
+
+
+def search_songs(q, search: str | None):
+    """Filter a query on songs by a case-insensitive substring of title, artist or filename."""
     if search and search.strip():
         term = f"%{search.strip()}%"
         q = q.where(Song.title.ilike(term) | Song.artist.ilike(term) | Song.filename.ilike(term))
+    return q
+
+
+async def list_songs(db: AsyncSession, search: str | None = None) -> list[Song]:
+    q = search_songs(select(Song).order_by(*LISTING_ORDER), search)
     result = await db.execute(q)
     return list(result.scalars().all())
 
 
+def shuffle_key(seed: int, song_id: int) -> int:
+    """Sort key of a song in the shuffle order for `seed` (32-bit integer hash).
+
+    player.js computes the same key (shuffleKey), so the player's shuffled list and
+    up_next agree without sending the order around.
+    """
+    h = (seed ^ (song_id * 0x9E3779B1)) & 0xFFFFFFFF
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+
+async def songs_by_ids(db: AsyncSession, ids: list[int]) -> list[Song]:
+    """The songs with these ids in the same order; unknown ids are skipped."""
+    if not ids:
+        return []
+    songs = {s.id: s for s in (await db.execute(select(Song).where(Song.id.in_(ids)))).scalars()}
+    return [songs[song_id] for song_id in ids if song_id in songs]
+
+
+def shuffle_keys(seed: int, ids) -> array:
+    """The shuffle order for `seed` as sorted ``shuffle_key << 32 | id`` values (8 bytes per
+    song; ids below 2**32). CPU-bound: run it in a thread for a large catalogue."""
+    return array("Q", sorted((shuffle_key(seed, song_id) << 32) | song_id for song_id in ids))
+
+
+def next_shuffled(keys: array, seed: int, after_id: int | None, count: int) -> list[int]:
+    """The `count` ids after `after_id` in `keys` (see shuffle_keys), wrapping around; from the
+    top when `after_id` is not in it. A binary search, so cached orders answer in O(log n)."""
+    start = 0
+    if after_id is not None:
+        key = (shuffle_key(seed, after_id) << 32) | after_id
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            start = i + 1
+    return [keys[(start + i) % len(keys)] & 0xFFFFFFFF for i in range(min(count, len(keys)))]
+
+
+async def up_next(
+    db: AsyncSession, after_id: int | None, count: int, seed: int | None = None, search: str | None = None
+) -> list[Song]:
+    """The `count` songs played after `after_id` in the player's order, wrapping around.
+
+    The order is the listing (newest first, optionally filtered by `search`), or the
+    shuffle order for `seed`. Starts from the top when `after_id` is not in it.
+    """
+    if seed is not None:
+        return await songs_by_ids(db, await _shuffled_up_next(db, after_id, count, seed, search))
+    # Keyset: the songs listed after the current one, then from the top up to (and including) it.
+    current = None
+    if after_id is not None:
+        current = (await db.execute(
+            search_songs(select(Song.created_at, Song.id).where(Song.id == after_id), search)
+        )).first()
+    if current is None:
+        return list((await db.execute(search_songs(select(Song).order_by(*LISTING_ORDER), search).limit(count))).scalars())
+    listed_after = or_(Song.created_at < current.created_at, and_(Song.created_at == current.created_at, Song.id < current.id))
+    songs = list((await db.execute(
+        search_songs(select(Song).where(listed_after).order_by(*LISTING_ORDER), search).limit(count)
+    )).scalars())
+    if len(songs) < count:
+        songs += (await db.execute(
+            search_songs(select(Song).where(~listed_after).order_by(*LISTING_ORDER), search).limit(count - len(songs))
+        )).scalars()
+    return songs
+
+
+async def _shuffled_up_next(db: AsyncSession, after_id: int | None, count: int, seed: int, search: str | None) -> list[int]:
+    from app.services.catalog import shuffle_order
+
+    if search and search.strip():
+        ids = list((await db.execute(search_songs(select(Song.id), search))).scalars())
+        keys = await asyncio.to_thread(shuffle_keys, seed, ids)
+    else:
+        keys = await shuffle_order(db, seed)
+    return next_shuffled(keys, seed, after_id, count)
+
+
+async def _delete_song_references(db: AsyncSession, song_ids: list[int]) -> None:
+    for model in (PlaylistItem, SongLove, PlayEvent, SongDailyStats, SongPlayTotal, ChartEntry):
+        await db.execute(delete(model).where(model.song_id.in_(song_ids)))
+
+
+async def _add_tombstones(db: AsyncSession, song_ids: list[int]) -> None:
+    """Record deletions for delta sync and drop tombstones past SONG_TOMBSTONE_RETENTION_DAYS."""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=get_settings().song_tombstone_retention_days)
+    await db.execute(delete(SongTombstone).where(SongTombstone.deleted_at < cutoff))
+    # SQLite can hand a deleted id to a new song; a later delete of that one replaces the tombstone.
+    await db.execute(delete(SongTombstone).where(SongTombstone.song_id.in_(song_ids)))
+    await db.execute(insert(SongTombstone), [{"song_id": song_id, "deleted_at": now} for song_id in song_ids])
+
+
 async def delete_song(db: AsyncSession, song: Song) -> None:
-    settings = get_settings()
-    path = song.path_for(settings.upload_dir)
-    if path.exists():
-        path.unlink(missing_ok=True)
+    """Delete a song row and everything referencing it. The file stays: the caller commits and
+    then removes it (see delete_song_files), so a failed commit never leaves a row without a file."""
+    await _delete_song_references(db, [song.id])
     await db.delete(song)
+    await _add_tombstones(db, [song.id])
+    await db.flush()
+
+
+async def delete_songs(db: AsyncSession, song_ids: list[int]) -> dict[int, str]:
+    """Delete many songs and everything referencing them with one statement per table.
+
+    Returns {id: stored filename} of the rows deleted; the caller commits and then removes
+    the files (see delete_song_files).
+    """
+    await _delete_song_references(db, song_ids)
+    result = await db.execute(
+        delete(Song).where(Song.id.in_(song_ids)).returning(Song.id, Song.filename),
+        execution_options={"synchronize_session": False},
+    )
+    deleted = dict(result.all())
+    if deleted:
+        await _add_tombstones(db, list(deleted))
+    return deleted
+
+
+async def delete_song_files(filenames: list[str]) -> None:
+    """Remove stored files in one batch (S3: 1000 keys per request). Run after the commit."""
+    storage = get_song_storage()
+    await asyncio.to_thread(storage.delete_locators, [storage.locate(name) for name in filenames])
+
+
+async def update_songs(db: AsyncSession, song_ids: list[int], values: dict) -> list[int]:
+    """Set the same column values on many songs in one UPDATE; returns the ids updated."""
+    result = await db.execute(
+        update(Song).where(Song.id.in_(song_ids)).values(**values).returning(Song.id),
+        execution_options={"synchronize_session": False},
+    )
+    return list(result.scalars())
+
+
+async def delete_user_loves(db: AsyncSession, user_id: int) -> None:
+    """Drop a user's loves and take them off the songs' love_count."""
+    loved = select(SongLove.song_id).where(SongLove.user_id == user_id)
+    await db.execute(
+        update(Song).where(Song.id.in_(loved), Song.love_count > 0).values(love_count=Song.love_count - 1)
+    )
+    await db.execute(delete(SongLove).where(SongLove.user_id == user_id))
+
+
+_analysis_pool: ProcessPoolExecutor | None = None
+
+
+def get_analysis_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-bound audio analysis (spawned lazily, shared by upload and backfill)."""
+    global _analysis_pool
+    if _analysis_pool is None:
+        workers = max(1, get_settings().analysis_workers)
+        _analysis_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _analysis_pool
+
+
+def shutdown_analysis_pool() -> None:
+    global _analysis_pool
+    if _analysis_pool is not None:
+        _analysis_pool.shutdown(wait=False, cancel_futures=True)
+        _analysis_pool = None
+
+
+async def analyze_song(db: AsyncSession, song: Song) -> bool:
+    """Compute waveform peaks and loudness for a song in the process pool and store them.
+
+    Returns True if the file could be decoded. Undecodable files are marked analyzed so
+    backfills do not retry them forever; files without a decoder here (no ffmpeg) are not.
+    """
+    values = await analysis_values(song.filename)
+    for field, value in values.items():
+        setattr(song, field, value)
+    return "waveform_peaks" in values
+
+
+async def analysis_values(filename: str) -> dict:
+    """Analyze a stored file in the process pool; the Song columns to set (only analyzed_at if
+    undecodable, nothing if there is no decoder for it here so it is retried later)."""
+    loop = asyncio.get_running_loop()
+    async with get_song_storage().local_copy(filename) as path:
+        try:
+            result = await loop.run_in_executor(get_analysis_pool(), analyze_file, path)
+        except DecoderUnavailable as e:
+            logger.warning("Cannot analyze %s: %s", filename, e)
+            return {}
+    values = {"analyzed_at": datetime.utcnow()}
+    if result is not None:
+        values.update(
+            waveform_peaks=result.peaks,
+            loudness_lufs=result.loudness_lufs,
+            replay_gain_db=result.replay_gain_db,
+            peak_amplitude=result.peak_amplitude,
+        )
+    return values
+
+
+# Songs analyzed concurrently per batch of an "analyze_songs" job (the pool bounds CPU use).
+ANALYZE_JOB_BATCH = 8
+
+
+@job_handler("analyze_songs")
+async def analyze_songs_job(params: dict, ctx: JobContext) -> dict:
+    """Job: analyze the given songs (queued after uploads); deleted songs are skipped, and songs
+    without a decoder here are counted as no_decoder and left for a later run."""
+    from app.database import get_session_factory
+
+    song_ids = params["song_ids"]
+    analyzed = decoded = no_decoder = 0
+    for start in range(0, len(song_ids), ANALYZE_JOB_BATCH):
+        async with get_session_factory()() as db:
+            result = await db.execute(
+                select(Song.id, Song.filename).where(Song.id.in_(song_ids[start:start + ANALYZE_JOB_BATCH]))
+            )
+            rows = result.all()
+            results = await asyncio.gather(*(analysis_values(row.filename) for row in rows))
+            # Plain UPDATEs: a song deleted meanwhile just matches no row.
+            for row, values in zip(rows, results):
+                if values:
+                    await db.execute(update(Song).where(Song.id == row.id).values(**values))
+            await db.commit()
+        analyzed += len(rows)
+        decoded += sum("waveform_peaks" in values for values in results)
+        no_decoder += sum(not values for values in results)
+        await ctx.report(analyzed=analyzed, decoded=decoded, no_decoder=no_decoder, total=len(song_ids))
+    return {"analyzed": analyzed, "decoded": decoded, "no_decoder": no_decoder, "total": len(song_ids)}
+
+
+@job_handler("delete_song_files")
+async def delete_song_files_job(params: dict, ctx: JobContext) -> dict:
+    """Job: remove the stored files of songs whose rows are already deleted."""
+    await delete_song_files(params["filenames"])
+    return {"deleted": len(params["filenames"])}
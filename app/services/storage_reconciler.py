@@ -0,0 +1,162 @@
+"""
+Reconcile stored song/image files with the songs and background_images tables.
+
+Uploads write the file before the row is flushed and a failed delete can leave either
+side behind, so orphan files and rows without a file can accumulate. A reconcile pass
+lists both stores (``os.scandir`` over the directories and their shard sub-directories,
+or a paginated bucket listing; see app.storage), diffs them against all DB filenames in
+bulk, optionally removes orphans older than a grace period (so in-flight uploads are
+never collected) and remembers which rows have no file. Stream handlers consult that
+in-memory state instead of stat-ing the file before every response.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import BackgroundImage, Song
+from app.storage import Storage, StoredFile, get_image_storage, get_song_storage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconcileReport:
+    finished_at: datetime
+    song_files: int = 0
+    image_files: int = 0
+    orphan_song_files: list[str] = field(default_factory=list)
+    orphan_image_files: list[str] = field(default_factory=list)
+    missing_song_files: list[str] = field(default_factory=list)
+    missing_image_files: list[str] = field(default_factory=list)
+    # Files present but not where the configured shard layout expects them (run migrate_storage_layout).
+    misplaced_files: list[str] = field(default_factory=list)
+    collected: list[str] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "finished_at": self.finished_at.isoformat(),
+            "song_files": self.song_files,
+            "image_files": self.image_files,
+            "orphan_song_files": self.orphan_song_files,
+            "orphan_image_files": self.orphan_image_files,
+            "missing_song_files": self.missing_song_files,
+            "missing_image_files": self.missing_image_files,
+            "misplaced_files": self.misplaced_files,
+            "collected": self.collected,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+        }
+
+
+# Reconciled state: stored filenames known to have no file on disk.
+_missing_song_files: set[str] = set()
+_missing_image_files: set[str] = set()
+_last_report: ReconcileReport | None = None
+
+
+def is_song_file_missing(filename: str) -> bool:
+    return filename in _missing_song_files
+
+
+def is_image_file_missing(filename: str) -> bool:
+    return filename in _missing_image_files
+
+
+def mark_song_file_missing(filename: str) -> None:
+    _missing_song_files.add(filename)
+
+
+def mark_image_file_missing(filename: str) -> None:
+    _missing_image_files.add(filename)
+
+
+def get_last_report() -> ReconcileReport | None:
+    return _last_report
+
+
+def _collect(storage: Storage, files: list[StoredFile], grace_seconds: float) -> list[str]:
+    """Delete orphan files not modified within the grace period; returns collected names."""
+    cutoff = time.time() - grace_seconds
+    old = [f for f in files if f.mtime <= cutoff]
+    storage.delete_locators([f.locator for f in old])
+    return [f.name for f in old]
+
+
+async def reconcile_storage(
+    db: AsyncSession,
+    collect: bool = False,
+    grace_seconds: float | None = None,
+) -> ReconcileReport:
+    global _missing_song_files, _missing_image_files, _last_report
+    settings = get_settings()
+    if grace_seconds is None:
+        grace_seconds = settings.storage_orphan_grace_seconds
+    started = time.monotonic()
+    db_songs = set((await db.execute(select(Song.filename))).scalars().all())
+    db_images = set((await db.execute(select(BackgroundImage.filename))).scalars().all())
+    song_storage, image_storage = get_song_storage(), get_image_storage()
+    disk_songs, disk_images = await asyncio.gather(
+        asyncio.to_thread(song_storage.list_files),
+        asyncio.to_thread(image_storage.list_files),
+    )
+    report = ReconcileReport(
+        finished_at=datetime.utcnow(),
+        song_files=len(disk_songs),
+        image_files=len(disk_images),
+        orphan_song_files=sorted(disk_songs.keys() - db_songs),
+        orphan_image_files=sorted(disk_images.keys() - db_images),
+        missing_song_files=sorted(db_songs - disk_songs.keys()),
+        missing_image_files=sorted(db_images - disk_images.keys()),
+        misplaced_files=sorted(
+            [n for n, f in disk_songs.items() if f.locator != song_storage.locate(n)]
+            + [n for n, f in disk_images.items() if f.locator != image_storage.locate(n)]
+        ),
+    )
+    if collect:
+        report.collected = await asyncio.to_thread(
+            _collect, song_storage, [disk_songs[n] for n in report.orphan_song_files], grace_seconds
+        ) + await asyncio.to_thread(
+            _collect, image_storage, [disk_images[n] for n in report.orphan_image_files], grace_seconds
+        )
+    _missing_song_files = set(report.missing_song_files)
+    _missing_image_files = set(report.missing_image_files)
+    report.elapsed_seconds = time.monotonic() - started
+    _last_report = report
+    if (
+        report.orphan_song_files or report.orphan_image_files or report.missing_song_files
+        or report.missing_image_files or report.misplaced_files
+    ):
+        logger.warning(
+            "Storage reconcile: %d orphan songs, %d orphan images (%d collected), %d songs and %d images missing, "
+            "%d misplaced",
+            len(report.orphan_song_files),
+            len(report.orphan_image_files),
+            len(report.collected),
+            len(report.missing_song_files),
+            len(report.missing_image_files),
+            len(report.misplaced_files),
+        )
+    return report
+
+
+async def run_periodic_reconcile() -> None:
+    """Lifespan task: reconcile at startup and then every `storage_reconcile_interval_seconds`."""
+    from app.database import get_session_factory
+
+    settings = get_settings()
+    session_factory = get_session_factory()
+    while True:
+        try:
+            async with session_factory() as db:
+                await reconcile_storage(db, collect=settings.storage_reconcile_collect)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Storage reconcile failed")
+        await asyncio.sleep(settings.storage_reconcile_interval_seconds)
@@ -1,6 +1,15 @@
 (function () {
   const API = "/api";
   const TOKEN_KEY = "nivpro_token";
+  // Public settings inlined by the server into the page shell (saves a request on load).
+  const BOOT = (function () {
+    const el = document.getElementById("boot-data");
+    try {
+      return el ? JSON.parse(el.textContent) : {};
+    } catch (e) {
+      return {};
+    }
+  })();
 
   function getToken() {
     return localStorage.getItem(TOKEN_KEY);
@@ -35,6 +44,7 @@
   const progressBar = document.getElementById("progress-bar");
   const timeTotalEl = document.getElementById("time-total");
   const timeLeftEl = document.getElementById("time-left");
+  const waveformEl = document.getElementById("waveform");
 
   function formatTime(seconds) {
     if (!Number.isFinite(seconds) || seconds < 0) return "0:00";
@@ -59,10 +69,90 @@
     timeCurrentEl.textContent = formatTime(t);
   }
 
+  let currentPeaks = null;
+
+  function drawWaveform() {
+    const ctx = waveformEl.getContext("2d");
+    const w = waveformEl.width = waveformEl.clientWidth;
+    const h = waveformEl.height;
+    ctx.clearRect(0, 0, w, h);
+    if (!currentPeaks || currentPeaks.length === 0) return;
+    const played = Number.isFinite(audio.duration) && audio.duration > 0 ? audio.currentTime / audio.duration : 0;
+    for (let x = 0; x < w; x++) {
+      const peak = currentPeaks[Math.floor(x * currentPeaks.length / w)] / 255;
+      const barH = Math.max(1, peak * h);
+      ctx.fillStyle = x / w <= played ? "#0d6efd" : "#555";
+      ctx.fillRect(x, (h - barH) / 2, 1, barH);
+    }
+  }
+
+  async function loadAnalysis(song) {
+    // Precomputed on the server: waveform peaks and ReplayGain for volume normalization.
+    currentPeaks = null;
+    audio.volume = 1;
+    waveformEl.classList.add("hidden");
+    try {
+      const r = await fetch(API + "/songs/" + song.id + "/analysis", { headers: authHeaders() });
+      if (!r.ok || currentSong !== song) return;
+      const data = await r.json();
+      currentPeaks = data.peaks;
+      if (data.replay_gain_db != null) {
+        audio.volume = Math.min(1, Math.pow(10, data.replay_gain_db / 20));
+      }
+      waveformEl.classList.remove("hidden");
+      drawWaveform();
+    } catch (e) {
+      // Analysis is optional
+    }
+  }
+
+  // Play history: events are queued here and posted in batches (the server batches its writes too).
+  const PROGRESS_REPORT_SECONDS = 30;
+  let playEvents = [];
+  let lastProgressReport = 0;
+
+  function reportPlay(song, event) {
+    playEvents.push({
+      song_id: song.id,
+      event: event,
+      position_seconds: audio.currentTime || 0,
+      occurred_at: new Date().toISOString(),
+    });
+    if (playEvents.length >= 20) flushPlayEvents(false);
+  }
+
+  function flushPlayEvents(keepalive) {
+    if (playEvents.length === 0 || !getToken()) return;
+    const events = playEvents.splice(0, 100);
+    fetch(API + "/plays", {
+      method: "POST",
+      headers: Object.assign({ "Content-Type": "application/json" }, authHeaders()),
+      body: JSON.stringify({ events: events }),
+      keepalive: keepalive,
+    }).then(function (r) {
+      // Queue full on the server: keep the events for the next flush.
+      if (r.status === 503) playEvents = events.concat(playEvents);
+    }).catch(function () {
+      playEvents = events.concat(playEvents);
+    });
+  }
+
+  setInterval(function () { flushPlayEvents(false); }, 15000);
+  document.addEventListener("visibilitychange", function () {
+    if (document.visibilityState === "hidden") flushPlayEvents(true);
+  });
+
   let currentPlaylist = [];
   let currentIndex = -1;
   let currentSong = null;
   let isShuffled = false;
+  let shuffleSeed = Math.floor(Math.random() * 0x100000000);
+  let currentQuery = "";
+  // Next track from /api/songs/up-next: its signed URL is fetched ahead so playback starts without a round trip.
+  let upNext = null;
+  const prefetchAudio = new Audio();
+  prefetchAudio.preload = "auto";
+  prefetchAudio.muted = true;
   let isPlaying = false;
   let autoChangeBg = false;
 
@@ -76,9 +166,12 @@
 
   async function updateSignupVisibility() {
     try {
-      const r = await fetch(API + "/auth/registration-allowed");
-      const data = await r.json().catch(function () { return { allow_registration: false }; });
-      const allow = data.allow_registration === true;
+      let allow = BOOT.allow_registration;
+      if (typeof allow !== "boolean") {
+        const r = await fetch(API + "/auth/registration-allowed");
+        const data = await r.json().catch(function () { return { allow_registration: false }; });
+        allow = data.allow_registration === true;
+      }
       const signupToggle = document.getElementById("show-signup");
       if (signupToggle && signupToggle.closest("p")) {
         signupToggle.closest("p").style.display = allow ? "" : "none";
@@ -132,13 +225,51 @@
     }
   }
 
+  // Same 32-bit hash as song_service.shuffle_key, so the server's up-next order matches this list.
+  function shuffleKey(seed, id) {
+    let h = (seed ^ Math.imul(id, 0x9E3779B1)) >>> 0;
+    h = (h ^ (h >>> 16)) >>> 0;
+    h = Math.imul(h, 0x85EBCA6B) >>> 0;
+    h = (h ^ (h >>> 13)) >>> 0;
+    h = Math.imul(h, 0xC2B2AE35) >>> 0;
+    return (h ^ (h >>> 16)) >>> 0;
+  }
+
   function shuffleArray(arr) {
-    const shuffled = [...arr];
-    for (let i = shuffled.length - 1; i > 0; i--) {
-      const j = Math.floor(Math.random() * (i + 1));
-      [shuffled[i], shuffled[j]] = [shuffled[j], shuffled[i]];
+    return arr.map(function (s) { return [shuffleKey(shuffleSeed, s.id), s]; })
+      .sort(function (a, b) { return a[0] - b[0] || a[1].id - b[1].id; })
+      .map(function (pair) { return pair[1]; });
+  }
+
+  async function prefetchNext(song) {
+    upNext = null;
+    let url = API + "/songs/up-next?count=1&after=" + song.id;
+    if (isShuffled && currentPlaylist.length) {
+      // The shuffled list is already here: name the next song so the server does not rebuild the order.
+      url = API + "/songs/up-next?ids=" + currentPlaylist[(currentIndex + 1) % currentPlaylist.length].id;
+    } else if (currentQuery) {
+      url += "&search=" + encodeURIComponent(currentQuery);
+    }
+    try {
+      const r = await fetch(url, { headers: authHeaders() });
+      if (!r.ok) return;
+      const next = (await r.json())[0];
+      if (!next || currentSong !== song) return;
+      upNext = next;
+      // Warm the first bytes of the next track (same URL, so the browser can reuse the response).
+      prefetchAudio.src = next.stream_url;
+    } catch (e) {
+      upNext = null;
     }
-    return shuffled;
+  }
+
+  async function streamUrl(song) {
+    if (upNext && upNext.id === song.id && upNext.expires * 1000 > Date.now() + 5000) {
+      return upNext.stream_url;
+    }
+    const r = await fetch(API + "/songs/" + song.id + "/stream-url", { headers: authHeaders() });
+    if (!r.ok) return null;
+    return (await r.json()).url;
   }
 
   function updatePlayPauseButton() {
@@ -174,17 +305,20 @@
     timeCurrentEl.textContent = "0:00";
     timeTotalEl.textContent = "0:00";
     timeLeftEl.textContent = "";
-    if (audio.src && audio.src.startsWith("blob:")) URL.revokeObjectURL(audio.src);
-    const r = await fetch(API + "/songs/" + song.id + "/stream", { headers: authHeaders() });
-    if (!r.ok) {
+    // Signed URL: the <audio> element streams with native range requests, no auth header needed.
+    const url = await streamUrl(song);
+    if (!url) {
       nowPlayingTitle.textContent = "Could not load song.";
       nowPlayingArtist.textContent = "";
       playNext();
       return;
     }
-    const blob = await r.blob();
-    audio.src = URL.createObjectURL(blob);
+    audio.src = url;
     audio.play();
+    prefetchNext(song);
+    lastProgressReport = 0;
+    reportPlay(song, "start");
+    loadAnalysis(song);
     isPlaying = true;
     updatePlayPauseButton();
     if (autoChangeBg) {
@@ -336,6 +470,7 @@
   shuffleBtn.addEventListener("click", function () {
     isShuffled = !isShuffled;
     if (isShuffled) {
+      shuffleSeed = Math.floor(Math.random() * 0x100000000);
       shuffleBtn.classList.add("active");
       if (currentPlaylist.length > 0 && currentIndex >= 0) {
         const currentSong = currentPlaylist[currentIndex];
@@ -346,6 +481,7 @@
     } else {
       shuffleBtn.classList.remove("active");
     }
+    if (currentSong) prefetchNext(currentSong);
   });
 
   loveBtn.addEventListener("click", async function () {
@@ -372,6 +508,7 @@
   audio.addEventListener("ended", function () {
     isPlaying = false;
     updatePlayPauseButton();
+    if (currentSong) reportPlay(currentSong, "complete");
     if (currentPlaylist.length > 0 && currentIndex >= 0) {
       playNext();
     }
@@ -387,7 +524,14 @@
     updatePlayPauseButton();
   });
 
-  audio.addEventListener("timeupdate", updateProgressDisplay);
+  audio.addEventListener("timeupdate", function () {
+    updateProgressDisplay();
+    if (currentPeaks) drawWaveform();
+    if (currentSong && audio.currentTime - lastProgressReport >= PROGRESS_REPORT_SECONDS) {
+      lastProgressReport = audio.currentTime;
+      reportPlay(currentSong, "progress");
+    }
+  });
   audio.addEventListener("loadedmetadata", function () {
     progressBar.max = Math.floor(audio.duration) || 0;
     timeTotalEl.textContent = formatTime(audio.duration);
@@ -409,11 +553,29 @@
     updateProgressDisplay();
   });
 
+  // Columnar catalogue (see app/services/catalog.py) back to one object per song.
+  function catalogSongs(catalog) {
+    const loved = new Set(catalog.loved);
+    const cols = catalog.columns;
+    const songs = new Array(catalog.count);
+    for (let i = 0; i < catalog.count; i++) {
+      const s = {};
+      for (let c = 0; c < cols.length; c++) s[cols[c]] = catalog.data[c][i];
+      s.is_loved = loved.has(s.id);
+      songs[i] = s;
+    }
+    return songs;
+  }
+
   async function loadSongs(query) {
     const url = query ? API + "/songs?search=" + encodeURIComponent(query) : API + "/songs";
-    const r = await fetch(url, { headers: authHeaders() });
+    const headers = authHeaders();
+    headers["Accept"] = "application/vnd.nivpro.catalog+json, application/json;q=0.5";
+    const r = await fetch(url, { headers: headers });
     if (!r.ok) { showLogin(); return; }
-    const songs = await r.json();
+    const body = await r.json();
+    const songs = Array.isArray(body) ? body : catalogSongs(body);
+    currentQuery = query || "";
     currentPlaylist = songs;
     if (isShuffled && currentIndex >= 0 && currentSong) {
       const currentSongId = currentSong.id;
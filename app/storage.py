@@ -0,0 +1,296 @@
+"""
+Storage for uploaded songs and images: local filesystem or S3-compatible object storage
+(``STORAGE_BACKEND=local|s3``), plus the layout both use.
+
+With ``STORAGE_SHARD_DEPTH=N`` (N > 0) a stored file lives under N levels of two-hex-digit
+directories taken from the MD5 of its name, e.g. ``uploads/3f/a2/<uuid>.mp3`` for N=2,
+so no directory grows beyond a few thousand entries. N=0 keeps the flat layout.
+The DB only stores the bare filename; the layout is always derived from it.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Callable, NamedTuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import get_settings
+
+
+def is_missing_object(error: Exception) -> bool:
+    """True for a boto ClientError about a key that does not exist (GET: NoSuchKey, HEAD: 404)."""
+    return getattr(error, "response", {}).get("Error", {}).get("Code") in ("NoSuchKey", "404")
+
+
+def shard_dirs(filename: str, depth: int) -> list[str]:
+    digest = hashlib.md5(filename.encode("utf-8")).hexdigest()
+    return [digest[2 * i:2 * i + 2] for i in range(depth)]
+
+
+def stored_path(root: Path, filename: str, depth: int | None = None) -> Path:
+    """Where `filename` lives under `root` for the configured (or given) shard depth."""
+    if depth is None:
+        depth = get_settings().storage_shard_depth
+    return root.joinpath(*shard_dirs(filename, depth), filename)
+
+
+def scan_files(root: Path, exclude: Path | None = None) -> dict[str, Path]:
+    """Map of filename -> path for every regular, non-hidden file under `root`, any depth.
+
+    `exclude` skips a nested directory (images_dir lives inside upload_dir).
+    """
+    excluded = os.path.realpath(exclude) if exclude is not None else None
+    files: dict[str, Path] = {}
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if excluded is None or os.path.realpath(entry.path) != excluded:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files[entry.name] = Path(entry.path)
+        except FileNotFoundError:
+            pass
+    return files
+
+
+def migrate_layout(root: Path, depth: int, exclude: Path | None = None, dry_run: bool = False) -> tuple[int, int]:
+    """Move every file under `root` to its location for `depth`. Returns (moved, already_in_place).
+
+    Each move is an atomic rename, so an interrupted migration can simply be run again.
+    """
+    moved = in_place = 0
+    old_dirs: set[Path] = set()
+    for name, path in scan_files(root, exclude=exclude).items():
+        target = stored_path(root, name, depth)
+        if path == target:
+            in_place += 1
+            continue
+        if not dry_run:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+            if path.parent != root:
+                old_dirs.add(path.parent)
+        moved += 1
+    # Remove shard directories the move left empty (deepest first).
+    for directory in sorted(old_dirs, key=lambda p: len(p.parts), reverse=True):
+        while directory != root and root in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+    return moved, in_place
+
+
+class StoredFile(NamedTuple):
+    name: str
+    locator: str  # filesystem path or object key
+    mtime: float
+
+
+class Storage(ABC):
+    """Where uploaded song/image bytes live. Files are addressed by their stored name;
+    the backend derives the physical location (path or object key) with the shard layout."""
+
+    @abstractmethod
+    def locate(self, filename: str) -> str:
+        ...
+
+    @abstractmethod
+    async def save(self, filename: str, fileobj: BinaryIO, content_type: str | None = None) -> None:
+        """Store a file-like object without reading it fully into memory."""
+
+    @abstractmethod
+    async def delete(self, filename: str) -> None:
+        ...
+
+    @abstractmethod
+    def list_files(self) -> dict[str, StoredFile]:
+        """Every stored file by name (blocking; call from a thread)."""
+
+    @abstractmethod
+    def delete_locators(self, locators: list[str]) -> None:
+        """Delete files by locator as returned from list_files (blocking)."""
+
+    @abstractmethod
+    def local_copy(self, filename: str) -> AbstractAsyncContextManager[Path]:
+        """A local path with the file's bytes, for tools that need one (mutagen, ffmpeg)."""
+
+    @abstractmethod
+    def response(
+        self,
+        filename: str,
+        request: Request,
+        media_type: str,
+        headers: dict[str, str] | None = None,
+        download_name: str | None = None,
+        on_missing: Callable[[], None] | None = None,
+    ) -> Response:
+        """Response streaming the file, honouring Range requests."""
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: Path, exclude: Path | None = None):
+        self.root = root
+        self.exclude = exclude
+
+    def path(self, filename: str) -> Path:
+        return stored_path(self.root, filename)
+
+    def locate(self, filename: str) -> str:
+        return str(self.path(filename))
+
+    async def save(self, filename: str, fileobj: BinaryIO, content_type: str | None = None) -> None:
+        def _write():
+            dest = self.path(filename)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with open(dest, "wb") as out:
+                shutil.copyfileobj(fileobj, out, 1024 * 1024)
+
+        await asyncio.to_thread(_write)
+
+    async def delete(self, filename: str) -> None:
+        self.path(filename).unlink(missing_ok=True)
+
+    def list_files(self) -> dict[str, StoredFile]:
+        files = {}
+        for name, path in scan_files(self.root, exclude=self.exclude).items():
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            files[name] = StoredFile(name, str(path), mtime)
+        return files
+
+    def delete_locators(self, locators: list[str]) -> None:
+        for locator in locators:
+            Path(locator).unlink(missing_ok=True)
+
+    @asynccontextmanager
+    async def local_copy(self, filename: str):
+        yield self.path(filename)
+
+    def response(self, filename, request, media_type, headers=None, download_name=None, on_missing=None):
+        from app.responses import StoredFileResponse
+
+        return StoredFileResponse(
+            self.path(filename),
+            media_type=media_type,
+            headers=headers,
+            filename=download_name,
+            on_missing=on_missing,
+        )
+
+
+class S3Storage(Storage):
+    """S3-compatible object storage (AWS, MinIO, ...). Requires boto3."""
+
+    def __init__(self, bucket: str, prefix: str = "", client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+            settings = get_settings()
+            client = boto3.client(
+                "s3",
+                endpoint_url=settings.s3_endpoint_url or None,
+                region_name=settings.s3_region or None,
+                aws_access_key_id=settings.s3_access_key_id or None,
+                aws_secret_access_key=settings.s3_secret_access_key or None,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def locate(self, filename: str) -> str:
+        return self.prefix + "/".join([*shard_dirs(filename, get_settings().storage_shard_depth), filename])
+
+    async def save(self, filename: str, fileobj: BinaryIO, content_type: str | None = None) -> None:
+        # upload_fileobj switches to a streamed multipart upload for large files.
+        extra = {"ContentType": content_type} if content_type else None
+        await asyncio.to_thread(
+            self.client.upload_fileobj, fileobj, self.bucket, self.locate(filename), ExtraArgs=extra
+        )
+
+    async def delete(self, filename: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.locate(filename))
+
+    def list_files(self) -> dict[str, StoredFile]:
+        files = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                name = obj["Key"].rsplit("/", 1)[-1]
+                if not name or name.startswith("."):
+                    continue
+                files[name] = StoredFile(name, obj["Key"], obj["LastModified"].timestamp())
+        return files
+
+    def delete_locators(self, locators: list[str]) -> None:
+        for i in range(0, len(locators), 1000):
+            batch = [{"Key": key} for key in locators[i:i + 1000]]
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True})
+
+    @asynccontextmanager
+    async def local_copy(self, filename: str):
+        suffix = Path(filename).suffix
+        fd, tmp = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        try:
+            try:
+                await asyncio.to_thread(self.client.download_file, self.bucket, self.locate(filename), tmp)
+            except Exception as e:
+                # A missing object is unreadable for good: leave the temp file empty. Anything else
+                # (credentials, throttling, network) propagates so the job fails and is retried.
+                if not is_missing_object(e):
+                    raise
+            yield Path(tmp)
+        finally:
+            os.unlink(tmp)
+
+    def response(self, filename, request, media_type, headers=None, download_name=None, on_missing=None):
+        from app.responses import S3ObjectResponse
+
+        return S3ObjectResponse(
+            self.client,
+            self.bucket,
+            self.locate(filename),
+            range_header=request.headers.get("range"),
+            media_type=media_type,
+            headers=headers,
+            filename=download_name,
+            on_missing=on_missing,
+        )
+
+
+def _make_storage(local_root: Path, local_exclude: Path | None, s3_prefix: str) -> Storage:
+    settings = get_settings()
+    if settings.storage_backend == "s3":
+        return S3Storage(settings.s3_bucket, prefix="/".join(p for p in (settings.s3_prefix, s3_prefix) if p))
+    return LocalStorage(local_root, exclude=local_exclude)
+
+
+@lru_cache
+def get_song_storage() -> Storage:
+    settings = get_settings()
+    return _make_storage(settings.upload_dir, settings.images_dir, "songs")
+
+
+@lru_cache
+def get_image_storage() -> Storage:
+    settings = get_settings()
+    return _make_storage(settings.images_dir, None, "images")
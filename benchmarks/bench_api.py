@@ -0,0 +1,138 @@
+"""
+Microbenchmarks (pytest-benchmark) for the player/admin hot paths against a seeded library.
+
+Not collected by the regular test run (files are bench_*.py). Run with:
+    pip install pytest-benchmark
+    python -m pytest benchmarks/bench_api.py --benchmark-json=bench.json
+    BENCH_SONGS=50000 python -m pytest benchmarks/bench_api.py --benchmark-compare
+Library size: BENCH_SONGS (default 1000), BENCH_USERS (20), BENCH_LOVES (50 per user).
+"""
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks import seed  # noqa: E402  (sets the bench env before app is imported)
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.auth import create_access_token, get_current_user  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.database import get_session_factory  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Song, UserRole  # noqa: E402
+from app.routers.player import SongOut  # noqa: E402
+from app.services.catalog import SHUFFLE_ORDERS_CACHED  # noqa: E402
+from app.services.song_service import list_songs, parse_tags, up_next  # noqa: E402
+from app.storage import stored_path  # noqa: E402
+
+SONGS = int(os.environ.get("BENCH_SONGS", "1000"))
+USERS = int(os.environ.get("BENCH_USERS", "20"))
+LOVES = int(os.environ.get("BENCH_LOVES", "50"))
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(seed.seed_library(songs=SONGS, users=USERS, loves_per_user=LOVES))
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def session_factory(loop):
+    return get_session_factory()
+
+
+@pytest.fixture(scope="module")
+def client(loop):
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def viewer_token():
+    return create_access_token(seed.bench_username(0), UserRole.viewer)
+
+
+def test_list_songs_service(benchmark, loop, session_factory):
+    async def run():
+        async with session_factory() as db:
+            return await list_songs(db)
+
+    songs = benchmark(lambda: loop.run_until_complete(run()))
+    assert len(songs) == SONGS
+
+
+def test_list_songs_search(benchmark, loop, session_factory):
+    async def run():
+        async with session_factory() as db:
+            return await list_songs(db, search="river")
+
+    benchmark(lambda: loop.run_until_complete(run()))
+
+
+@pytest.mark.parametrize("seeds", [1, 4 * SHUFFLE_ORDERS_CACHED])
+def test_up_next_shuffle(benchmark, loop, session_factory, seeds):
+    # More listeners in shuffle mode than cached orders: each call rebuilds one in a thread.
+    calls = iter(range(1 << 30))
+
+    async def run():
+        async with session_factory() as db:
+            return await up_next(db, 1, 1, seed=next(calls) % seeds)
+
+    assert len(benchmark(lambda: loop.run_until_complete(run()))) == 1
+
+
+def test_parse_tags(benchmark):
+    path = stored_path(get_settings().upload_dir, seed.song_filename(0))
+    title, artist, duration = benchmark(parse_tags, path)
+    assert duration is not None
+
+
+def test_auth_dependency(benchmark, loop, session_factory, viewer_token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=viewer_token)
+
+    async def run():
+        async with session_factory() as db:
+            return await get_current_user(db, credentials=credentials)
+
+    user = benchmark(lambda: loop.run_until_complete(run()))
+    assert user.username == seed.bench_username(0)
+
+
+def test_serialize_song_list(benchmark, loop, session_factory):
+    async def load():
+        async with session_factory() as db:
+            return list((await db.execute(select(Song).order_by(Song.id))).scalars().all())
+
+    songs = loop.run_until_complete(load())
+    adapter = TypeAdapter(list[SongOut])
+
+    def serialize():
+        return adapter.dump_json([SongOut.from_orm_song(s) for s in songs])
+
+    assert benchmark(serialize)
+
+
+def test_api_list_songs(benchmark, client, viewer_token):
+    headers = {"Authorization": f"Bearer {viewer_token}"}
+
+    def request():
+        r = client.get("/api/songs", headers=headers)
+        assert r.status_code == 200
+        return r
+
+    r = benchmark.pedantic(request, rounds=5, warmup_rounds=1)
+    assert len(r.json()) == SONGS
+
+
+def test_api_stream_range(benchmark, client, viewer_token):
+    headers = {"Authorization": f"Bearer {viewer_token}", "Range": "bytes=0-65535"}
+    r = benchmark(client.get, "/api/songs/1/stream", headers=headers)
+    assert r.status_code == 206
@@ -0,0 +1,93 @@
+"""
+Serialization and compression of a large song listing (no DB): CPU time per render and
+bytes on the wire, recorded in each benchmark's extra_info of the JSON report.
+
+    python -m pytest benchmarks/bench_serialization.py --benchmark-json=serialization.json
+Listing size: BENCH_LISTING_SONGS (default 50000).
+"""
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks import seed  # noqa: E402,F401  (bench env before app is imported)
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.compression import brotli, compress  # noqa: E402
+from app.models import Song  # noqa: E402
+from app.responses import ORJSONResponse  # noqa: E402
+from app.routers.player import SongOut  # noqa: E402
+from app.services.catalog import CATALOG_JSON, MSGPACK, _encode, _payload, _with_loved, msgpack  # noqa: E402
+
+LISTING_SONGS = int(os.environ.get("BENCH_LISTING_SONGS", "50000"))
+
+
+@pytest.fixture(scope="module")
+def songs():
+    return [
+        Song(
+            id=i,
+            filename=f"{i:032x}.mp3",
+            title=f"Song {i} River",
+            artist=f"Artist {i % 500}",
+            duration_seconds=120.0 + i % 300,
+        )
+        for i in range(1, LISTING_SONGS + 1)
+    ]
+
+
+@pytest.fixture(scope="module")
+def listing(songs):
+    return ORJSONResponse([SongOut.row(s, love_count=i % 7, is_loved=bool(i % 2)) for i, s in enumerate(songs)]).body
+
+
+def test_render_pydantic_models(benchmark, songs):
+    """The previous path: validated SongOut per row, then FastAPI's response-model dump."""
+    adapter = TypeAdapter(list[SongOut])
+
+    def render():
+        models = [SongOut.from_orm_song(s, love_count=i % 7, is_loved=bool(i % 2)) for i, s in enumerate(songs)]
+        return adapter.dump_json(adapter.validate_python(models))
+
+    body = benchmark(render)
+    benchmark.extra_info["bytes"] = len(body)
+
+
+def test_render_orjson_rows(benchmark, songs):
+    def render():
+        return ORJSONResponse([SongOut.row(s, love_count=i % 7, is_loved=bool(i % 2)) for i, s in enumerate(songs)]).body
+
+    body = benchmark(render)
+    benchmark.extra_info["bytes"] = len(body)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compress_listing(benchmark, listing, encoding):
+    if encoding == "br" and brotli is None:
+        pytest.skip("brotli not installed")
+    body = benchmark(compress, listing, encoding)
+    benchmark.extra_info["bytes"] = len(body)
+    benchmark.extra_info["uncompressed_bytes"] = len(listing)
+    benchmark.extra_info["ratio"] = round(len(body) / len(listing), 4)
+
+
+@pytest.mark.parametrize("media_type", [CATALOG_JSON, MSGPACK])
+def test_render_compact_catalog(benchmark, songs, media_type):
+    """Columnar catalogue (app.services.catalog): encoded once per snapshot, not per request."""
+    if media_type == MSGPACK and msgpack is None:
+        pytest.skip("msgpack not installed")
+    rows = [(s.id, s.title, s.artist, s.duration_seconds, s.filename, i % 7) for i, s in enumerate(songs)]
+    body = benchmark(lambda: _encode(_payload(rows), media_type))
+    benchmark.extra_info["bytes"] = len(body)
+    benchmark.extra_info["gzip_bytes"] = len(compress(body, "gzip"))
+
+
+def test_compact_catalog_per_request(benchmark, songs):
+    """What a cached snapshot costs per request: splicing in the caller's loved ids."""
+    rows = [(s.id, s.title, s.artist, s.duration_seconds, s.filename, i % 7) for i, s in enumerate(songs)]
+    snapshot = _encode(_payload(rows), CATALOG_JSON)
+    loved = list(range(1, LISTING_SONGS, 50))
+    body = benchmark(_with_loved, snapshot, CATALOG_JSON, loved)
+    benchmark.extra_info["bytes"] = len(body)
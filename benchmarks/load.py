@@ -0,0 +1,131 @@
+"""
+Load scenario: virtual viewers loop login -> list songs -> stream -> love against the app
+in-process (httpx ASGITransport, no network or server needed) and a JSON report with
+per-step latency percentiles and throughput is written for comparing runs.
+
+Usage: python -m benchmarks.load [--songs 1000] [--users 20] [--concurrency 10]
+                                 [--iterations 20] [--seed 42] [--out load-report.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks import seed  # noqa: E402  (sets the bench env before app is imported)
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+STEPS = ("login", "list", "stream_url", "stream", "love")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def _viewer(client: httpx.AsyncClient, user_index: int, iterations: int, songs: int,
+                  rng: random.Random, timings: dict, errors: dict) -> None:
+    async def step(name: str, coro):
+        started = time.perf_counter()
+        try:
+            r = await coro
+        except Exception:
+            errors[name] += 1
+            return None
+        timings[name].append(time.perf_counter() - started)
+        if r.status_code >= 400:
+            errors[name] += 1
+            return None
+        return r
+
+    for _ in range(iterations):
+        r = await step("login", client.post(
+            "/api/auth/login",
+            data={"username": seed.bench_username(user_index), "password": seed.BENCH_PASSWORD},
+        ))
+        if r is None:
+            continue
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        await step("list", client.get("/api/songs", headers=headers))
+        song_id = rng.randint(1, min(seed.STREAMABLE_SONGS, songs))
+        r = await step("stream_url", client.get(f"/api/songs/{song_id}/stream-url", headers=headers))
+        if r is not None:
+            await step("stream", client.get(r.json()["url"], headers={"Range": "bytes=0-"}))
+        await step("love", client.post(f"/api/songs/{rng.randint(1, songs)}/love", headers=headers))
+
+
+async def main(songs: int = 1000, users: int = 20, concurrency: int = 10, iterations: int = 20,
+               seed_value: int = 42, out: str = "load-report.json") -> dict:
+    library = await seed.seed_library(songs=songs, users=users, seed=seed_value)
+    timings: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                _viewer(client, i % users, iterations, songs, random.Random(seed_value + i), timings, errors)
+                for i in range(concurrency)
+            ))
+            wall = time.perf_counter() - started
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "git_sha": _git_sha(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"concurrency": concurrency, "iterations": iterations, **library},
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(sum(len(v) for v in timings.values()) / wall, 2) if wall else 0.0,
+        "steps": {
+            name: {
+                "count": len(timings[name]),
+                "errors": errors[name],
+                "mean_ms": round(statistics.fmean(timings[name]) * 1000, 2),
+                "p50_ms": round(_percentile(timings[name], 50) * 1000, 2),
+                "p95_ms": round(_percentile(timings[name], 95) * 1000, 2),
+                "p99_ms": round(_percentile(timings[name], 99) * 1000, 2),
+                "max_ms": round(max(timings[name]) * 1000, 2),
+            }
+            for name in STEPS
+            if timings[name]
+        },
+    }
+    Path(out).write_text(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load scenario for the player API")
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20, help="Scenario loops per virtual viewer")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="load-report.json")
+    args = parser.parse_args()
+    report = asyncio.run(main(args.songs, args.users, args.concurrency, args.iterations, args.seed, args.out))
+    for name, s in report["steps"].items():
+        print(f"{name:>10}: n={s['count']:<5} err={s['errors']:<3} p50={s['p50_ms']:.1f}ms p95={s['p95_ms']:.1f}ms")
+    print(f"{report['requests_per_second']} req/s over {report['wall_seconds']}s -> {args.out}")
@@ -0,0 +1,72 @@
+"""
+Synthetic library for benchmarks: an isolated SQLite DB and upload dir, N songs, M viewers
+and Zipf-distributed loves (app.scripts.generate_data). Deterministic for a given seed so
+runs are comparable.
+
+Import this module before anything from `app`: it points DATABASE_URL/UPLOAD_DIR at a
+throwaway directory (BENCH_DIR, default ./bench_data) the same way tests/conftest.py does.
+"""
+import os
+from pathlib import Path
+
+BENCH_DIR = Path(os.environ.get("BENCH_DIR", "./bench_data")).resolve()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{BENCH_DIR / 'bench.db'}"
+os.environ["UPLOAD_DIR"] = str(BENCH_DIR / "uploads")
+os.environ["IMAGES_DIR"] = str(BENCH_DIR / "uploads" / "images")
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+os.environ["CREATE_DEFAULT_ADMIN"] = "true"
+os.environ["STORAGE_RECONCILE_INTERVAL_SECONDS"] = "0"
+os.environ["ANALYZE_ON_UPLOAD"] = "false"
+os.environ["STORAGE_BACKEND"] = "local"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.auth import hash_password  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.database import get_engine, init_db  # noqa: E402
+from app.models import User, UserRole  # noqa: E402
+from app.scripts.generate_data import (  # noqa: E402
+    generate_data,
+    generated_song_filename,
+    generated_username,
+)
+
+BENCH_PASSWORD = "bench-password"
+# Only the first songs get a real file; the load scenario streams from these.
+STREAMABLE_SONGS = 50
+
+
+def song_filename(i: int) -> str:
+    return generated_song_filename("bench", i)
+
+
+def bench_username(i: int) -> str:
+    return generated_username("bench", i)
+
+
+async def seed_library(songs: int = 1000, users: int = 20, loves_per_user: int = 50, seed: int = 42) -> dict:
+    """Create a fresh DB under BENCH_DIR with the given library size. Returns a summary dict."""
+    import shutil
+
+    shutil.rmtree(BENCH_DIR, ignore_errors=True)
+    settings = get_settings()
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+    settings.images_dir.mkdir(parents=True, exist_ok=True)
+    await init_db()
+    engine = get_engine()
+    # Admin is user 1, so viewers start at 2 and songs at 1.
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{"username": "admin", "password_hash": hash_password("admin"), "role": UserRole.admin}])
+    summary = await generate_data(
+        engine,
+        users=users,
+        songs=songs,
+        loves=users * loves_per_user,
+        backgrounds=0,
+        files=STREAMABLE_SONGS,
+        seed=seed,
+        prefix="bench",
+        password=BENCH_PASSWORD,
+    )
+    await engine.dispose()
+    return {"songs": songs, "users": users, "loves": summary["loves"], "seed": seed}
@@ -7,6 +7,7 @@ clean them up after each test that requests them.
 """
 import os
 import shutil
+import time
 
 # ── env vars must be set before any app module is imported ──────────────────
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test_nivpro.db"
@@ -15,6 +16,8 @@ os.environ["CREATE_DEFAULT_ADMIN"] = "true"
 os.environ["ALLOW_REGISTRATION"] = "true"
 os.environ["UPLOAD_DIR"] = "./test_uploads"
 os.environ["IMAGES_DIR"] = "./test_uploads/images"
+# Charts tests refresh right after recording plays/loves (test_charts covers the lag itself).
+os.environ["ROLLUP_FOLD_LAG_SECONDS"] = "0"
 
 import pytest
 from fastapi.testclient import TestClient
@@ -27,6 +30,17 @@ FAKE_MP3 = b"\xff\xfb\x90\x00" + b"\x00" * 128  # fake MP3 frame header
 FAKE_IMG = b"\xff\xd8\xff\xe0" + b"\x00" * 128  # fake JPEG SOI marker
 
 
+def wait_for_job(client, admin_headers, job_id, timeout=5.0):
+    """Poll /api/admin/jobs/{id} until the job is no longer queued or running."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers).json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
 # ── session-scoped client ─────────────────────────────────────────────────────
 
 @pytest.fixture(scope="session")
@@ -36,18 +50,19 @@ def client():
         yield c
     # Dispose async engine so aiosqlite releases the file handle (needed on Windows).
     import asyncio
-    from app.database import get_engine
-    engine = get_engine()
+    from app.database import get_engine, get_read_engine
     loop = asyncio.new_event_loop()
     try:
-        loop.run_until_complete(engine.dispose())
+        loop.run_until_complete(get_read_engine().dispose())
+        loop.run_until_complete(get_engine().dispose())
     finally:
         loop.close()
     # Cleanup test artifacts
-    try:
-        os.remove("./test_nivpro.db")
-    except (FileNotFoundError, PermissionError):
-        pass
+    for path in ("./test_nivpro.db", "./test_nivpro.db-wal", "./test_nivpro.db-shm"):
+        try:
+            os.remove(path)
+        except (FileNotFoundError, PermissionError):
+            pass
     shutil.rmtree("./test_uploads", ignore_errors=True)
 
 
@@ -106,3 +121,23 @@ def uploaded_bg(client, admin_headers):
     bg = r.json()
     yield bg
     client.delete(f"/api/admin/backgrounds/{bg['id']}", headers=admin_headers)
+
+
+@pytest.fixture
+def enforce_foreign_keys(client, monkeypatch):
+    """Write through an engine with SQLite foreign keys on, as PostgreSQL enforces them."""
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from app.config import get_settings
+
+    engine = create_async_engine(get_settings().database_url)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("app.database.get_session_factory", lambda: factory)
+    yield
+    monkeypatch.undo()
+    client.portal.call(engine.dispose)
@@ -0,0 +1,62 @@
+"""Tests for opt-in request profiling and the slow-request log."""
+import logging
+
+from app.config import get_settings
+
+
+def test_admin_can_profile_request(client, admin_headers):
+    r = client.get("/api/songs", headers={**admin_headers, "X-Profile": "1"})
+    assert r.status_code == 200
+    profile_id = int(r.headers["x-profile-id"])
+
+    r = client.get("/api/admin/profiles", headers=admin_headers)
+    assert r.status_code == 200
+    summary = next(p for p in r.json() if p["id"] == profile_id)
+    assert summary["route"] == "/api/songs"
+    assert summary["status"] == 200
+    assert "profile" not in summary
+
+    r = client.get(f"/api/admin/profiles/{profile_id}", headers=admin_headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["sql_count"] == len(data["sql"]) >= 1
+    assert any("FROM songs" in q["statement"] for q in data["sql"])
+    assert "cumulative" in data["profile"]
+
+
+def test_viewer_profile_header_ignored(client, viewer_headers):
+    r = client.get("/api/songs", headers={**viewer_headers, "X-Profile": "1"})
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+
+
+def test_sampled_profiling(client, viewer_headers):
+    settings = get_settings()
+    settings.profile_sample_rate = 1.0
+    try:
+        r = client.get("/api/songs", headers=viewer_headers)
+    finally:
+        settings.profile_sample_rate = 0.0
+    assert "x-profile-id" in r.headers
+
+
+def test_profiles_admin_only(client, viewer_headers):
+    assert client.get("/api/admin/profiles", headers=viewer_headers).status_code == 403
+    assert client.get("/api/admin/profiles").status_code == 401
+
+
+def test_profile_not_found(client, admin_headers):
+    assert client.get("/api/admin/profiles/999999", headers=admin_headers).status_code == 404
+
+
+def test_slow_request_logged(client, caplog):
+    settings = get_settings()
+    old = settings.slow_request_ms
+    settings.slow_request_ms = 1
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.profiling"):
+            # Login runs bcrypt, which always takes well over a millisecond.
+            client.post("/api/auth/login", data={"username": "admin", "password": "admin"})
+    finally:
+        settings.slow_request_ms = old
+    assert any("Slow request: POST /api/auth/login" in rec.getMessage() for rec in caplog.records)
@@ -1,5 +1,7 @@
 """Tests for /api/admin/songs/* endpoints."""
-from tests.conftest import FAKE_MP3
+import pytest
+
+from tests.conftest import FAKE_MP3, wait_for_job
 
 
 # ── upload ────────────────────────────────────────────────────────────────────
@@ -166,3 +168,143 @@ def test_delete_song_not_found(client, admin_headers):
 def test_delete_song_viewer_forbidden(client, viewer_headers, uploaded_song):
     r = client.delete(f"/api/admin/songs/{uploaded_song['id']}", headers=viewer_headers)
     assert r.status_code == 403
+
+
+# ── bulk ──────────────────────────────────────────────────────────────────────
+
+def _batch_upload(client, admin_headers, names):
+    files = [("files", (name, FAKE_MP3, "audio/mpeg")) for name in names]
+    r = client.post("/api/admin/songs/batch", files=files, headers=admin_headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_delete_song_keeps_file_when_commit_fails(client, admin_headers, monkeypatch):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.config import get_settings
+
+    song = client.post(
+        "/api/admin/songs", files={"file": ("commit_fails.mp3", FAKE_MP3, "audio/mpeg")}, headers=admin_headers
+    ).json()
+    path = get_settings().upload_dir
+
+    async def failing_commit(self):
+        raise RuntimeError("commit failed")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(AsyncSession, "commit", failing_commit)
+        with pytest.raises(RuntimeError):
+            client.delete(f"/api/admin/songs/{song['id']}", headers=admin_headers)
+    # The row survived the failed delete, and so did its file.
+    assert song["id"] in {s["id"] for s in client.get("/api/admin/songs", headers=admin_headers).json()}
+    assert any(path.rglob(song["filename"]))
+
+    assert client.delete(f"/api/admin/songs/{song['id']}", headers=admin_headers).status_code == 200
+    job = client.get("/api/admin/jobs?kind=delete_song_files&limit=1", headers=admin_headers).json()[0]
+    assert job["params"] == {"filenames": [song["filename"]]}
+    assert wait_for_job(client, admin_headers, job["id"])["status"] == "succeeded"
+    assert not any(path.rglob(song["filename"]))
+
+
+def test_batch_upload_and_bulk_delete(client, admin_headers, viewer_headers, enforce_foreign_keys):
+    from sqlalchemy import func, select
+
+    from app.config import get_settings
+    from app.database import get_session_factory
+    from app.models import PlayEvent
+    from app.services.play_events import get_play_event_buffer
+
+    async def play_events_of(song_ids):
+        async with get_session_factory()() as db:
+            return (await db.execute(select(func.count(PlayEvent.id)).where(PlayEvent.song_id.in_(song_ids)))).scalar()
+
+    data = _batch_upload(client, admin_headers, [f"batch_{i}.mp3" for i in range(5)] + ["bad.exe"])
+    assert len(data["created"]) == 5
+    assert data["errors"] == [{"filename": "bad.exe", "detail": data["errors"][0]["detail"]}]
+    ids = [s["id"] for s in data["created"]]
+    path = get_settings().upload_dir
+    assert all(any(path.rglob(s["filename"])) for s in data["created"])
+    # Play events reference the songs (a foreign key violation on delete if left behind).
+    client.post("/api/plays", json={"events": [{"song_id": ids[0], "event": "start"}]}, headers=viewer_headers)
+    client.portal.call(get_play_event_buffer().flush)
+    assert client.portal.call(play_events_of, ids) == 1
+
+    r = client.post("/api/admin/songs/bulk-delete", json={"song_ids": ids + [999999]}, headers=admin_headers)
+    assert r.status_code == 200
+    assert r.json() == {"deleted": 5, "missing": [999999]}
+    assert client.portal.call(play_events_of, ids) == 0
+    listed = {s["id"] for s in client.get("/api/admin/songs", headers=admin_headers).json()}
+    assert not listed & set(ids)
+    # Files are removed by a job queued with the delete.
+    job = client.get("/api/admin/jobs?kind=delete_song_files&limit=1", headers=admin_headers).json()[0]
+    assert wait_for_job(client, admin_headers, job["id"])["status"] == "succeeded"
+    assert not any(any(path.rglob(s["filename"])) for s in data["created"])
+
+
+def test_bulk_edit(client, admin_headers):
+    created = _batch_upload(client, admin_headers, ["edit_a.mp3", "edit_b.mp3"])["created"]
+    ids = [s["id"] for s in created]
+    try:
+        r = client.post(
+            "/api/admin/songs/bulk-edit",
+            json={"song_ids": ids + [999999], "artist": "  Bulk Artist ", "title": " "},
+            headers=admin_headers,
+        )
+        assert r.status_code == 200
+        assert r.json() == {"updated": 2, "missing": [999999]}
+        songs = {s["id"]: s for s in client.get("/api/admin/songs", headers=admin_headers).json()}
+        assert all(songs[i]["artist"] == "Bulk Artist" for i in ids)
+        assert songs[ids[0]]["title"] == created[0]["title"]  # blank title ignored
+        r = client.post("/api/admin/songs/bulk-edit", json={"song_ids": ids, "title": ""}, headers=admin_headers)
+        assert r.status_code == 400
+    finally:
+        client.post("/api/admin/songs/bulk-delete", json={"song_ids": ids}, headers=admin_headers)
+
+
+def test_bulk_endpoints_viewer_forbidden(client, viewer_headers):
+    assert client.post("/api/admin/songs/bulk-delete", json={"song_ids": [1]}, headers=viewer_headers).status_code == 403
+    assert client.post("/api/admin/songs/bulk-edit", json={"song_ids": [1], "artist": "x"}, headers=viewer_headers).status_code == 403
+
+
+# ── metadata backfill ─────────────────────────────────────────────────────────
+
+def _wait_for_backfill(client, admin_headers):
+    import time
+
+    for _ in range(100):
+        r = client.get("/api/admin/songs/metadata-backfill", headers=admin_headers)
+        assert r.status_code == 200
+        if not r.json()["running"]:
+            return r.json()
+        time.sleep(0.05)
+    raise AssertionError("metadata backfill did not finish")
+
+
+def test_metadata_backfill_records_failures(client, admin_headers, uploaded_song):
+    r = client.post("/api/admin/songs/metadata-backfill?retry_failed=true", headers=admin_headers)
+    assert r.status_code == 202
+    progress = _wait_for_backfill(client, admin_headers)
+    assert progress["error"] is None
+    assert progress["scanned"] >= 1
+    failed_ids = [f["song_id"] for f in progress["failures"]]
+    assert uploaded_song["id"] in failed_ids  # fake MP3 has no readable frames
+
+    r = client.get("/api/admin/songs", headers=admin_headers)
+    song = next(s for s in r.json() if s["id"] == uploaded_song["id"])
+    assert song["metadata_error"]
+    assert song["title"] == uploaded_song["title"]
+
+
+def test_metadata_backfill_skips_already_scanned(client, admin_headers, uploaded_song):
+    client.post("/api/admin/songs/metadata-backfill?retry_failed=true", headers=admin_headers)
+    _wait_for_backfill(client, admin_headers)
+    r = client.post("/api/admin/songs/metadata-backfill", headers=admin_headers)
+    assert r.status_code == 202
+    progress = _wait_for_backfill(client, admin_headers)
+    assert uploaded_song["id"] not in [f["song_id"] for f in progress["failures"]]
+
+
+def test_metadata_backfill_viewer_forbidden(client, viewer_headers):
+    r = client.post("/api/admin/songs/metadata-backfill", headers=viewer_headers)
+    assert r.status_code == 403
@@ -0,0 +1,70 @@
+"""Tests for /api/admin/storage/* (storage reconciler)."""
+import os
+
+from app.config import get_settings
+
+
+def test_reconcile_reports_orphans_and_missing(client, admin_headers, viewer_headers, uploaded_song):
+    settings = get_settings()
+    orphan = settings.upload_dir / "orphan_test_file.mp3"
+    orphan.write_bytes(b"x")
+    song_path = settings.upload_dir / uploaded_song["filename"]
+    song_bytes = song_path.read_bytes()
+    song_path.unlink()
+    try:
+        r = client.post("/api/admin/storage/reconcile", headers=admin_headers)
+        assert r.status_code == 200
+        report = r.json()
+        assert "orphan_test_file.mp3" in report["orphan_song_files"]
+        assert uploaded_song["filename"] in report["missing_song_files"]
+        assert report["collected"] == []
+        # Stream path trusts the reconciled state
+        r = client.get(f"/api/songs/{uploaded_song['id']}/stream", headers=viewer_headers)
+        assert r.status_code == 404
+
+        r = client.get("/api/admin/storage/reconcile", headers=admin_headers)
+        assert r.status_code == 200
+        assert uploaded_song["filename"] in r.json()["missing_song_files"]
+    finally:
+        song_path.write_bytes(song_bytes)
+        orphan.unlink(missing_ok=True)
+    r = client.post("/api/admin/storage/reconcile", headers=admin_headers)
+    assert uploaded_song["filename"] not in r.json()["missing_song_files"]
+
+
+def test_reconcile_collect_respects_grace_period(client, admin_headers):
+    settings = get_settings()
+    fresh = settings.upload_dir / "fresh_orphan.mp3"
+    old = settings.upload_dir / "old_orphan.mp3"
+    fresh.write_bytes(b"x")
+    old.write_bytes(b"x")
+    os.utime(old, (0, 0))
+    try:
+        r = client.post("/api/admin/storage/reconcile?collect=true", headers=admin_headers)
+        assert r.status_code == 200
+        assert r.json()["collected"] == ["old_orphan.mp3"]
+        assert fresh.exists()
+        assert not old.exists()
+    finally:
+        fresh.unlink(missing_ok=True)
+        old.unlink(missing_ok=True)
+
+
+def test_stream_missing_file_is_404(client, admin_headers, viewer_headers, uploaded_song):
+    # File vanished after the last reconcile: the response itself turns it into a 404.
+    settings = get_settings()
+    client.post("/api/admin/storage/reconcile", headers=admin_headers)
+    song_path = settings.upload_dir / uploaded_song["filename"]
+    song_bytes = song_path.read_bytes()
+    song_path.unlink()
+    try:
+        r = client.get(f"/api/songs/{uploaded_song['id']}/stream", headers=viewer_headers)
+        assert r.status_code == 404
+    finally:
+        song_path.write_bytes(song_bytes)
+        client.post("/api/admin/storage/reconcile", headers=admin_headers)
+
+
+def test_reconcile_viewer_forbidden(client, viewer_headers):
+    r = client.post("/api/admin/storage/reconcile", headers=viewer_headers)
+    assert r.status_code == 403
@@ -1,4 +1,6 @@
 """Smoke tests: public pages and status endpoints."""
+import json
+import re
 
 
 def test_health(client):
@@ -26,3 +28,84 @@ def test_admin_page(client):
     r = client.get("/admin")
     assert r.status_code == 200
     assert "Admin" in r.text
+
+
+def _boot_data(html):
+    return json.loads(re.search(r'<script id="boot-data" type="application/json">(.*?)</script>', html).group(1))
+
+
+def test_page_etag_and_304(client):
+    r = client.get("/")
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "no-cache"
+    assert client.get("/").headers["etag"] == etag
+    r = client.get("/", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert client.get("/", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_page_inlines_settings_and_refreshes_on_change(client, admin_headers):
+    before = client.get("/")
+    boot = _boot_data(before.text)
+    # Only public settings: the shell is served to anonymous visitors.
+    assert set(boot) == {"allow_registration"}
+    flipped = not boot["allow_registration"]
+    client.patch("/api/admin/settings", json={"allow_registration": flipped}, headers=admin_headers)
+    try:
+        after = client.get("/")
+        assert _boot_data(after.text)["allow_registration"] is flipped
+        assert after.headers["etag"] != before.headers["etag"]
+    finally:
+        client.patch("/api/admin/settings", json={"allow_registration": not flipped}, headers=admin_headers)
+
+
+def test_page_rerendered_for_new_build(client, monkeypatch):
+    from app import pages
+
+    client.get("/")
+    key = pages._cache["player.html"].key
+    monkeypatch.setenv("BUILD_SHA", "new-build")
+    client.get("/")
+    assert pages._cache["player.html"].key != key
+
+
+def test_health_live(client):
+    r = client.get("/health/live")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok"}
+
+
+def test_health_ready(client):
+    from app.health import reset_readiness_cache
+
+    reset_readiness_cache()
+    r = client.get("/health/ready")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["status"] == "ok"
+    assert data["cached"] is False
+    assert set(data["checks"]) == {"database", "disk", "pool", "event_loop"}
+    assert data["checks"]["database"]["latency_ms"] >= 0
+    # A second probe within the cache interval reuses the result.
+    assert client.get("/health/ready").json()["cached"] is True
+
+
+def test_health_ready_fails_on_low_disk(client):
+    from app.config import get_settings
+    from app.health import reset_readiness_cache
+
+    settings = get_settings()
+    old = settings.health_min_free_disk_mb
+    settings.health_min_free_disk_mb = 10**12
+    reset_readiness_cache()
+    try:
+        r = client.get("/health/ready")
+    finally:
+        settings.health_min_free_disk_mb = old
+        reset_readiness_cache()
+    assert r.status_code == 503
+    data = r.json()
+    assert data["status"] == "fail"
+    assert data["checks"]["disk"]["ok"] is False
+    assert data["checks"]["database"]["ok"] is True
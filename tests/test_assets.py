@@ -0,0 +1,92 @@
+"""Tests for the static asset build (app/scripts/build_assets.py) and app.assets."""
+import gzip
+import shutil
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import assets
+from app.assets import STATIC_DIR, IMMUTABLE_CACHE, PrecompressedStaticFiles, load_manifest
+from app.pages import invalidate_pages
+from app.scripts.build_assets import build_assets, minify_css, minify_js
+
+
+@pytest.fixture
+def built(tmp_path):
+    static_dir = tmp_path / "static"
+    shutil.copytree(STATIC_DIR, static_dir, ignore=shutil.ignore_patterns("dist"))
+    manifest = build_assets(static_dir)
+    return static_dir, manifest
+
+
+def test_minify_js_keeps_line_breaks():
+    source = "function f() {\n    // comment\n\n    return 1\n}\n"
+    assert minify_js(source) == "function f() {\nreturn 1\n}\n"
+
+
+def test_minify_css():
+    assert minify_css("/* c */\na > b ,\n.c {\n  color: red;\n}\n") == "a>b,.c{color: red}\n"
+
+
+def test_build_writes_hashed_files_and_manifest(built):
+    static_dir, manifest = built
+    assert set(manifest) >= {"player.js", "admin.js", "style.css"}
+    hashed = static_dir / "dist" / manifest["player.js"]
+    assert hashed.name.startswith("player.") and hashed.suffix == ".js"
+    assert gzip.decompress((static_dir / "dist" / f"{manifest['player.js']}.gz").read_bytes()) == hashed.read_bytes()
+    assert load_manifest(static_dir) == manifest
+    # Same content, same names: rebuilding does not bust caches.
+    assert build_assets(static_dir) == manifest
+
+
+def test_precompressed_static_files(built):
+    static_dir, manifest = built
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
+    client = TestClient(app)
+    url = f"/static/dist/{manifest['player.js']}"
+    body = (static_dir / "dist" / manifest["player.js"]).read_bytes()
+
+    r = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "javascript" in r.headers["content-type"]
+    assert r.headers["cache-control"] == IMMUTABLE_CACHE
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.content == body
+
+    r = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert r.content == body  # httpx decodes br (brotli installed)
+
+    r = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.content == body
+
+    r = client.get("/static/player.js")
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "no-cache"
+
+
+def _render_player(client, monkeypatch, static_dir: Path) -> str:
+    monkeypatch.setattr(assets, "load_manifest", lambda: load_manifest(static_dir))
+    invalidate_pages()
+    try:
+        return client.get("/").text
+    finally:
+        invalidate_pages()
+
+
+def test_pages_use_plain_static_without_build(client, monkeypatch, tmp_path):
+    html = _render_player(client, monkeypatch, tmp_path)
+    assert 'src="/static/player.js"' in html
+    assert "/static/dist/" not in html
+
+
+def test_pages_use_fingerprinted_build(client, monkeypatch, built):
+    static_dir, manifest = built
+    html = _render_player(client, monkeypatch, static_dir)
+    assert f'src="/static/dist/{manifest["player.js"]}"' in html
+    assert 'src="/static/player.js"' not in html
@@ -0,0 +1,118 @@
+"""Tests for waveform/loudness analysis and /api/songs/{id}/analysis."""
+import io
+import math
+import struct
+import wave
+
+import pytest
+
+from app.services import audio_analysis
+from app.services.audio_analysis import DecoderUnavailable, analyze_file, compute_peaks, integrated_loudness
+from tests.conftest import wait_for_job
+
+
+def make_wav(seconds: float = 1.0, freq: float = 1000.0, amplitude: float = 0.5, rate: int = 8000) -> bytes:
+    """Mono 16-bit sine wave."""
+    n = int(seconds * rate)
+    frames = b"".join(
+        struct.pack("<h", int(amplitude * 32767 * math.sin(2 * math.pi * freq * i / rate))) for i in range(n)
+    )
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(frames)
+    return buf.getvalue()
+
+
+def test_compute_peaks_scales_to_byte():
+    peaks = compute_peaks([0.0, 1.0, -0.5, 0.25], buckets=2)
+    assert peaks == bytes([255, 128])
+
+
+def test_loudness_of_full_scale_sine():
+    rate = 8000
+    samples = [math.sin(2 * math.pi * 1000 * i / rate) for i in range(rate * 2)]
+    # A 0 dBFS 1 kHz sine measures about -3 LUFS on a single channel.
+    assert integrated_loudness(samples, rate) == pytest.approx(-3.0, abs=0.5)
+
+
+def test_loudness_of_silence_is_none():
+    assert integrated_loudness([0.0] * 16000, 8000) is None
+
+
+def test_analyze_wav_file(tmp_path):
+    path = tmp_path / "tone.wav"
+    path.write_bytes(make_wav(amplitude=0.5))
+    result = analyze_file(path)
+    assert result is not None
+    assert len(result.peaks) == 800
+    assert max(result.peaks) == pytest.approx(128, abs=2)
+    assert result.peak_amplitude == pytest.approx(0.5, abs=0.01)
+    assert result.replay_gain_db == pytest.approx(-18.0 - result.loudness_lufs)
+
+
+def test_analyze_undecodable_file(tmp_path):
+    # A WAV without frames: nothing to analyze, whichever decoders are installed.
+    path = tmp_path / "empty.wav"
+    path.write_bytes(make_wav(seconds=0))
+    assert analyze_file(path) is None
+
+
+def test_missing_decoder_is_not_undecodable(tmp_path, monkeypatch):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(b"ID3 not really")
+    monkeypatch.setattr(audio_analysis.shutil, "which", lambda name: None)
+    with pytest.raises(DecoderUnavailable):
+        analyze_file(path)
+
+
+def test_songs_without_decoder_stay_unanalyzed(client, uploaded_song, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import song_service
+
+    # In-process pool so the patched lookup applies; no ffmpeg means nothing to store yet.
+    monkeypatch.setattr(audio_analysis.shutil, "which", lambda name: None)
+    with ThreadPoolExecutor(1) as pool:
+        monkeypatch.setattr(song_service, "get_analysis_pool", lambda: pool)
+        assert client.portal.call(song_service.analysis_values, uploaded_song["filename"]) == {}
+
+
+def test_analysis_endpoint_after_upload(client, admin_headers, viewer_headers):
+    r = client.post(
+        "/api/admin/songs",
+        files={"file": ("tone.wav", make_wav(), "audio/wav")},
+        headers=admin_headers,
+    )
+    assert r.status_code == 200
+    song_id = r.json()["id"]
+    try:
+        # Analysis runs as a background job queued by the upload.
+        jobs = client.get("/api/admin/jobs?kind=analyze_songs", headers=admin_headers).json()
+        job = next(j for j in jobs if j["params"]["song_ids"] == [song_id])
+        assert wait_for_job(client, admin_headers, job["id"])["progress"]["decoded"] == 1
+        r = client.get(f"/api/songs/{song_id}/analysis", headers=viewer_headers)
+        assert r.status_code == 200
+        data = r.json()
+        assert data["song_id"] == song_id
+        assert len(data["peaks"]) == 800
+        assert data["loudness_lufs"] is not None
+        r2 = client.get(
+            f"/api/songs/{song_id}/analysis",
+            headers={**viewer_headers, "If-None-Match": r.headers["etag"]},
+        )
+        assert r2.status_code == 304
+    finally:
+        client.delete(f"/api/admin/songs/{song_id}", headers=admin_headers)
+
+
+def test_analysis_not_available_for_undecodable(client, viewer_headers, uploaded_song):
+    r = client.get(f"/api/songs/{uploaded_song['id']}/analysis", headers=viewer_headers)
+    assert r.status_code == 404
+
+
+def test_analysis_unauthenticated(client, uploaded_song):
+    r = client.get(f"/api/songs/{uploaded_song['id']}/analysis")
+    assert r.status_code == 401
@@ -0,0 +1,84 @@
+"""Tests for the compact song catalogue (Accept-negotiated on /api/songs)."""
+import pytest
+
+from app.services.catalog import CATALOG_JSON, MSGPACK, msgpack, negotiate_catalog
+from tests.conftest import FAKE_MP3
+
+COMPACT = {"Accept": CATALOG_JSON}
+
+
+def _rows(catalog: dict) -> list[dict]:
+    return [dict(zip(catalog["columns"], values)) for values in zip(*catalog["data"])]
+
+
+def test_compact_matches_plain_listing(client, viewer_headers, uploaded_song):
+    plain = client.get("/api/songs", headers=viewer_headers).json()
+    r = client.get("/api/songs", headers={**viewer_headers, **COMPACT})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == CATALOG_JSON
+    assert "Accept" in r.headers["vary"]
+    catalog = r.json()
+    assert catalog["count"] == len(plain)
+    loved = set(catalog["loved"])
+    assert [{**row, "is_loved": row["id"] in loved} for row in _rows(catalog)] == plain
+
+
+def test_plain_listing_by_default(client, viewer_headers):
+    r = client.get("/api/songs", headers={**viewer_headers, "Accept": "application/json"})
+    assert isinstance(r.json(), list)
+    assert "Accept" in r.headers["vary"]
+
+
+def test_etag_revalidation(client, viewer_headers, uploaded_song):
+    r = client.get("/api/songs", headers={**viewer_headers, **COMPACT})
+    etag = r.headers["etag"]
+    r = client.get("/api/songs", headers={**viewer_headers, **COMPACT, "If-None-Match": etag})
+    assert r.status_code == 304
+    # Loving a song changes the caller's loved list, so the ETag changes at once.
+    client.post(f"/api/songs/{uploaded_song['id']}/love", headers=viewer_headers)
+    r = client.get("/api/songs", headers={**viewer_headers, **COMPACT, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert uploaded_song["id"] in r.json()["loved"]
+
+
+def test_snapshot_invalidated_on_catalogue_changes(client, admin_headers, viewer_headers):
+    def catalog_titles():
+        return {row["id"]: row["title"] for row in _rows(client.get("/api/songs", headers={**viewer_headers, **COMPACT}).json())}
+
+    before = catalog_titles()
+    r = client.post("/api/admin/songs", files={"file": ("catalog.mp3", FAKE_MP3, "audio/mpeg")}, headers=admin_headers)
+    song_id = r.json()["id"]
+    assert song_id in catalog_titles() and song_id not in before
+
+    client.patch(f"/api/admin/songs/{song_id}", json={"title": "Catalog Renamed"}, headers=admin_headers)
+    assert catalog_titles()[song_id] == "Catalog Renamed"
+
+    client.post("/api/admin/songs/bulk-edit", json={"song_ids": [song_id], "title": "Bulk Renamed"}, headers=admin_headers)
+    assert catalog_titles()[song_id] == "Bulk Renamed"
+
+    client.delete(f"/api/admin/songs/{song_id}", headers=admin_headers)
+    assert song_id not in catalog_titles()
+
+
+def test_compact_search(client, viewer_headers, uploaded_song):
+    r = client.get("/api/songs", params={"search": uploaded_song["title"]}, headers={**viewer_headers, **COMPACT})
+    assert r.status_code == 200
+    assert "etag" not in r.headers
+    assert uploaded_song["id"] in r.json()["data"][0]
+
+
+def test_negotiation():
+    assert negotiate_catalog("application/json") is None
+    assert negotiate_catalog(f"{CATALOG_JSON}, application/json;q=0.5") == CATALOG_JSON
+    assert negotiate_catalog(f"{CATALOG_JSON};q=0") is None
+    expected = MSGPACK if msgpack is not None else None
+    assert negotiate_catalog("application/x-msgpack") == expected
+
+
+def test_msgpack_catalog(client, viewer_headers, uploaded_song):
+    pytest.importorskip("msgpack")
+    r = client.get("/api/songs", headers={**viewer_headers, "Accept": MSGPACK})
+    assert r.headers["content-type"] == MSGPACK
+    catalog = msgpack.unpackb(r.content)
+    json_catalog = client.get("/api/songs", headers={**viewer_headers, **COMPACT}).json()
+    assert catalog == json_catalog
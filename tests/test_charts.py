@@ -0,0 +1,160 @@
+"""Tests for love counts, popularity rollups and /api/charts/*."""
+import uuid
+
+from app.services.play_events import get_play_event_buffer
+
+
+def _song(client, headers, song_id):
+    return next(s for s in client.get("/api/songs", headers=headers).json() if s["id"] == song_id)
+
+
+def _chart(client, headers, name, **params):
+    r = client.get(f"/api/charts/{name}", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _refresh(client, admin_headers):
+    client.portal.call(get_play_event_buffer().flush)
+    r = client.post("/api/charts/refresh", headers=admin_headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+async def _play_totals(song_id: int) -> tuple[int, int]:
+    """(song_play_totals.plays, sum of song_daily_stats.plays) for a song."""
+    from sqlalchemy import func, select
+
+    from app.database import get_session_factory
+    from app.models import SongDailyStats, SongPlayTotal
+
+    async with get_session_factory()() as db:
+        total = await db.scalar(select(SongPlayTotal.plays).where(SongPlayTotal.song_id == song_id))
+        buckets = await db.scalar(select(func.sum(SongDailyStats.plays)).where(SongDailyStats.song_id == song_id))
+        return total, buckets
+
+
+def _throwaway_user(client):
+    username = f"charts_{uuid.uuid4().hex[:8]}"
+    client.post(
+        "/api/auth/register",
+        json={"username": username, "password": "password123", "password_confirm": "password123"},
+    )
+    r = client.post("/api/auth/login", data={"username": username, "password": "password123"})
+    return username, {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+# ── love_count ────────────────────────────────────────────────────────────────
+
+def test_love_count_maintained(client, viewer_headers, admin_headers, uploaded_song):
+    sid = uploaded_song["id"]
+    assert _song(client, viewer_headers, sid)["love_count"] == 0
+    client.post(f"/api/songs/{sid}/love", headers=viewer_headers)
+    client.post(f"/api/songs/{sid}/love", headers=viewer_headers)  # idempotent
+    song = _song(client, viewer_headers, sid)
+    assert song["love_count"] == 1
+    assert song["is_loved"] is True
+    admin_song = next(s for s in client.get("/api/admin/songs", headers=admin_headers).json() if s["id"] == sid)
+    assert admin_song["love_count"] == 1
+    client.delete(f"/api/songs/{sid}/love", headers=viewer_headers)
+    client.delete(f"/api/songs/{sid}/love", headers=viewer_headers)
+    assert _song(client, viewer_headers, sid)["love_count"] == 0
+
+
+def test_deleted_user_loves_removed(client, viewer_headers, admin_headers, uploaded_song):
+    sid = uploaded_song["id"]
+    username, headers = _throwaway_user(client)
+    client.post(f"/api/songs/{sid}/love", headers=headers)
+    assert _song(client, viewer_headers, sid)["love_count"] == 1
+    user = next(u for u in client.get("/api/admin/users", headers=admin_headers).json() if u["username"] == username)
+    client.delete(f"/api/admin/users/{user['id']}", headers=admin_headers)
+    assert _song(client, viewer_headers, sid)["love_count"] == 0
+
+
+# ── charts ────────────────────────────────────────────────────────────────────
+
+def test_charts_unauthenticated(client):
+    assert client.get("/api/charts").status_code == 401
+    assert client.get("/api/charts/trending").status_code == 401
+
+
+def test_refresh_requires_admin(client, viewer_headers):
+    assert client.post("/api/charts/refresh", headers=viewer_headers).status_code == 403
+
+
+def test_unknown_chart(client, viewer_headers):
+    assert client.get("/api/charts/nope", headers=viewer_headers).status_code == 404
+
+
+def test_plays_and_loves_roll_up_into_charts(client, viewer_headers, admin_headers, uploaded_song):
+    sid = uploaded_song["id"]
+    r = client.post(
+        "/api/plays",
+        json={"events": [{"song_id": sid, "event": "start"}] * 5 + [{"song_id": sid, "event": "complete"}]},
+        headers=viewer_headers,
+    )
+    assert r.status_code == 202
+    client.post(f"/api/songs/{sid}/love", headers=viewer_headers)
+    _refresh(client, admin_headers)
+
+    def score(name):
+        return next(e["score"] for e in _chart(client, viewer_headers, name) if e["id"] == sid)
+
+    assert score("top_played") == 5
+    assert score("top_played_week") == 5
+    assert score("trending") == 5 + 3
+    assert score("most_loved") == 1
+    entry = _chart(client, viewer_headers, "most_loved")[0]
+    assert entry["rank"] == 1
+    assert {"title", "artist", "filename", "love_count"} <= entry.keys()
+
+    # Nothing new since the last refresh: the buckets must not be counted again.
+    assert _refresh(client, admin_headers)["buckets_updated"] == 0
+    assert score("top_played") == 5
+
+    client.post("/api/plays", json={"events": [{"song_id": sid, "event": "start"}]}, headers=viewer_headers)
+    _refresh(client, admin_headers)
+    assert score("top_played") == 6
+    # The all-time chart reads the per-song total, which matches the daily buckets.
+    assert client.portal.call(_play_totals, sid) == (6, 6)
+
+    charts = {c["name"]: c for c in client.get("/api/charts", headers=viewer_headers).json()}
+    assert charts["top_played"]["size"] >= 1
+    assert charts["top_played"]["refreshed_at"] is not None
+
+
+def test_chart_limit(client, viewer_headers, admin_headers, uploaded_song):
+    client.post(f"/api/songs/{uploaded_song['id']}/love", headers=viewer_headers)
+    _refresh(client, admin_headers)
+    assert len(_chart(client, viewer_headers, "most_loved", limit=1)) == 1
+
+
+def test_deleted_song_leaves_charts(client, viewer_headers, admin_headers, uploaded_song):
+    sid = uploaded_song["id"]
+    client.post(f"/api/songs/{sid}/love", headers=viewer_headers)
+    _refresh(client, admin_headers)
+    client.delete(f"/api/admin/songs/{sid}", headers=admin_headers)
+    assert all(e["id"] != sid for e in _chart(client, viewer_headers, "most_loved"))
+
+
+def test_refresh_leaves_recent_rows_for_the_next_one(client, viewer_headers, admin_headers, uploaded_song):
+    """Rows younger than ROLLUP_FOLD_LAG_SECONDS (possibly committed out of id order) wait."""
+    from app.config import get_settings
+
+    sid = uploaded_song["id"]
+    first = _refresh(client, admin_headers)
+    client.post("/api/plays", json={"events": [{"song_id": sid, "event": "start"}]}, headers=viewer_headers)
+    client.post(f"/api/songs/{sid}/love", headers=viewer_headers)
+    settings = get_settings()
+    settings.rollup_fold_lag_seconds = 3600
+    try:
+        held = _refresh(client, admin_headers)
+    finally:
+        settings.rollup_fold_lag_seconds = 0
+    assert held["play_events_through_id"] == first["play_events_through_id"]
+    assert held["loves_through_id"] == first["loves_through_id"]
+    assert held["buckets_updated"] == 0
+    folded = _refresh(client, admin_headers)
+    assert folded["play_events_through_id"] > first["play_events_through_id"]
+    assert folded["loves_through_id"] > first["loves_through_id"]
+    assert folded["buckets_updated"] == 1
@@ -0,0 +1,75 @@
+"""Tests for response compression and the orjson list responses."""
+from app.compression import encoded_etag, negotiate_encoding, strip_etag_coding
+from app.responses import ORJSONResponse
+
+
+def test_large_json_gzipped(client):
+    r = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert "paths" in r.json()
+
+
+def test_brotli_preferred(client):
+    r = client.get("/openapi.json", headers={"Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert "paths" in r.json()
+
+
+def test_identity_not_compressed(client):
+    r = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+    assert int(r.headers["content-length"]) == len(r.content)
+
+
+def test_compressed_length_matches_body(client):
+    raw = client.get("/openapi.json", headers={"Accept-Encoding": "identity"}).content
+    r = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert int(r.headers["content-length"]) < len(raw)
+    assert r.content == raw  # httpx decodes gzip transparently
+
+
+def test_small_response_not_compressed(client):
+    r = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+
+
+def test_audio_stream_not_compressed(client, admin_headers, uploaded_song):
+    r = client.get(
+        f"/api/songs/{uploaded_song['id']}/stream",
+        headers={**admin_headers, "Accept-Encoding": "gzip"},
+    )
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+
+
+def test_compressed_page_gets_own_etag(client):
+    plain = client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    r = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["etag"] == encoded_etag(plain, "gzip") != plain
+    # Either representation's tag revalidates.
+    for etag in (plain, r.headers["etag"]):
+        assert client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}).status_code == 304
+
+
+def test_etag_coding_round_trip():
+    assert encoded_etag('"abc"', "br") == '"abc-br"'
+    assert strip_etag_coding('"abc-br"') == '"abc"'
+    assert strip_etag_coding('"abc"') == '"abc"'
+    assert encoded_etag('W/"abc"', "gzip") == 'W/"abc"'
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("GZIP;q=0.5") == "gzip"
+    assert negotiate_encoding("gzip, br") == "br"
+
+
+def test_orjson_response_render():
+    body = ORJSONResponse([{"id": 1, "title": "Ünïcode", "duration_seconds": None}]).body
+    assert body == '[{"id":1,"title":"Ünïcode","duration_seconds":null}]'.encode("utf-8")
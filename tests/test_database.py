@@ -0,0 +1,103 @@
+"""Tests for the read-only / read-write session split and migrations (app.database)."""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import (
+    _fill_song_play_totals_if_missing,
+    _sqlite_autoincrement_if_missing,
+    get_engine,
+    get_read_db,
+    get_read_engine,
+    has_separate_read_engine,
+)
+from app.models import AppSettings
+
+
+def test_sqlite_file_gets_read_only_pool(client):
+    assert has_separate_read_engine()
+    assert get_read_engine().url.query["mode"] == "ro"
+
+    async def journal_mode():
+        async with get_engine().connect() as conn:
+            return (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+
+    assert client.portal.call(journal_mode) == "wal"
+
+
+def test_read_session_cannot_write(client):
+    async def write_through_read_db():
+        gen = get_read_db()
+        db = await anext(gen)
+        try:
+            row = (await db.execute(select(AppSettings).limit(1))).scalar_one()
+            row.allow_registration = not row.allow_registration
+            await db.flush()
+        finally:
+            await gen.aclose()
+
+    with pytest.raises(OperationalError, match="readonly"):
+        client.portal.call(write_through_read_db)
+
+
+def test_read_endpoints_see_writes(client, admin_headers, uploaded_song):
+    """Reads go through the read-only pool but still see what the primary just committed."""
+    r = client.patch(f"/api/admin/songs/{uploaded_song['id']}", json={"title": "Read After Write"}, headers=admin_headers)
+    assert r.status_code == 200
+    titles = [s["title"] for s in client.get("/api/admin/songs", headers=admin_headers).json()]
+    assert "Read After Write" in titles
+
+
+def test_rollup_sources_rebuilt_with_autoincrement(tmp_path):
+    """Old tables reused the highest rowid after a delete; the rebuild keeps rows and never goes back."""
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE rollup_watermarks (source VARCHAR(32) PRIMARY KEY, last_id INTEGER NOT NULL, updated_at DATETIME);
+        INSERT INTO rollup_watermarks VALUES ('play_events', 9, NULL);
+        CREATE TABLE play_events (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, song_id INTEGER NOT NULL,
+            event VARCHAR(16) NOT NULL, position_seconds FLOAT, occurred_at DATETIME NOT NULL, recorded_at DATETIME NOT NULL);
+        CREATE INDEX ix_play_events_user_occurred ON play_events (user_id, occurred_at);
+        INSERT INTO play_events VALUES (4, 1, 1, 'start', NULL, '2024-01-01', '2024-01-01');
+        CREATE TABLE song_loves (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, song_id INTEGER NOT NULL,
+            created_at DATETIME, CONSTRAINT unique_user_song_love UNIQUE (user_id, song_id));
+        INSERT INTO song_loves VALUES (7, 1, 1, '2024-01-01');
+    """)
+    conn.commit()
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as sync_conn:
+        _sqlite_autoincrement_if_missing(sync_conn)
+        _sqlite_autoincrement_if_missing(sync_conn)  # idempotent
+    engine.dispose()
+    for table in ("play_events", "song_loves"):
+        assert "AUTOINCREMENT" in conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+    assert conn.execute("SELECT id, event FROM play_events").fetchall() == [(4, "start")]
+    # Above the watermark (rows 5..9 were deleted after being folded).
+    conn.execute("INSERT INTO play_events (user_id, song_id, event, occurred_at, recorded_at) VALUES (1, 1, 'start', '2024-01-02', '2024-01-02')")
+    assert conn.execute("SELECT MAX(id) FROM play_events").fetchone()[0] == 10
+    conn.execute("DELETE FROM song_loves")
+    conn.execute("INSERT INTO song_loves (user_id, song_id, created_at) VALUES (1, 1, '2024-01-02')")
+    assert conn.execute("SELECT id FROM song_loves").fetchone()[0] == 8
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_play_events_user_occurred", "ix_song_loves_song_id"} <= indexes
+    conn.close()
+
+
+def test_song_play_totals_filled_from_buckets(tmp_path):
+    path = tmp_path / "totals.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE song_daily_stats (song_id INTEGER, day DATE, plays INTEGER, completes INTEGER, loves INTEGER);
+        INSERT INTO song_daily_stats VALUES (1, '2024-01-01', 2, 0, 0), (1, '2024-01-02', 3, 1, 0), (2, '2024-01-01', 0, 0, 4);
+        CREATE TABLE song_play_totals (song_id INTEGER PRIMARY KEY, plays INTEGER NOT NULL);
+    """)
+    conn.commit()
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as sync_conn:
+        _fill_song_play_totals_if_missing(sync_conn)
+        _fill_song_play_totals_if_missing(sync_conn)  # only while the table is empty
+    engine.dispose()
+    assert conn.execute("SELECT song_id, plays FROM song_play_totals").fetchall() == [(1, 5)]
+    conn.close()
@@ -0,0 +1,80 @@
+"""Tests for the synthetic data generator (app.scripts.generate_data)."""
+import asyncio
+import random
+import sqlite3
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base
+from app.models import Song, User
+from app.scripts.generate_data import _advance_sequences, generate_data, make_png, zipf_sampler
+
+
+def _generate(path, **options) -> dict:
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            return await generate_data(engine, backgrounds=0, **options)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_generates_consistent_library(tmp_path):
+    path = tmp_path / "gen.db"
+    summary = _generate(path, users=30, songs=2000, loves=3000)
+    assert summary["loves"] == 3000
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 30
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 2000
+    # Denormalized love_count matches the love rows.
+    assert conn.execute(
+        "SELECT COUNT(*) FROM songs WHERE love_count != (SELECT COUNT(*) FROM song_loves WHERE song_id = songs.id)"
+    ).fetchone()[0] == 0
+    # Zipf: the top 1% of songs get far more than 1% of the loves.
+    top = conn.execute("SELECT SUM(love_count) FROM (SELECT love_count FROM songs ORDER BY love_count DESC LIMIT 20)").fetchone()[0]
+    assert top > 3000 * 0.1
+
+    # A second batch with another prefix continues the ids.
+    summary = _generate(path, users=5, songs=10, loves=10, prefix="more")
+    assert summary["first_song_id"] == 2001
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 2010
+    conn.close()
+
+
+def test_deterministic_for_seed(tmp_path):
+    _generate(tmp_path / "a.db", users=5, songs=50, loves=60, seed=3)
+    _generate(tmp_path / "b.db", users=5, songs=50, loves=60, seed=3)
+    query = "SELECT title, artist, love_count FROM songs ORDER BY id"
+    rows = [sqlite3.connect(tmp_path / name).execute(query).fetchall() for name in ("a.db", "b.db")]
+    assert rows[0] == rows[1]
+
+
+def test_zipf_sampler_and_png():
+    draws = zipf_sampler(random.Random(1), list(range(100)), 1.2)(10000)
+    counts = sorted((draws.count(i) for i in set(draws)), reverse=True)
+    assert counts[0] > 10 * counts[len(counts) // 2]
+    assert make_png((1, 2, 3)).startswith(b"\x89PNG\r\n\x1a\n")
+
+
+class _RecordingConn:
+    def __init__(self, dialect: str):
+        self.dialect = type("Dialect", (), {"name": dialect})()
+        self.statements: list[str] = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+
+
+def test_sequences_follow_explicit_ids():
+    conn = _RecordingConn("postgresql")
+    asyncio.run(_advance_sequences(conn, (User, Song)))
+    assert [s.split("'")[1] for s in conn.statements] == ["users", "songs"]
+    assert all(s.startswith("SELECT setval(pg_get_serial_sequence(") for s in conn.statements)
+    # SQLite hands out max(rowid) + 1 on its own.
+    conn = _RecordingConn("sqlite")
+    asyncio.run(_advance_sequences(conn, (User, Song)))
+    assert conn.statements == []
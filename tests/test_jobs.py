@@ -0,0 +1,124 @@
+"""Tests for the background job queue (app.services.jobs) and /api/admin/jobs/*."""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models import Job
+from app.services.jobs import JobQueue, enqueue, get_job_queue, job_handler
+from tests.conftest import wait_for_job
+
+
+_release = None
+
+
+@job_handler("test_sleep")
+async def _sleep_job(params, ctx):
+    await ctx.report(step="started")
+    await _release.wait()
+    return {"slept": True}
+
+
+@job_handler("test_fail")
+async def _fail_job(params, ctx):
+    raise RuntimeError(params["message"])
+
+
+def _submit(client, kind, params=None):
+    async def run():
+        from app.database import get_session_factory
+
+        async with get_session_factory()() as db:
+            job = await enqueue(db, kind, params)
+            await db.commit()
+        get_job_queue().notify()
+        return job.id
+
+    return client.portal.call(run)
+
+
+def _new_release(client):
+    global _release
+
+    async def make():
+        return asyncio.Event()
+
+    _release = client.portal.call(make)
+    return _release
+
+
+def test_jobs_require_admin(client, viewer_headers):
+    assert client.get("/api/admin/jobs").status_code == 401
+    assert client.get("/api/admin/jobs", headers=viewer_headers).status_code == 403
+
+
+def test_job_runs_and_reports(client, admin_headers):
+    release = _new_release(client)
+    job_id = _submit(client, "test_sleep")
+    for _ in range(100):
+        job = client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers).json()
+        if job["status"] == "running":
+            break
+        time.sleep(0.02)
+    assert job["status"] == "running"
+    client.portal.call(release.set)
+    job = wait_for_job(client, admin_headers, job_id)
+    assert job["status"] == "succeeded"
+    assert job["progress"] == {"step": "started", "slept": True}
+    assert job["attempts"] == 1
+    assert any(j["id"] == job_id for j in client.get("/api/admin/jobs?kind=test_sleep", headers=admin_headers).json())
+
+
+def test_failed_job_records_error(client, admin_headers):
+    job = wait_for_job(client, admin_headers, _submit(client, "test_fail", {"message": "boom"}))
+    assert job["status"] == "failed"
+    assert job["error"] == "RuntimeError: boom"
+
+
+def test_cancel_running_job(client, admin_headers):
+    _new_release(client)
+    job_id = _submit(client, "test_sleep")
+    for _ in range(100):
+        if client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers).json()["status"] == "running":
+            break
+        time.sleep(0.02)
+    assert client.post(f"/api/admin/jobs/{job_id}/cancel", headers=admin_headers).status_code == 200
+    assert wait_for_job(client, admin_headers, job_id)["status"] == "cancelled"
+    assert client.post(f"/api/admin/jobs/{job_id}/cancel", headers=admin_headers).status_code == 409
+
+
+def test_job_not_found(client, admin_headers):
+    assert client.get("/api/admin/jobs/999999", headers=admin_headers).status_code == 404
+
+
+def test_stale_running_job_is_requeued(client, admin_headers):
+    """A job left "running" by a dead worker is picked up again once its heartbeat is stale
+    (60s old: stale for this 30s queue, not yet for the app's own workers)."""
+    queue = JobQueue(workers=1, poll_interval=60, stale_seconds=30, max_attempts=3)
+
+    async def orphan():
+        from app.database import get_session_factory
+
+        async with get_session_factory()() as db:
+            job = await enqueue(db, "test_fail", {"message": "again"})
+            job.status, job.attempts = "running", 1
+            await db.commit()
+            await db.execute(
+                update(Job).where(Job.id == job.id).values(heartbeat_at=datetime.utcnow() - timedelta(seconds=60))
+            )
+            await db.commit()
+            return job.id
+
+    job_id = client.portal.call(orphan)
+    claimed = None
+    while claimed is None or claimed[0] != job_id:  # other queued jobs may come first
+        claimed = client.portal.call(queue._claim)
+        assert claimed is not None
+        if claimed[0] != job_id:
+            client.portal.call(queue._run_one, *claimed)
+    assert claimed[1] == "test_fail"
+    client.portal.call(queue._run_one, *claimed)
+    job = client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers).json()
+    assert job["status"] == "failed"
+    assert job["attempts"] == 2
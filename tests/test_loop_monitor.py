@@ -0,0 +1,54 @@
+"""Tests for the event-loop lag monitor and blocking-call watchdog."""
+import asyncio
+import logging
+import time
+
+from prometheus_client import REGISTRY
+
+from app.loop_monitor import LoopMonitor, get_loop_monitor
+
+
+def _blocking_handler():
+    time.sleep(0.3)
+
+
+def test_monitor_measures_lag():
+    async def run():
+        monitor = LoopMonitor(interval=0.01, threshold=1.0)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _blocking_handler()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    assert monitor.max_lag >= 0.2
+    assert not monitor.blocks
+
+
+def test_watchdog_records_blocking_stack(caplog):
+    before = REGISTRY.get_sample_value("nivpro_event_loop_blocked_total") or 0.0
+
+    async def run():
+        monitor = LoopMonitor(interval=0.01, threshold=0.05, debug=True)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _blocking_handler()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    with caplog.at_level(logging.WARNING, logger="app.loop_monitor"):
+        monitor = asyncio.run(run())
+    assert len(monitor.blocks) == 1
+    assert "_blocking_handler" in monitor.blocks[0]["stack"]
+    assert REGISTRY.get_sample_value("nivpro_event_loop_blocked_total") == before + 1
+    assert any("Event loop blocked" in rec.getMessage() for rec in caplog.records)
+
+
+def test_monitor_runs_with_app(client):
+    monitor = get_loop_monitor()
+    assert monitor is not None and monitor.running
+    r = client.get("/metrics")
+    assert "nivpro_event_loop_lag_seconds" in r.text
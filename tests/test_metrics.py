@@ -0,0 +1,63 @@
+"""Tests for the Prometheus /metrics endpoint and request instrumentation."""
+from prometheus_client import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_endpoint(client):
+    client.get("/health")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "nivpro_http_request_duration_seconds" in r.text
+    assert "nivpro_http_requests_in_flight" in r.text
+
+
+def test_latency_labelled_by_route_template(client, admin_headers, uploaded_song):
+    before = _sample(
+        "nivpro_http_request_duration_seconds_count",
+        method="GET", route="/api/songs/{song_id}/stream", status="200",
+    )
+    client.get(f"/api/songs/{uploaded_song['id']}/stream", headers=admin_headers)
+    after = _sample(
+        "nivpro_http_request_duration_seconds_count",
+        method="GET", route="/api/songs/{song_id}/stream", status="200",
+    )
+    assert after == before + 1
+
+
+def test_unmatched_route_label(client):
+    before = _sample("nivpro_http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    client.get("/no/such/path")
+    after = _sample("nivpro_http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+    assert after == before + 1
+
+
+def test_bytes_served_counted(client, admin_headers, uploaded_song):
+    route = "/api/songs/{song_id}/stream"
+    before = _sample("nivpro_http_response_bytes_total", route=route)
+    r = client.get(f"/api/songs/{uploaded_song['id']}/stream", headers=admin_headers)
+    assert r.status_code == 200
+    assert _sample("nivpro_http_response_bytes_total", route=route) == before + len(r.content)
+
+
+def test_db_queries_per_request(client, admin_headers):
+    route = "/api/songs"
+    count_before = _sample("nivpro_db_queries_per_request_count", route=route)
+    sum_before = _sample("nivpro_db_queries_per_request_sum", route=route)
+    seconds_before = _sample("nivpro_db_query_seconds_per_request_count", route=route)
+    client.get("/api/songs", headers=admin_headers)
+    assert _sample("nivpro_db_queries_per_request_count", route=route) == count_before + 1
+    # At least the user lookup and the song list.
+    assert _sample("nivpro_db_queries_per_request_sum", route=route) >= sum_before + 2
+    # Time spent in those queries, per request.
+    assert _sample("nivpro_db_query_seconds_per_request_count", route=route) == seconds_before + 1
+
+
+def test_upload_and_bcrypt_timings(client, admin_headers, uploaded_song):
+    assert _sample("nivpro_upload_size_bytes_count", kind="song") >= 1
+    assert _sample("nivpro_upload_store_duration_seconds_count", kind="song") >= 1
+    assert _sample("nivpro_tag_parse_duration_seconds_count") >= 1
+    assert _sample("nivpro_bcrypt_duration_seconds_count", operation="verify") >= 1
@@ -63,6 +63,45 @@ def test_stream_returns_audio(client, viewer_headers, uploaded_song):
     assert len(r.content) > 0
 
 
+# ── signed stream URLs ───────────────────────────────────────────────────────
+
+def test_stream_url_unauthenticated(client, uploaded_song):
+    r = client.get(f"/api/songs/{uploaded_song['id']}/stream-url")
+    assert r.status_code == 401
+
+
+def test_stream_url_not_found(client, viewer_headers):
+    r = client.get("/api/songs/999999/stream-url", headers=viewer_headers)
+    assert r.status_code == 404
+
+
+def test_signed_stream_without_auth_header(client, viewer_headers, uploaded_song):
+    r = client.get(f"/api/songs/{uploaded_song['id']}/stream-url", headers=viewer_headers)
+    assert r.status_code == 200
+    data = r.json()
+    assert uploaded_song["filename"] in data["url"]
+    r = client.get(data["url"])
+    assert r.status_code == 200
+    assert len(r.content) > 0
+    r = client.get(data["url"], headers={"Range": "bytes=0-9"})
+    assert r.status_code == 206
+    assert len(r.content) == 10
+
+
+def test_signed_stream_tampered(client, viewer_headers, uploaded_song):
+    url = client.get(f"/api/songs/{uploaded_song['id']}/stream-url", headers=viewer_headers).json()["url"]
+    r = client.get(url[:-4] + "0000")
+    assert r.status_code == 403
+
+
+def test_signed_stream_expired(client, uploaded_song):
+    from app.auth import create_stream_url
+
+    url, _ = create_stream_url(uploaded_song["filename"], ttl_seconds=-10)
+    r = client.get(url)
+    assert r.status_code == 403
+
+
 # ── love / unlove ─────────────────────────────────────────────────────────────
 
 def test_love_song(client, viewer_headers, uploaded_song):
@@ -0,0 +1,190 @@
+"""Tests for /api/playlists/* endpoints."""
+import pytest
+
+from tests.conftest import FAKE_MP3
+
+
+@pytest.fixture
+def songs(client, admin_headers):
+    """Upload three fake songs; delete them after the test."""
+    created = []
+    for i in range(3):
+        r = client.post(
+            "/api/admin/songs",
+            files={"file": (f"pl_song_{i}.mp3", FAKE_MP3, "audio/mpeg")},
+            headers=admin_headers,
+        )
+        assert r.status_code == 200, r.text
+        created.append(r.json()["id"])
+    yield created
+    for song_id in created:
+        client.delete(f"/api/admin/songs/{song_id}", headers=admin_headers)
+
+
+@pytest.fixture
+def playlist(client, viewer_headers):
+    r = client.post("/api/playlists", json={"name": "pytest mix"}, headers=viewer_headers)
+    assert r.status_code == 201, r.text
+    yield r.json()
+    client.delete(f"/api/playlists/{r.json()['id']}", headers=viewer_headers)
+
+
+def _items(client, headers, playlist_id, **params):
+    r = client.get(f"/api/playlists/{playlist_id}/items", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _song_order(client, headers, playlist_id):
+    return [item["song_id"] for item in _items(client, headers, playlist_id, limit=1000)["items"]]
+
+
+# ── playlist CRUD ─────────────────────────────────────────────────────────────
+
+def test_playlists_unauthenticated(client):
+    assert client.get("/api/playlists").status_code == 401
+
+
+def test_create_list_rename(client, viewer_headers, playlist):
+    r = client.get("/api/playlists", headers=viewer_headers)
+    assert r.status_code == 200
+    assert any(p["id"] == playlist["id"] and p["item_count"] == 0 for p in r.json())
+
+    r = client.patch(f"/api/playlists/{playlist['id']}", json={"name": "renamed"}, headers=viewer_headers)
+    assert r.status_code == 200
+    assert r.json()["name"] == "renamed"
+
+
+def test_create_playlist_empty_name(client, viewer_headers):
+    r = client.post("/api/playlists", json={"name": ""}, headers=viewer_headers)
+    assert r.status_code == 422
+
+
+def test_playlist_private_to_owner(client, admin_headers, playlist):
+    assert client.get(f"/api/playlists/{playlist['id']}", headers=admin_headers).status_code == 404
+    assert client.get(f"/api/playlists/{playlist['id']}/items", headers=admin_headers).status_code == 404
+
+
+def test_delete_playlist(client, viewer_headers, songs):
+    r = client.post("/api/playlists", json={"name": "to delete"}, headers=viewer_headers)
+    pid = r.json()["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs}, headers=viewer_headers)
+    assert client.delete(f"/api/playlists/{pid}", headers=viewer_headers).status_code == 200
+    assert client.get(f"/api/playlists/{pid}", headers=viewer_headers).status_code == 404
+
+
+# ── items ─────────────────────────────────────────────────────────────────────
+
+def test_add_items_in_order(client, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    r = client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs}, headers=viewer_headers)
+    assert r.status_code == 200
+    assert r.json() == {"added": 3}
+    page = _items(client, viewer_headers, pid)
+    assert [i["song_id"] for i in page["items"]] == songs
+    assert page["next_cursor"] is None
+    assert {"title", "artist", "duration_seconds", "filename"} <= page["items"][0].keys()
+    assert client.get(f"/api/playlists/{pid}", headers=viewer_headers).json()["item_count"] == 3
+
+
+def test_add_items_before(client, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs[:2]}, headers=viewer_headers)
+    second = _items(client, viewer_headers, pid)["items"][1]["id"]
+    r = client.post(
+        f"/api/playlists/{pid}/items",
+        json={"song_ids": [songs[2], songs[2]], "before_item_id": second},
+        headers=viewer_headers,
+    )
+    assert r.status_code == 200
+    assert _song_order(client, viewer_headers, pid) == [songs[0], songs[2], songs[2], songs[1]]
+
+
+def test_add_unknown_song(client, viewer_headers, playlist):
+    r = client.post(f"/api/playlists/{playlist['id']}/items", json={"song_ids": [999999]}, headers=viewer_headers)
+    assert r.status_code == 400
+
+
+def test_move_items(client, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs}, headers=viewer_headers)
+    ids = [i["id"] for i in _items(client, viewer_headers, pid)["items"]]
+    # Move the last item to the front.
+    r = client.post(
+        f"/api/playlists/{pid}/items/move",
+        json={"item_ids": [ids[2]], "before_item_id": ids[0]},
+        headers=viewer_headers,
+    )
+    assert r.status_code == 200
+    assert _song_order(client, viewer_headers, pid) == [songs[2], songs[0], songs[1]]
+    # Move the first two (in reverse order) to the end.
+    r = client.post(f"/api/playlists/{pid}/items/move", json={"item_ids": [ids[0], ids[2]]}, headers=viewer_headers)
+    assert r.status_code == 200
+    assert _song_order(client, viewer_headers, pid) == [songs[1], songs[0], songs[2]]
+
+
+def test_move_invalid(client, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs[:1]}, headers=viewer_headers)
+    item = _items(client, viewer_headers, pid)["items"][0]["id"]
+    r = client.post(
+        f"/api/playlists/{pid}/items/move",
+        json={"item_ids": [item], "before_item_id": item},
+        headers=viewer_headers,
+    )
+    assert r.status_code == 400
+    r = client.post(f"/api/playlists/{pid}/items/move", json={"item_ids": [999999]}, headers=viewer_headers)
+    assert r.status_code == 400
+
+
+def test_remove_items(client, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs}, headers=viewer_headers)
+    ids = [i["id"] for i in _items(client, viewer_headers, pid)["items"]]
+    r = client.post(f"/api/playlists/{pid}/items/remove", json={"item_ids": ids[:2]}, headers=viewer_headers)
+    assert r.json() == {"removed": 2}
+    assert _song_order(client, viewer_headers, pid) == [songs[2]]
+
+
+def test_items_pagination(client, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs * 2}, headers=viewer_headers)
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 4}
+        if cursor:
+            params["after"] = cursor
+        page = _items(client, viewer_headers, pid, **params)
+        seen.extend(i["song_id"] for i in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == songs * 2
+
+
+def test_items_invalid_cursor(client, viewer_headers, playlist):
+    r = client.get(f"/api/playlists/{playlist['id']}/items?after=nope", headers=viewer_headers)
+    assert r.status_code == 400
+
+
+def test_repeated_inserts_at_same_slot(client, viewer_headers, playlist, songs):
+    """Halving the gap runs out after ~10 inserts; the tail shift must keep the order intact."""
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": [songs[0], songs[1]]}, headers=viewer_headers)
+    anchor = _items(client, viewer_headers, pid)["items"][1]["id"]
+    for _ in range(15):
+        r = client.post(
+            f"/api/playlists/{pid}/items",
+            json={"song_ids": [songs[2]], "before_item_id": anchor},
+            headers=viewer_headers,
+        )
+        assert r.status_code == 200
+    assert _song_order(client, viewer_headers, pid) == [songs[0]] + [songs[2]] * 15 + [songs[1]]
+
+
+def test_deleted_song_leaves_playlists(client, admin_headers, viewer_headers, playlist, songs):
+    pid = playlist["id"]
+    client.post(f"/api/playlists/{pid}/items", json={"song_ids": songs}, headers=viewer_headers)
+    client.delete(f"/api/admin/songs/{songs[1]}", headers=admin_headers)
+    assert _song_order(client, viewer_headers, pid) == [songs[0], songs[2]]
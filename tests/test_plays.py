@@ -0,0 +1,191 @@
+"""Tests for play-event ingestion (/api/plays) and the batching buffer."""
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import PlayEvent, User
+from app.services import play_events
+from app.services.play_events import PLAY_EVENTS_DROPPED, PlayEventBuffer, get_play_event_buffer
+from tests.conftest import FAKE_MP3
+
+
+def _flush(client):
+    return client.portal.call(get_play_event_buffer().flush)
+
+
+def _viewer_id(client, viewer_headers) -> int:
+    username = client.get("/api/auth/me", headers=viewer_headers).json()["username"]
+
+    async def lookup():
+        from app.database import get_session_factory
+        async with get_session_factory()() as db:
+            return (await db.execute(select(User.id).where(User.username == username))).scalar_one()
+
+    return client.portal.call(lookup)
+
+
+async def _count_plays() -> int:
+    from app.database import get_session_factory
+    async with get_session_factory()() as db:
+        return (await db.execute(select(func.count(PlayEvent.id)))).scalar()
+
+
+def test_record_plays_unauthenticated(client):
+    r = client.post("/api/plays", json={"events": [{"song_id": 1, "event": "start"}]})
+    assert r.status_code == 401
+
+
+def test_record_and_list_recent(client, viewer_headers, uploaded_song):
+    sid = uploaded_song["id"]
+    r = client.post(
+        "/api/plays",
+        json={"events": [
+            {"song_id": sid, "event": "start", "position_seconds": 0},
+            {"song_id": sid, "event": "progress", "position_seconds": 30},
+            {"song_id": sid, "event": "complete", "position_seconds": 61.5},
+        ]},
+        headers=viewer_headers,
+    )
+    assert r.status_code == 202
+    assert r.json() == {"accepted": 3}
+    assert _flush(client) >= 3
+    r = client.get("/api/plays/recent", headers=viewer_headers)
+    assert r.status_code == 200
+    recent = r.json()
+    assert recent[0]["song_id"] == sid
+    assert recent[0]["event"] == "start"
+    assert recent[0]["title"] == uploaded_song["title"]
+
+
+def test_record_plays_validation(client, viewer_headers):
+    r = client.post("/api/plays", json={"events": [{"song_id": 1, "event": "skip"}]}, headers=viewer_headers)
+    assert r.status_code == 422
+    r = client.post("/api/plays", json={"events": []}, headers=viewer_headers)
+    assert r.status_code == 422
+
+
+def test_future_client_time_clamped(client, viewer_headers, uploaded_song):
+    r = client.post(
+        "/api/plays",
+        json={"events": [{"song_id": uploaded_song["id"], "event": "start", "occurred_at": "2999-01-01T00:00:00Z"}]},
+        headers=viewer_headers,
+    )
+    assert r.status_code == 202
+    _flush(client)
+    recent = client.get("/api/plays/recent?limit=1", headers=viewer_headers).json()
+    assert not recent[0]["occurred_at"].startswith("2999")
+
+
+def test_queue_full_returns_503(client, viewer_headers):
+    buffer = get_play_event_buffer()
+    old = buffer.max_pending
+    buffer.max_pending = 0
+    try:
+        r = client.post("/api/plays", json={"events": [{"song_id": 1, "event": "start"}]}, headers=viewer_headers)
+    finally:
+        buffer.max_pending = old
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "5"
+
+
+def _events(user_id: int, song_id: int, n: int) -> list[dict]:
+    return [
+        {"user_id": user_id, "song_id": song_id, "event": "start", "position_seconds": float(i), "occurred_at": datetime(2024, 1, 1)}
+        for i in range(n)
+    ]
+
+
+def test_flush_batches_and_requeues_on_failure(client, monkeypatch, viewer_headers, uploaded_song):
+    """A failed flush keeps events queued in order; the next flush writes them in batches."""
+    buffer = PlayEventBuffer(batch_size=2, flush_interval=60, max_pending=100)
+    assert buffer.add(_events(_viewer_id(client, viewer_headers), uploaded_song["id"], 5))
+    before = client.portal.call(_count_plays)
+
+    class Boom(Exception):
+        pass
+
+    def failing_factory():
+        raise Boom()
+
+    monkeypatch.setattr("app.database.get_session_factory", failing_factory)
+    with pytest.raises(Boom):
+        client.portal.call(buffer.flush)
+    monkeypatch.undo()
+    assert buffer.pending == 5
+    assert [e["position_seconds"] for e in buffer._pending] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    assert client.portal.call(buffer.flush) == 5
+    assert buffer.pending == 0
+    assert client.portal.call(_count_plays) == before + 5
+
+
+def test_buffer_add_is_all_or_nothing():
+    async def run():
+        buffer = PlayEventBuffer(batch_size=10, flush_interval=60, max_pending=3)
+        assert buffer.add([{}, {}])
+        assert not buffer.add([{}, {}])
+        return buffer.pending
+
+    assert asyncio.run(run()) == 2
+
+
+def test_flush_drops_events_for_missing_songs(client, viewer_headers, uploaded_song, enforce_foreign_keys):
+    """An unknown song id must not fail every flush and fill the queue (the API would answer 503)."""
+    buffer = PlayEventBuffer(batch_size=10, flush_interval=60, max_pending=100)
+    user_id = _viewer_id(client, viewer_headers)
+    assert buffer.add(_events(user_id, 999999, 2) + _events(user_id, uploaded_song["id"], 3))
+    dropped = PLAY_EVENTS_DROPPED._value.get()
+    before = client.portal.call(_count_plays)
+    assert client.portal.call(buffer.flush) == 3
+    assert buffer.pending == 0
+    assert client.portal.call(_count_plays) == before + 3
+    assert PLAY_EVENTS_DROPPED._value.get() == dropped + 2
+
+
+def test_flush_rechecks_after_integrity_error(client, monkeypatch, viewer_headers, uploaded_song, enforce_foreign_keys):
+    """A song deleted between the existence check and the insert: the batch is checked again."""
+    buffer = PlayEventBuffer(batch_size=10, flush_interval=60, max_pending=100)
+    user_id = _viewer_id(client, viewer_headers)
+    assert buffer.add(_events(user_id, 999999, 1) + _events(user_id, uploaded_song["id"], 1))
+    check = play_events._existing_rows
+    calls = []
+
+    async def stale_check(db, batch):
+        calls.append(len(batch))
+        return batch if len(calls) == 1 else await check(db, batch)
+
+    monkeypatch.setattr(play_events, "_existing_rows", stale_check)
+    assert client.portal.call(buffer.flush) == 1
+    assert buffer.pending == 0
+    assert calls == [2, 2]
+
+
+async def _plays_of(column, value) -> int:
+    from app.database import get_session_factory
+    async with get_session_factory()() as db:
+        return (await db.execute(select(func.count(PlayEvent.id)).where(column == value))).scalar()
+
+
+def test_deleted_song_and_user_remove_play_events(client, admin_headers, uploaded_song, enforce_foreign_keys):
+    sid = uploaded_song["id"]
+    username = f"plays_{uuid.uuid4().hex[:8]}"
+    client.post("/api/auth/register", json={"username": username, "password": "password123", "password_confirm": "password123"})
+    token = client.post("/api/auth/login", data={"username": username, "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/api/plays", json={"events": [{"song_id": sid, "event": "start"}]}, headers=headers)
+    _flush(client)
+    user_id = _viewer_id(client, headers)
+    assert client.portal.call(_plays_of, PlayEvent.user_id, user_id) == 1
+
+    assert client.delete(f"/api/admin/songs/{sid}", headers=admin_headers).status_code == 200
+    assert client.portal.call(_plays_of, PlayEvent.song_id, sid) == 0
+
+    other = client.post("/api/admin/songs", files={"file": ("plays_user.mp3", FAKE_MP3, "audio/mpeg")}, headers=admin_headers).json()
+    client.post("/api/plays", json={"events": [{"song_id": other["id"], "event": "start"}]}, headers=headers)
+    _flush(client)
+    assert client.delete(f"/api/admin/users/{user_id}", headers=admin_headers).status_code == 200
+    assert client.portal.call(_plays_of, PlayEvent.user_id, user_id) == 0
+    client.delete(f"/api/admin/songs/{other['id']}", headers=admin_headers)
@@ -0,0 +1,142 @@
+"""Query plan regression tests for the hot lookups in song_service, player and background.
+
+Each hot request is sent with ``X-Profile: 1`` so app.profiling records the SQL it ran; every
+statement is then replayed as ``EXPLAIN QUERY PLAN`` against a separate database seeded by
+app.scripts.generate_data and ANALYZEd. A plain ``SCAN <table>`` (full table scan) or a temp
+B-tree sort fails the test.
+"""
+import asyncio
+import random
+import re
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import QUERY_INDEXES, Base, _add_query_indexes_if_missing
+from app.services.catalog import sync_token
+from app.scripts.generate_data import generate_data
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+SEED_SONGS = 20000
+SEED_USERS = 200
+SEED_LOVES = 60000
+SEED_BACKGROUNDS = 40
+
+
+def _seed(path) -> None:
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await generate_data(engine, users=SEED_USERS, songs=SEED_SONGS, loves=SEED_LOVES, backgrounds=0, prefix="plan")
+        await engine.dispose()
+
+    asyncio.run(run())
+    # Rows generate_data does not cover (background rows without files, playlists, charts).
+    now = datetime(2024, 1, 1)
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO background_images (id, filename, is_active, created_at) VALUES (?, ?, ?, ?)",
+        [(i, f"{i}.jpg", i == 1, now) for i in range(1, SEED_BACKGROUNDS + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO playlists (id, user_id, name, created_at, updated_at) VALUES (?, ?, 'p', ?, ?)",
+        [(i, i, now, now) for i in range(1, SEED_USERS + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO playlist_items (playlist_id, song_id, position, added_at) VALUES (?, ?, ?, ?)",
+        [(rng.randrange(1, SEED_USERS + 1), rng.randrange(1, SEED_SONGS + 1), i * 1024, now) for i in range(20000)],
+    )
+    conn.executemany(
+        "INSERT INTO chart_entries (chart, rank, song_id, score, refreshed_at) VALUES ('most_loved', ?, ?, 1, ?)",
+        [(rank, rank, now) for rank in range(1, 101)],
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def seeded_db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "seeded.db"
+    _seed(path)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def _plan(conn: sqlite3.Connection, statement: str) -> list[str]:
+    # Values do not change the plan here; bind NULL for every placeholder.
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}", [None] * statement.count("?")).fetchall()
+    return [row[3] for row in rows]
+
+
+def _profiled_sql(client, admin_headers, method: str, url: str, **kwargs) -> list[str]:
+    r = client.request(method, url, headers={**admin_headers, "X-Profile": "1"}, **kwargs)
+    assert r.status_code < 500, r.text
+    profile = client.get(f"/api/admin/profiles/{r.headers['x-profile-id']}", headers=admin_headers).json()
+    return [q["statement"] for q in profile["sql"]]
+
+
+def _assert_indexed(conn, statements: list[str]) -> None:
+    assert statements
+    for statement in statements:
+        for detail in _plan(conn, statement):
+            assert not FULL_SCAN.match(detail), f"full table scan ({detail}) in:\n{statement}"
+            assert "TEMP B-TREE" not in detail, f"unindexed sort ({detail}) in:\n{statement}"
+
+
+def test_migration_creates_query_indexes(seeded_db):
+    for name, _, _ in QUERY_INDEXES:
+        seeded_db.execute(f"DROP INDEX {name}")
+    engine = create_engine("sqlite://", creator=lambda: seeded_db)
+    with engine.begin() as conn:
+        _add_query_indexes_if_missing(conn)
+    names = {row[0] for row in seeded_db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {name for name, _, _ in QUERY_INDEXES} <= names
+
+
+@pytest.mark.parametrize(
+    "method,url",
+    [
+        ("GET", "/api/songs"),
+        ("GET", "/api/songs/changes?since={since}"),
+        ("GET", "/api/songs/up-next?after={song}"),
+        ("GET", "/api/songs/up-next?after={song}&shuffle=7"),
+        ("GET", "/api/songs/up-next?ids={song}"),
+        ("GET", "/api/admin/songs"),
+        ("GET", "/api/songs/{song}/stream-url"),
+        ("GET", "/api/songs/{song}/analysis"),
+        ("POST", "/api/songs/{song}/love"),
+        ("DELETE", "/api/songs/{song}/love"),
+        ("GET", "/api/songs/background/active"),
+        ("GET", "/api/admin/backgrounds/active"),
+        ("POST", "/api/admin/backgrounds/{bg}/activate"),
+    ],
+)
+def test_hot_requests_use_indexes(client, admin_headers, uploaded_song, uploaded_bg, seeded_db, method, url):
+    url = url.format(song=uploaded_song["id"], bg=uploaded_bg["id"], since=sync_token(datetime.utcnow()))
+    _assert_indexed(seeded_db, _profiled_sql(client, admin_headers, method, url))
+
+
+def test_song_writes_use_indexes(client, admin_headers, uploaded_song, seeded_db):
+    sid = uploaded_song["id"]
+    statements = _profiled_sql(client, admin_headers, "PATCH", f"/api/admin/songs/{sid}", json={"title": "Plan"})
+    statements += _profiled_sql(
+        client, admin_headers, "POST", "/api/admin/songs/bulk-edit", json={"song_ids": [sid], "artist": "Plan"}
+    )
+    # song_service.delete_song: references in playlist_items, song_loves, song_daily_stats, chart_entries.
+    statements += _profiled_sql(client, admin_headers, "DELETE", f"/api/admin/songs/{sid}")
+    _assert_indexed(seeded_db, statements)
+
+
+def test_playlist_counts_read_only_own_items(client, admin_headers, seeded_db):
+    # Each count searches playlist_items by playlist; sorting one user's few playlists is fine.
+    statements = _profiled_sql(client, admin_headers, "GET", "/api/playlists")
+    details = [detail for statement in statements for detail in _plan(seeded_db, statement)]
+    assert any(detail.startswith("SEARCH playlist_items") for detail in details)
+    assert not [detail for detail in details if detail.startswith("SCAN playlist_items")]
@@ -0,0 +1,80 @@
+"""Tests for catalogue delta sync (GET /api/songs/changes)."""
+from datetime import datetime, timedelta
+
+from app.services.catalog import CHANGES_OVERLAP_SECONDS, parse_sync_token, sync_token
+from tests.conftest import FAKE_MP3
+
+
+def _changes(client, headers, since: str | None) -> dict:
+    r = client.get("/api/songs/changes", params={"since": since} if since else {}, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _past_token() -> str:
+    # Just before the re-sent overlap window, so only changes made by the test show up.
+    return sync_token(datetime.utcnow() + timedelta(seconds=CHANGES_OVERLAP_SECONDS))
+
+
+def test_first_sync_resets(client, viewer_headers):
+    body = _changes(client, viewer_headers, None)
+    assert body["reset"] is True
+    assert body["songs"] == [] and body["deleted"] == []
+    assert parse_sync_token(body["next"]) <= datetime.utcnow()
+
+
+def test_old_token_resets(client, viewer_headers):
+    body = _changes(client, viewer_headers, sync_token(datetime.utcnow() - timedelta(days=365)))
+    assert body["reset"] is True
+
+
+def test_invalid_token(client, viewer_headers):
+    for token in ("abc", "-5", "1e9"):
+        r = client.get("/api/songs/changes", params={"since": token}, headers=viewer_headers)
+        assert r.status_code == 400
+
+
+def test_token_round_trip():
+    at = datetime(2026, 3, 1, 12, 30, 5, 123456)
+    assert parse_sync_token(sync_token(at)) == at
+
+
+def test_inserts_updates_and_deletes(client, admin_headers, viewer_headers):
+    since = _past_token()
+    r = client.post("/api/admin/songs", files={"file": ("sync.mp3", FAKE_MP3, "audio/mpeg")}, headers=admin_headers)
+    song_id = r.json()["id"]
+    body = _changes(client, viewer_headers, since)
+    assert body["reset"] is False
+    [song] = [s for s in body["songs"] if s["id"] == song_id]
+    assert song["is_loved"] is False and song["love_count"] == 0
+    assert song_id not in body["deleted"]
+
+    since = _past_token()
+    client.patch(f"/api/admin/songs/{song_id}", json={"title": "Synced"}, headers=admin_headers)
+    assert [s["title"] for s in _changes(client, viewer_headers, since)["songs"]] == ["Synced"]
+
+    since = _past_token()
+    client.post("/api/admin/songs/bulk-edit", json={"song_ids": [song_id], "artist": "Bulk"}, headers=admin_headers)
+    assert [s["artist"] for s in _changes(client, viewer_headers, since)["songs"]] == ["Bulk"]
+
+    since = _past_token()
+    client.post(f"/api/songs/{song_id}/love", headers=viewer_headers)
+    [song] = _changes(client, viewer_headers, since)["songs"]
+    assert song["love_count"] == 1 and song["is_loved"] is True
+
+    since = _past_token()
+    client.delete(f"/api/admin/songs/{song_id}", headers=admin_headers)
+    body = _changes(client, viewer_headers, since)
+    assert body["songs"] == []
+    assert body["deleted"] == [song_id]
+
+
+def test_bulk_delete_tombstones(client, admin_headers, viewer_headers):
+    ids = [
+        client.post("/api/admin/songs", files={"file": (f"sync{i}.mp3", FAKE_MP3, "audio/mpeg")}, headers=admin_headers).json()["id"]
+        for i in range(2)
+    ]
+    since = _past_token()
+    r = client.post("/api/admin/songs/bulk-delete", json={"song_ids": ids}, headers=admin_headers)
+    assert r.status_code == 200, r.text
+    assert sorted(_changes(client, viewer_headers, since)["deleted"]) == sorted(ids)
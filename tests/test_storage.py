@@ -0,0 +1,172 @@
+"""Tests for the sharded upload layout (app.storage)."""
+from pathlib import Path
+
+import boto3
+import moto
+import pytest
+
+from app.config import get_settings
+from app.storage import migrate_layout, scan_files, shard_dirs, stored_path
+from tests.conftest import FAKE_MP3, wait_for_job
+
+
+def _delete_song(client, admin_headers, song_id: int) -> None:
+    """Delete a song and wait for the job that removes its file."""
+    assert client.delete(f"/api/admin/songs/{song_id}", headers=admin_headers).status_code == 200
+    job = client.get("/api/admin/jobs?kind=delete_song_files&limit=1", headers=admin_headers).json()[0]
+    assert wait_for_job(client, admin_headers, job["id"])["status"] == "succeeded"
+
+
+def test_stored_path_depths():
+    root = Path("/data")
+    assert stored_path(root, "abc.mp3", depth=0) == root / "abc.mp3"
+    path = stored_path(root, "abc.mp3", depth=2)
+    assert path.name == "abc.mp3"
+    assert path.parent.parent.parent == root
+    assert [p for p in path.relative_to(root).parts[:2]] == shard_dirs("abc.mp3", 2)
+    assert all(len(d) == 2 for d in shard_dirs("abc.mp3", 2))
+
+
+def test_migrate_layout_and_back(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    (images / "bg.jpg").write_bytes(b"img")
+    names = [f"song{i}.mp3" for i in range(20)]
+    for n in names:
+        (tmp_path / n).write_bytes(b"x")
+
+    assert migrate_layout(tmp_path, 2, exclude=images) == (20, 0)
+    for n in names:
+        assert stored_path(tmp_path, n, depth=2).exists()
+    assert (images / "bg.jpg").exists()
+    # Re-running is a no-op (resumable)
+    assert migrate_layout(tmp_path, 2, exclude=images) == (0, 20)
+    assert set(scan_files(tmp_path, exclude=images)) == set(names)
+
+    assert migrate_layout(tmp_path, 0, exclude=images) == (20, 0)
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == ["images"]
+
+
+@pytest.fixture
+def sharded():
+    settings = get_settings()
+    settings.storage_shard_depth = 2
+    yield settings
+    settings.storage_shard_depth = 0
+
+
+def test_upload_and_stream_sharded(client, admin_headers, viewer_headers, sharded):
+    r = client.post(
+        "/api/admin/songs",
+        files={"file": ("sharded.mp3", FAKE_MP3, "audio/mpeg")},
+        headers=admin_headers,
+    )
+    assert r.status_code == 200
+    song = r.json()
+    path = stored_path(sharded.upload_dir, song["filename"])
+    assert path.exists()
+    assert path.parent != sharded.upload_dir
+    r = client.get(f"/api/songs/{song['id']}/stream", headers=viewer_headers)
+    assert r.status_code == 200
+    r = client.post("/api/admin/storage/reconcile", headers=admin_headers)
+    assert song["filename"] not in r.json()["missing_song_files"]
+    assert song["filename"] not in r.json()["misplaced_files"]
+    _delete_song(client, admin_headers, song["id"])
+    assert not path.exists()
+
+
+# ── S3-compatible backend (against moto) ──────────────────────────────────────
+
+@pytest.fixture
+def s3_backend():
+    from app.storage import get_image_storage, get_song_storage
+
+    settings = get_settings()
+    saved = settings.model_dump()
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="nivpro-test")
+        settings.storage_backend = "s3"
+        settings.s3_bucket = "nivpro-test"
+        settings.s3_region = "us-east-1"
+        settings.s3_access_key_id = "test"
+        settings.s3_secret_access_key = "test"
+        get_song_storage.cache_clear()
+        get_image_storage.cache_clear()
+        try:
+            yield get_song_storage()
+        finally:
+            for key, value in saved.items():
+                setattr(settings, key, value)
+            get_song_storage.cache_clear()
+            get_image_storage.cache_clear()
+
+
+def test_s3_upload_stream_range_and_delete(client, admin_headers, viewer_headers, s3_backend):
+    payload = FAKE_MP3 + bytes(range(256))
+    r = client.post(
+        "/api/admin/songs",
+        files={"file": ("s3.mp3", payload, "audio/mpeg")},
+        headers=admin_headers,
+    )
+    assert r.status_code == 200
+    song = r.json()
+    assert song["filename"] in s3_backend.list_files()
+
+    r = client.get(f"/api/songs/{song['id']}/stream", headers=viewer_headers)
+    assert r.status_code == 200
+    assert r.content == payload
+    r = client.get(f"/api/songs/{song['id']}/stream", headers={**viewer_headers, "Range": "bytes=4-9"})
+    assert r.status_code == 206
+    assert r.content == payload[4:10]
+    assert r.headers["content-range"] == f"bytes 4-9/{len(payload)}"
+
+    r = client.post("/api/admin/storage/reconcile", headers=admin_headers)
+    assert song["filename"] not in r.json()["missing_song_files"]
+
+    _delete_song(client, admin_headers, song["id"])
+    assert song["filename"] not in s3_backend.list_files()
+
+
+def test_s3_missing_object_is_404(client, admin_headers, viewer_headers, s3_backend):
+    r = client.post(
+        "/api/admin/songs",
+        files={"file": ("s3.mp3", FAKE_MP3, "audio/mpeg")},
+        headers=admin_headers,
+    )
+    song = r.json()
+    s3_backend.delete_locators([s3_backend.locate(song["filename"])])
+    r = client.get(f"/api/songs/{song['id']}/stream", headers=viewer_headers)
+    assert r.status_code == 404
+    client.delete(f"/api/admin/songs/{song['id']}", headers=admin_headers)
+    client.post("/api/admin/storage/reconcile", headers=admin_headers)
+
+
+def test_s3_local_copy_errors(s3_backend, monkeypatch):
+    """A missing object gives an empty (unreadable) file; other S3 errors propagate so jobs retry."""
+    import asyncio
+
+    from botocore.exceptions import ClientError
+
+    async def copy_size(filename):
+        async with s3_backend.local_copy(filename) as path:
+            return path.stat().st_size
+
+    assert asyncio.run(copy_size("missing.mp3")) == 0
+
+    def throttled(*args, **kwargs):
+        raise ClientError({"Error": {"Code": "SlowDown", "Message": "Reduce your request rate"}}, "GetObject")
+
+    monkeypatch.setattr(s3_backend.client, "download_file", throttled)
+    with pytest.raises(ClientError):
+        asyncio.run(copy_size("song.mp3"))
+
+
+def test_incomplete_backend_fails_at_construction():
+    from app.storage import Storage
+
+    class Partial(Storage):
+        def locate(self, filename):
+            return filename
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
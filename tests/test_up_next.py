@@ -0,0 +1,99 @@
+"""Tests for the up-next API (next tracks with signed stream URLs for prefetching)."""
+from app.services.song_service import next_shuffled, shuffle_key, shuffle_keys
+from tests.conftest import FAKE_MP3
+
+
+def _listing(client, headers, **params) -> list[int]:
+    return [s["id"] for s in client.get("/api/songs", params=params, headers=headers).json()]
+
+
+def _up_next(client, headers, **params) -> list[dict]:
+    r = client.get("/api/songs/up-next", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _upload(client, admin_headers, n: int) -> list[int]:
+    return [
+        client.post("/api/admin/songs", files={"file": (f"upnext{i}.mp3", FAKE_MP3, "audio/mpeg")}, headers=admin_headers).json()["id"]
+        for i in range(n)
+    ]
+
+
+def test_follows_listing_order_and_wraps(client, admin_headers, viewer_headers):
+    _upload(client, admin_headers, 3)
+    ids = _listing(client, viewer_headers)
+    tracks = _up_next(client, viewer_headers, after=ids[0], count=2)
+    assert [t["id"] for t in tracks] == ids[1:3]
+    tracks = _up_next(client, viewer_headers, after=ids[-1], count=1)
+    assert [t["id"] for t in tracks] == ids[:1]
+    # Unknown (or filtered out) current song: start from the top.
+    assert _up_next(client, viewer_headers, after=0, count=1)[0]["id"] == ids[0]
+
+
+def test_shuffle_order(client, admin_headers, viewer_headers):
+    _upload(client, admin_headers, 3)
+    seed = 424242
+    order = sorted(_listing(client, viewer_headers), key=lambda song_id: (shuffle_key(seed, song_id), song_id))
+    tracks = _up_next(client, viewer_headers, after=order[0], count=3, shuffle=seed)
+    assert [t["id"] for t in tracks] == order[1:4]
+
+
+def test_wraps_through_current_song(client, admin_headers, viewer_headers):
+    _upload(client, admin_headers, 2)
+    ids = _listing(client, viewer_headers)
+    # Asking for more than the library: each song once, ending with the current one.
+    tracks = _up_next(client, viewer_headers, after=ids[1], count=20)
+    assert [t["id"] for t in tracks] == ids[2:] + ids[:2]
+
+
+def test_shuffle_order_follows_catalogue_changes(client, admin_headers, viewer_headers):
+    seed = 99
+    before = [t["id"] for t in _up_next(client, viewer_headers, count=20, shuffle=seed)]
+    [new_id] = _upload(client, admin_headers, 1)
+    after = [t["id"] for t in _up_next(client, viewer_headers, count=20, shuffle=seed)]
+    assert new_id not in before
+    assert new_id in after or len(after) == 20
+    order = sorted(_listing(client, viewer_headers), key=lambda song_id: (shuffle_key(seed, song_id), song_id))
+    assert after == order[:20]
+
+
+def test_shuffle_keys_follow_shuffle_order():
+    seed, ids = 7, list(range(1, 200))
+    order = sorted(ids, key=lambda song_id: (shuffle_key(seed, song_id), song_id))
+    keys = shuffle_keys(seed, ids)
+    assert next_shuffled(keys, seed, order[10], 3) == order[11:14]
+    assert next_shuffled(keys, seed, order[-1], 2) == order[:2]
+    assert next_shuffled(keys, seed, 10**6, 1) == order[:1]
+    assert next_shuffled(shuffle_keys(seed, []), seed, 1, 3) == []
+
+
+def test_explicit_ids(client, admin_headers, viewer_headers):
+    ids = _upload(client, admin_headers, 2)
+    tracks = _up_next(client, viewer_headers, ids=[ids[1], 999999, ids[0]], shuffle=5, after=ids[1])
+    assert [t["id"] for t in tracks] == [ids[1], ids[0]]
+    assert all(t["stream_url"] for t in tracks)
+
+
+def test_search_filter(client, viewer_headers, uploaded_song):
+    tracks = _up_next(client, viewer_headers, search=uploaded_song["title"], count=20)
+    assert uploaded_song["id"] in [t["id"] for t in tracks]
+    term = uploaded_song["title"].lower()
+    assert all(term in f'{t["title"]} {t["artist"]} {t["filename"]}'.lower() for t in tracks)
+    assert _up_next(client, viewer_headers, search="no-such-song-anywhere") == []
+
+
+def test_signed_urls_and_preload_link(client, viewer_headers, uploaded_song):
+    r = client.get("/api/songs/up-next", params={"after": 0, "count": 2}, headers=viewer_headers)
+    tracks = r.json()
+    assert r.headers["link"] == f'<{tracks[0]["stream_url"]}>; rel=preload; as=audio'
+    stream = client.get(tracks[0]["stream_url"], headers={"Range": "bytes=0-1"})
+    assert stream.status_code == 206
+    assert all(t["expires"] > 0 and "is_loved" in t for t in tracks)
+
+
+def test_validation(client, viewer_headers):
+    assert client.get("/api/songs/up-next", params={"count": 0}, headers=viewer_headers).status_code == 422
+    assert client.get("/api/songs/up-next", params={"shuffle": -1}, headers=viewer_headers).status_code == 422
+    assert client.get("/api/songs/up-next", params={"ids": list(range(21))}, headers=viewer_headers).status_code == 422
+    assert client.get("/api/songs/up-next").status_code == 401